@@ -0,0 +1,128 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+# v2: snapshots no longer carry credential fields
+CACHE_PREFIX = 'auth:token:v2'
+
+# Never copied into the caches; loaded from the database if a view reads them
+CREDENTIAL_FIELDS = ('password',)
+
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def cache_key(key):
+    # Hashed so token keys never appear in the shared cache's key space
+    return f'{CACHE_PREFIX}:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def _field_names():
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields
+        if field.attname not in CREDENTIAL_FIELDS
+    ]
+
+
+def _snapshot(user):
+    return tuple(getattr(user, name) for name in _field_names())
+
+
+def _from_snapshot(snapshot):
+    # A fresh instance per request, so views can modify and save it; the
+    # credential fields are deferred and saves leave them alone
+    return get_user_model().from_db(DEFAULT_DB_ALIAS, _field_names(), snapshot)
+
+
+def _local_get(key):
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is None:
+            return None
+        snapshot, expires_at = entry
+        if time.monotonic() > expires_at:
+            del _local[key]
+            return None
+        _local.move_to_end(key)
+        return snapshot
+
+
+def _local_set(key, snapshot):
+    with _local_lock:
+        _local[key] = (snapshot, time.monotonic() + _setting('TOKEN_CACHE_LOCAL_SECONDS', 5))
+        _local.move_to_end(key)
+        while len(_local) > _setting('TOKEN_CACHE_SIZE', 1024):
+            _local.popitem(last=False)
+
+
+def user_for_token(key):
+    """
+    The user a token belongs to, or None for an unknown token.
+
+    Looked up in this worker's LRU first, then the shared cache, and only
+    then in the database. Entries are dropped when the token is deleted or
+    its user changes (see authentication.signals); other workers' LRUs
+    catch up within TOKEN_CACHE_LOCAL_SECONDS.
+    """
+    snapshot = _local_get(key)
+    if snapshot is None:
+        snapshot = cache.get(cache_key(key))
+        if snapshot is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                return None
+            snapshot = _snapshot(token.user)
+            cache.set(cache_key(key), snapshot, _setting('TOKEN_CACHE_SECONDS', 300))
+        _local_set(key, snapshot)
+    return _from_snapshot(snapshot)
+
+
+def forget_tokens(keys):
+    """Drop cached users for the given token keys"""
+    keys = list(keys)
+    with _local_lock:
+        for key in keys:
+            _local.pop(key, None)
+    cache.delete_many([cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication without the token and user query on every request"""
+
+    def authenticate_credentials(self, key):
+        user = user_for_token(key)
+        if user is None:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # request.auth is the key; nothing here reads the Token row
+        return (user, key)
+
+
+class QueryParamTokenAuthentication(CachedTokenAuthentication):
+    """
+    Also accepts the token from ?token= or an Authorization form field,
+    for downloads the browser opens directly.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        key = request.POST.get('Authorization', '').replace('Token ', '') or request.query_params.get('token')
+        if not key:
+            return None
+        return self.authenticate_credentials(key)
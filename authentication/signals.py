@@ -0,0 +1,26 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import forget_tokens
+
+
+def _forget(keys):
+    # Forget now and again after commit, so a request can't re-cache the
+    # old user while the write's transaction is still open
+    forget_tokens(keys)
+    transaction.on_commit(lambda: forget_tokens(keys))
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # Logout, and every token of a deleted user
+    _forget([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_changed_user(sender, instance, created, **kwargs):
+    # Approval, role and profile changes
+    if not created:
+        _forget(list(Token.objects.filter(user=instance).values_list('key', flat=True)))
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from . import authentication
+from cages.tests import MEDIA_DIR, QueryBudgetTestCase
+from .models import User
 
-# Create your tests here.
+
+@override_settings(MEDIA_ROOT=MEDIA_DIR.name)
+class CachedTokenAuthenticationTests(TestCase):
+    """Token users are cached and dropped again on logout and user changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='password123', role='owner', is_approved=True
+        )
+        cls.worker = User.objects.create_user(
+            username='worker', email='worker@example.com', password='password123', role='worker'
+        )
+
+    def setUp(self):
+        cache.clear()
+        authentication._local.clear()
+        self.token = Token.objects.create(user=self.worker)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_token_lookup(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/auth/profile/')
+        self.assertEqual(response.json()['email'], 'worker@example.com')
+
+    def test_shared_cache_serves_other_workers(self):
+        self.client.get('/api/auth/profile/')
+        # Another worker starts with an empty LRU
+        authentication._local.clear()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_logout_revokes_cached_token(self):
+        self.client.get('/api/auth/profile/')
+        self.assertEqual(self.client.post('/api/auth/logout/').status_code, 200)
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_user_changes_are_seen(self):
+        self.client.get('/api/auth/profile/')
+        owner_client = APIClient()
+        owner_client.force_authenticate(self.owner)
+        owner_client.post(f'/api/auth/users/{self.worker.id}/approve/')
+
+        self.assertTrue(self.client.get('/api/auth/profile/').json()['is_approved'])
+
+    def test_password_hash_is_not_cached(self):
+        self.client.get('/api/auth/profile/')
+
+        snapshot = cache.get(authentication.cache_key(self.token.key))
+        self.assertNotIn(User.objects.get(id=self.worker.id).password, snapshot)
+
+    def test_password_change_from_cached_user(self):
+        self.client.get('/api/auth/profile/')
+
+        response = self.client.put('/api/auth/profile/update/', {
+            'current_password': 'password123', 'password': 'new-password456'
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(User.objects.get(id=self.worker.id).check_password('new-password456'))
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get('/api/auth/profile/')
+        self.worker.delete()
+
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_download_accepts_query_param_token(self):
+        token = Token.objects.create(user=self.owner)
+        client = APIClient()
+
+        response = client.get('/api/cages/reports/download/egg-collection-table/', {'token': token.key})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(
+            client.get('/api/cages/reports/download/egg-collection-table/', {'token': 'nope'}).status_code, 401
+        )
+        self.assertEqual(client.get('/api/cages/reports/download/egg-collection-table/').status_code, 401)
+
+
+class AuthenticationQueryBudgetTests(QueryBudgetTestCase):
+    """Query budgets for the user management endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='password123', role='owner', is_approved=True
+        )
+        cls.pending = User.objects.create_user(
+            username='pending', email='pending@example.com', password='password123', role='worker'
+        )
+
+    def seed(self, scale):
+        User.objects.bulk_create([
+            User(username=f'worker{n}', email=f'worker{n}@example.com', role='worker', is_approved=n % 2 == 0)
+            for n in range(scale)
+        ])
+
+    def endpoints(self):
+        return [
+            ('profile', 'get', '/api/auth/profile/', None, 0),
+            ('update_profile', 'put', '/api/auth/profile/update/', {'farm_name': 'Hill Farm'}, 2),
+            ('users_list', 'get', '/api/auth/users/', None, 1),
+            ('pending_users', 'get', '/api/auth/pending-users/', None, 1),
+            ('approve_user', 'post', f'/api/auth/users/{self.pending.id}/approve/', None, 3),
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_query_budgets(self):
+        self.check_budgets(self.client)
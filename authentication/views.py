@@ -1,3 +1,4 @@
+import logging
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -7,6 +8,8 @@ from django.contrib.auth import logout
 from django.contrib.auth import get_user_model
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
 
+logger = logging.getLogger(__name__)
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def register(request):
@@ -47,11 +50,7 @@ def register(request):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login(request):
-    print("Login request data:", request.data)
     serializer = LoginSerializer(data=request.data)
-    print("Serializer is_valid:", serializer.is_valid())
-    if not serializer.is_valid():
-        print("Serializer errors:", serializer.errors)
     if serializer.is_valid():
         user = serializer.validated_data['user']
         
@@ -66,6 +65,7 @@ def login(request):
             'user': UserSerializer(user).data,
             'token': token.key
         })
+    logger.info('Login failed: %s', serializer.errors)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['POST'])
@@ -139,8 +139,8 @@ def password_reset(request):
         from django.core.cache import cache
         cache.set(f'password_reset_otp_{email}', otp, 300)  # 5 minutes expiry
 
-        # For development/testing, also print the OTP to console
-        print(f"Password reset OTP for {email}: {otp}")
+        # For development/testing, also log the OTP (debug level only)
+        logger.debug('Password reset OTP for %s: %s', email, otp)
 
         # Send email with OTP
         subject = 'Password Reset OTP - EggVentory'
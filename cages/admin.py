@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import CageLayout
 
-# Register your models here.
+
+@admin.register(CageLayout)
+class CageLayoutAdmin(admin.ModelAdmin):
+    list_display = ('cage', 'cage_type', 'rows', 'columns', 'partitions')
+    list_filter = ('cage_type',)
@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+
+CACHE_PREFIX = 'cages:flight'
+
+_MISSING = object()
+
+
+class _Flight:
+    """One in-progress computation that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def request_key(name, user, params=None):
+    """Key for one endpoint, user and set of query parameters"""
+    params = sorted((params or {}).items())
+    query = '&'.join(f'{key}={value}' for key, value in params)
+    return f'{name}:{user.pk}:{query}'
+
+
+def _poll_result(lock_key, holder, deadline):
+    """The result published by the lock holder, or _MISSING if it never comes"""
+    result_key = f'{CACHE_PREFIX}:result:{holder}'
+    poll_seconds = _setting('COALESCE_POLL_SECONDS', 0.05)
+    while time.monotonic() < deadline:
+        time.sleep(poll_seconds)
+        result = cache.get(result_key, _MISSING)
+        if result is not _MISSING:
+            return result
+        if cache.get(lock_key) != holder:
+            # Finished without publishing (it failed) or the lock expired
+            return cache.get(result_key, _MISSING)
+    return _MISSING
+
+
+def _wait_for_worker(key, compute):
+    """
+    Share a computation with other worker processes through the cache.
+
+    The first process to add the lock computes and publishes the result
+    under the lock's token; the others poll for that result, taking the
+    lock themselves if the holder fails, and compute on their own once
+    COALESCE_WAIT_SECONDS have passed.
+    """
+    lock_key = f'{CACHE_PREFIX}:lock:{key}'
+    deadline = time.monotonic() + _setting('COALESCE_WAIT_SECONDS', 30)
+
+    while time.monotonic() < deadline:
+        token = uuid.uuid4().hex
+        if cache.add(lock_key, token, _setting('COALESCE_LOCK_SECONDS', 60)):
+            try:
+                result = compute()
+                cache.set(f'{CACHE_PREFIX}:result:{token}', result, _setting('COALESCE_RESULT_SECONDS', 10))
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        holder = cache.get(lock_key)
+        if holder is None:
+            # Released between our add and get; try to take it again
+            continue
+        result = _poll_result(lock_key, holder, deadline)
+        if result is not _MISSING:
+            return result
+
+    return compute()
+
+
+def single_flight(key, compute):
+    """
+    Return compute(), sharing one computation between concurrent callers.
+
+    Threads in this process asking for the same key while it is being
+    computed wait for that result instead of starting their own. The
+    thread doing the work also takes a cache lock, so requests on other
+    gunicorn workers (with a shared cache such as Redis) wait for it too.
+    Results are only shared between requests that overlap; nothing is
+    served once the computation has finished.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    try:
+        flight.result = _wait_for_worker(key, compute)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
@@ -0,0 +1,51 @@
+import hashlib
+from datetime import date
+from functools import wraps
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from . import versions
+
+
+def conditional(*families):
+    """
+    ETag / Last-Modified support for a read endpoint built only from the
+    given data families (see cages.versions).
+
+    The tag covers the path, the user, the query string, the day and the
+    family versions, so a client whose If-None-Match still matches gets a
+    304 before the view runs any of its own queries. Use it below
+    @api_view so request.user is the authenticated user.
+    """
+    def data_versions(request):
+        # etag and last_modified both need them; load them once per request
+        loaded = getattr(request, '_data_versions', None)
+        if loaded is None:
+            loaded = request._data_versions = versions.current(families)
+        return loaded
+
+    def etag(request, *args, **kwargs):
+        raw = '|'.join([
+            request.path, str(request.user.pk), request.GET.urlencode(),
+            date.today().isoformat(), versions.stamp(data_versions(request)),
+        ])
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+    def last_modified(request, *args, **kwargs):
+        stamps = [updated_at for _, updated_at in data_versions(request).values() if updated_at]
+        return max(stamps) if stamps else None
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                # Errors (403, bad cursors) must not be revalidated as cached
+                del response['ETag']
+                del response['Last-Modified']
+            # Clients may keep the body but must check back every time
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
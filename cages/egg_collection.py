@@ -0,0 +1,193 @@
+from collections import namedtuple
+from django.utils import timezone
+from .models import Egg, Notification
+
+EGGS_PER_TRAY = 30
+
+# The Egg rows for one day's collection and its totals
+Collection = namedtuple('Collection', ['eggs', 'total_eggs', 'shade_eggs', 'cage_eggs', 'trays'])
+
+
+class CollectionError(ValueError):
+    pass
+
+
+def already_recorded(user, collection_date):
+    return Egg.objects.filter(laid_date=collection_date, recorded_by=user).exists()
+
+
+def already_recorded_message(user, collection_date):
+    recorder_name = user.username or user.email
+    return f'Egg collection data has already been recorded for {collection_date} by {recorder_name}. Each date can only be recorded once per user.'
+
+
+def _egg_count(value, name):
+    # Whole, non-negative counts only; egg_count is a PositiveIntegerField
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise CollectionError(f'{name} must be a whole number of eggs, 0 or more')
+    return value
+
+
+def _box_counts(eggs_collected):
+    """{box_number: eggs} for one partition, the last entry for a box winning"""
+    box_eggs = {}
+    for egg_data in eggs_collected:
+        box_number = None
+        egg_count = 1
+
+        if isinstance(egg_data, dict):
+            if 'boxNumber' in egg_data:
+                box_number = egg_data['boxNumber']
+            elif 'box_number' in egg_data:
+                box_number = egg_data['box_number']
+
+            if 'value' in egg_data:
+                egg_count = egg_data['value']
+            elif 'count' in egg_data:
+                egg_count = egg_data['count']
+
+        if box_number:
+            box_eggs[box_number] = egg_count
+    return box_eggs
+
+
+def build_collection(user, collection_date, shade_eggs, cages_data):
+    """
+    Unsaved Egg rows for a daily collection payload.
+
+    Shade eggs become one record and each cage box one record, with the
+    count stored in egg_count. Raises CollectionError for an empty payload
+    or an egg count that isn't a whole number of 0 or more.
+    """
+    shade_eggs = _egg_count(shade_eggs, 'shade_eggs')
+    if shade_eggs <= 0 and not cages_data:
+        raise CollectionError('Cannot submit empty data. Please enter egg counts or shade eggs.')
+
+    eggs = []
+    total_eggs = shade_eggs
+
+    if shade_eggs > 0:
+        eggs.append(Egg(
+            chicken=None,  # Shade eggs aren't tied to specific chickens
+            laid_date=collection_date,
+            weight_g=0.0,  # Weight measured separately if needed
+            quality='Good',  # Assumed good quality for shade eggs
+            source='shade',
+            recorded_by=user,
+            egg_count=shade_eggs,
+            metadata={'egg_count': shade_eggs}
+        ))
+
+    for cage_data in cages_data:
+        cage_id = cage_data.get('cageId')
+        if not cage_id:
+            continue
+
+        for partition in cage_data.get('partitions', []):
+            partition_index = partition.get('partitionIndex')
+            for box_number, egg_count in _box_counts(partition.get('eggsCollected', [])).items():
+                egg_count = _egg_count(egg_count, f'Cage {cage_id} box {box_number}')
+                total_eggs += egg_count
+                eggs.append(Egg(
+                    chicken=None,
+                    laid_date=collection_date,
+                    weight_g=0.0,
+                    quality='Good',
+                    source='cage',
+                    cage_id=cage_id,
+                    partition_index=partition_index - 1,
+                    box_number=box_number,
+                    recorded_by=user,
+                    egg_count=egg_count,
+                    metadata={'egg_count': egg_count}
+                ))
+
+    return Collection(
+        eggs=eggs,
+        total_eggs=total_eggs,
+        shade_eggs=shade_eggs,
+        cage_eggs=total_eggs - shade_eggs,
+        trays=total_eggs // EGGS_PER_TRAY
+    )
+
+
+def notification_recipients(user):
+    """
+    Owners told about a collection: an owner recording their own collection
+    is notified themselves, a worker's collection goes to every owner.
+    """
+    from authentication.models import User
+    if user.role == 'owner':
+        return [user]
+    return list(User.objects.filter(role='owner'))
+
+
+def build_egg_collection_notification(owner, collection_date, recorder_name, total_eggs, cage_eggs, shade_eggs):
+    """
+    Build an unsaved egg collection Notification for an owner.
+
+    Callers writing several notifications at once can bulk_create the results.
+
+    Args:
+        owner: The User model instance (owner)
+        collection_date: Date of collection
+        recorder_name: Name of person who recorded the data
+        total_eggs: Total eggs collected
+        cage_eggs: Eggs from cages
+        shade_eggs: Eggs from shade
+    """
+    now = timezone.now()
+    collection_time = now.strftime('%I:%M %p')  # Format: 02:30 PM
+
+    title = f"🥚 Egg Collection Recorded - {collection_date}"
+    message = f"""
+{recorder_name} has recorded today's egg collection.
+
+⏰ Time Recorded: {collection_time}
+📅 Date: {collection_date}
+
+📊 Summary:
+• Total Eggs: {total_eggs}
+• Cage Eggs: {cage_eggs}
+• Shade Eggs: {shade_eggs}
+• Trays: {total_eggs // 30} full + {total_eggs % 30} remaining
+
+View details in the Recorded Data section.
+"""
+
+    metadata = {
+        'collection_date': str(collection_date),
+        'collection_time': collection_time,
+        'recorded_at': now.isoformat(),
+        'recorder_name': recorder_name,
+        'total_eggs': total_eggs,
+        'cage_eggs': cage_eggs,
+        'shade_eggs': shade_eggs,
+        'trays': total_eggs // 30
+    }
+
+    return Notification(
+        user=owner,
+        notification_type='egg_collection',
+        title=title,
+        message=message,
+        metadata=metadata
+    )
+
+
+def collection_notifications(user, collection_date, collection, recipients=None):
+    """Unsaved notifications for every owner who should hear about a collection"""
+    if recipients is None:
+        recipients = notification_recipients(user)
+    recorder_name = user.username or user.email or 'A team member'
+    return [
+        build_egg_collection_notification(
+            owner=owner,
+            collection_date=collection_date,
+            recorder_name=recorder_name,
+            total_eggs=collection.total_eggs,
+            cage_eggs=collection.cage_eggs,
+            shade_eggs=collection.shade_eggs
+        )
+        for owner in recipients
+    ]
@@ -0,0 +1,156 @@
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from authentication.authentication import user_for_token
+from . import versions
+from .models import Notification, StockMovement
+from .pubsub import hub
+
+# Families whose writes can produce events on the stream
+STREAM_FAMILIES = ('notifications', 'stock')
+
+NOTIFICATION_FIELDS = ('id', 'notification_type', 'title', 'message', 'is_read', 'created_at', 'metadata')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class StreamState:
+    """
+    What one connection has already sent: the newest notification and
+    stock movement ids, and the family versions seen at the last check.
+
+    The two ids double as the SSE event id ("<notification>.<movement>"),
+    so a reconnecting EventSource resumes from its Last-Event-ID.
+    """
+
+    def __init__(self, notification_id=0, movement_id=0):
+        self.notification_id = notification_id
+        self.movement_id = movement_id
+        self.versions = None
+        # The last check sent a full batch of notifications; more may be waiting
+        self.backlog = False
+
+    @property
+    def event_id(self):
+        return f'{self.notification_id}.{self.movement_id}'
+
+    @classmethod
+    def start(cls, user, last_event_id=None):
+        """State for a new connection; without a Last-Event-ID nothing old is replayed"""
+        try:
+            notification_id, movement_id = (int(part) for part in last_event_id.split('.'))
+            return cls(notification_id, movement_id)
+        except (AttributeError, ValueError):
+            pass
+        latest_notification = Notification.objects.filter(user=user).order_by('-id').values_list('id', flat=True).first()
+        latest_movement = StockMovement.objects.order_by('-id').values_list('id', flat=True).first()
+        return cls(latest_notification or 0, latest_movement or 0)
+
+
+def catch_up(user, state):
+    """
+    (event_type, data, event_id) for everything written since the state
+    was last updated.
+
+    One version lookup when nothing has changed; the notification and
+    stock queries only run for families whose version moved. Notifications
+    go out EVENT_STREAM_BATCH_SIZE at a time: after a full batch their
+    version is left unrecorded so the next check fetches the rest.
+    """
+    current = versions.current(STREAM_FAMILIES)
+    previous = state.versions or {}
+    state.versions = dict(current)
+    state.backlog = False
+    events = []
+
+    if current['notifications'] != previous.get('notifications'):
+        batch_size = _setting('EVENT_STREAM_BATCH_SIZE', 50)
+        rows = list(Notification.objects.filter(user=user, id__gt=state.notification_id).order_by('id').values(
+            *NOTIFICATION_FIELDS
+        )[:batch_size])
+        if len(rows) == batch_size:
+            state.versions['notifications'] = None
+            state.backlog = True
+        for row in rows:
+            state.notification_id = row['id']
+            events.append(('notification', row, state.event_id))
+            if row['notification_type'] == 'egg_collection':
+                events.append(('collection', row['metadata'], state.event_id))
+
+    if current['stock'] != previous.get('stock'):
+        movement = StockMovement.objects.order_by('-id').values(
+            'id', 'date', 'reason', 'change', 'balance_after'
+        ).first()
+        if movement and movement['id'] > state.movement_id:
+            state.movement_id = movement['id']
+            events.append(('store', {
+                'trays_in_stock': movement['balance_after'],
+                'change': movement['change'],
+                'reason': movement['reason'],
+                'date': movement['date'],
+            }, state.event_id))
+
+    return events
+
+
+def format_event(event_type, data, event_id):
+    payload = json.dumps(data, cls=DjangoJSONEncoder)
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+async def event_stream(user, last_event_id=None):
+    """
+    Server-sent events for an owner: new notifications, store changes and
+    submitted collections.
+
+    Writes in this process wake the stream straight away (see
+    cages.pubsub); writes in other workers are picked up by re-checking
+    the data versions every EVENT_STREAM_POLL_SECONDS. The stream ends
+    after EVENT_STREAM_MAX_SECONDS and the browser reconnects with its
+    Last-Event-ID, so no connection is held indefinitely.
+    """
+    poll_seconds = _setting('EVENT_STREAM_POLL_SECONDS', 5)
+    heartbeat_seconds = _setting('EVENT_STREAM_HEARTBEAT_SECONDS', 15)
+    deadline = time.monotonic() + _setting('EVENT_STREAM_MAX_SECONDS', 600)
+
+    subscription = hub.subscribe(STREAM_FAMILIES)
+    try:
+        state = await sync_to_async(StreamState.start)(user, last_event_id)
+        yield 'retry: 3000\n\n'
+        last_sent = time.monotonic()
+
+        # The first check sends anything missed since the Last-Event-ID
+        first_check = True
+        while time.monotonic() < deadline:
+            # Straight on after a full batch of notifications
+            if not first_check and not state.backlog:
+                await subscription.wait(poll_seconds)
+            first_check = False
+            events = await sync_to_async(catch_up)(user, state)
+            for event in events:
+                yield format_event(*event)
+            if events:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= heartbeat_seconds:
+                # Comment line; keeps proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+    finally:
+        hub.unsubscribe(subscription)
+
+
+async def token_user(request):
+    """
+    The user for a stream request, from the Authorization header or
+    ?token= (EventSource can't send headers). None if not authenticated.
+    """
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    key = auth_header[6:] if auth_header.startswith('Token ') else request.GET.get('token')
+    if not key:
+        return None
+    user = await sync_to_async(user_for_token)(key)
+    return user if user is not None and user.is_active else None
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor():
+    """
+    The bounded pool fan-out queries run on.
+
+    Each thread keeps its own database connection between requests, so
+    the pool size caps the extra connections one process opens.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'FANOUT_QUERY_THREADS', 8),
+                thread_name_prefix='query-fanout'
+            )
+    return _executor
+
+
+def _load(memo, key, loader):
+    # Drop a connection an earlier error left unusable before reusing it
+    if connection.connection is not None and connection.errors_occurred and not connection.is_usable():
+        connection.close()
+    return memo.get(key, loader)
+
+
+async def fan_out(memo, prefix, queries):
+    """
+    Run every loader in queries ({name: loader}) concurrently, storing the
+    results in memo under (prefix, name) as the summary builders expect.
+    """
+    run = sync_to_async(_load, thread_sensitive=False, executor=executor())
+    await asyncio.gather(*(run(memo, (prefix, name), loader) for name, loader in queries.items()))
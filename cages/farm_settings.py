@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import FarmSettings
+
+CACHE_KEY = 'cages:farm_settings'
+
+# Standard feed requirement per chicken when no farm setting exists
+DEFAULT_FEED_PER_CHICKEN_KG = 0.12
+
+
+def cache_timeout():
+    return getattr(settings, 'FARM_SETTINGS_CACHE_SECONDS', 60)
+
+
+def all_settings():
+    """
+    Every FarmSettings row as {key: value}, loaded in one query and cached.
+
+    The cache is cleared whenever a setting is saved or deleted (see
+    cages.signals), so readers only go to the database after a change.
+    """
+    values = cache.get(CACHE_KEY)
+    if values is None:
+        values = dict(FarmSettings.objects.values_list('key', 'value'))
+        cache.set(CACHE_KEY, values, cache_timeout())
+    return values
+
+
+def invalidate():
+    cache.delete(CACHE_KEY)
+
+
+def get_setting(key, default=None):
+    """Raw string value of a setting"""
+    return all_settings().get(key, default)
+
+
+def get_int(key, default=None):
+    """Setting as an int, or default when missing or not a whole number"""
+    try:
+        return int(all_settings()[key])
+    except (KeyError, ValueError, TypeError):
+        return default
+
+
+def get_float(key, default=None):
+    """Setting as a float, or default when missing or not a number"""
+    try:
+        return float(all_settings()[key])
+    except (KeyError, ValueError, TypeError):
+        return default
+
+
+def set_setting(key, value):
+    """Create or update a setting and drop the cached values"""
+    setting, created = FarmSettings.objects.update_or_create(key=key, defaults={'value': str(value)})
+    invalidate()
+    return setting
+
+
+def total_chickens(default=None):
+    """The total_chickens setting, or default when it isn't set"""
+    return get_int('total_chickens', default)
+
+
+def feed_per_chicken_daily_kg():
+    """Daily feed requirement per chicken in kg"""
+    return get_float('feed_per_chicken_daily_kg', DEFAULT_FEED_PER_CHICKEN_KG)
@@ -0,0 +1,98 @@
+from datetime import timedelta
+from django.db.models import Sum, Count, Avg, Q
+from .models import Sale, Expense, FeedPurchase, FeedConsumption
+
+# Feed purchases from this many days before a period are included when
+# working out the weighted average cost of the feed consumed in it
+FEED_COST_LOOKBACK_DAYS = 90
+
+
+def period_financials(start_date, end_date, cost_lookback_days=FEED_COST_LOOKBACK_DAYS):
+    """
+    Revenue, operating costs, capital expenses and feed inventory for a period.
+
+    Everything is computed with conditional aggregation in one query per
+    table (four queries in total), whatever the length of the period.
+
+    Args:
+        start_date: First day of the period (inclusive)
+        end_date: Last day of the period (inclusive)
+        cost_lookback_days: Days before start_date whose feed purchases count
+            towards the weighted average feed cost
+
+    Accounting rules:
+        - Feed purchases are capital expenses (inventory), not operating costs
+        - Feed consumption is costed at the weighted average purchase price
+        - Operating costs = feed consumption cost + non-feed expenses
+        - Profit/loss = revenue - operating costs
+    """
+    period = Q(date__gte=start_date, date__lte=end_date)
+    cost_window = Q(
+        date__gte=start_date - timedelta(days=cost_lookback_days),
+        date__lte=end_date
+    ) & ~Q(quantity_kg=0) & ~Q(total_cost=0)
+
+    sales = Sale.objects.filter(period).aggregate(
+        revenue=Sum('total_amount'),
+        trays_sold=Sum('trays_sold'),
+        count=Count('id'),
+        avg_price_per_tray=Avg('price_per_tray')
+    )
+    expenses = Expense.objects.filter(period).aggregate(
+        operating=Sum('amount', filter=~Q(expense_type='feed')),
+        total=Sum('amount'),
+        count=Count('id')
+    )
+    purchases = FeedPurchase.objects.aggregate(
+        capital=Sum('total_cost', filter=period),
+        bought=Sum('quantity_kg', filter=period),
+        count=Count('id', filter=period),
+        window_cost=Sum('total_cost', filter=cost_window),
+        window_qty=Sum('quantity_kg', filter=cost_window),
+        bought_all_time=Sum('quantity_kg')
+    )
+    consumption = FeedConsumption.objects.aggregate(
+        used=Sum('quantity_used_kg', filter=period),
+        count=Count('id', filter=period),
+        used_all_time=Sum('quantity_used_kg')
+    )
+
+    revenue = sales['revenue'] or 0
+    feed_used_kg = consumption['used'] or 0
+
+    # Weighted average cost per kg of recent feed purchases
+    avg_feed_cost_per_kg = None
+    if purchases['window_qty']:
+        avg_feed_cost_per_kg = purchases['window_cost'] / purchases['window_qty']
+
+    feed_cost = 0
+    if feed_used_kg > 0 and avg_feed_cost_per_kg is not None:
+        feed_cost = feed_used_kg * avg_feed_cost_per_kg
+
+    other_operating_expenses = expenses['operating'] or 0
+    operating_costs = feed_cost + other_operating_expenses
+    profit_loss = revenue - operating_costs
+
+    feed_bought_total = purchases['bought_all_time'] or 0
+    feed_used_total = consumption['used_all_time'] or 0
+
+    return {
+        'revenue': revenue,
+        'trays_sold': sales['trays_sold'] or 0,
+        'sales_count': sales['count'],
+        'avg_price_per_tray': sales['avg_price_per_tray'] or 0,
+        'feed_used_kg': feed_used_kg,
+        'feed_consumption_count': consumption['count'],
+        'avg_feed_cost_per_kg': avg_feed_cost_per_kg,
+        'feed_cost': feed_cost,
+        'other_operating_expenses': other_operating_expenses,
+        'expenses_total': expenses['total'] or 0,
+        'expense_count': expenses['count'],
+        'operating_costs': operating_costs,
+        'capital_expenses': purchases['capital'] or 0,
+        'feed_bought_kg': purchases['bought'] or 0,
+        'feed_purchase_count': purchases['count'],
+        'profit_loss': profit_loss,
+        'profit_margin': (profit_loss / revenue * 100) if revenue > 0 else 0,
+        'feed_remaining_kg': feed_bought_total - feed_used_total,
+    }
@@ -0,0 +1,145 @@
+from collections import namedtuple
+from django.db.models import Sum
+from .models import Cage, CageLayout
+
+LayoutSpec = namedtuple('LayoutSpec', ['cage_type', 'rows', 'columns', 'partitions'])
+
+STANDARD_LAYOUT = LayoutSpec('standard', 4, 4, 2)
+COMBINED_LAYOUT = LayoutSpec('combined', 4, 8, 2)
+
+# Box grid a cage of each type starts with
+TYPE_LAYOUTS = {spec.cage_type: spec for spec in (STANDARD_LAYOUT, COMBINED_LAYOUT)}
+
+
+def layout_spec(layout):
+    return LayoutSpec(layout.cage_type, layout.rows, layout.columns, layout.partitions)
+
+
+def cage_spec(cage):
+    """A cage's stored layout, or the standard one when it has none"""
+    try:
+        return layout_spec(cage.layout)
+    except CageLayout.DoesNotExist:
+        return STANDARD_LAYOUT
+
+
+def layout_for(spec, cage_type=None, **dimensions):
+    """
+    spec with the changes asked for: a new type starts from that type's
+    box grid, and dimensions not given keep their value.
+    """
+    if cage_type and cage_type != spec.cage_type:
+        spec = TYPE_LAYOUTS[cage_type]
+    return spec._replace(**{name: value for name, value in dimensions.items() if value is not None})
+
+
+def save_layout(cage, cage_type=None, **dimensions):
+    """Store a change to a cage's layout"""
+    spec = layout_for(cage_spec(cage), cage_type, **dimensions)
+    layout, created = CageLayout.objects.update_or_create(cage=cage, defaults=spec._asdict())
+    cage.layout = layout
+    return layout
+
+
+class BoxGrid:
+    """
+    Egg counts for one partition, stored densely row by row.
+
+    Box numbers run 1..rows*columns across each row in turn, so box b sits
+    at row (b - 1) // columns, column (b - 1) % columns. Counts for box
+    numbers outside the grid are kept in `overflow` so totals stay right.
+    """
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.counts = [0] * (rows * columns)
+        self.overflow = 0
+
+    def add(self, box_number, eggs):
+        if 1 <= box_number <= len(self.counts):
+            self.counts[box_number - 1] += eggs
+        else:
+            self.overflow += eggs
+
+    @property
+    def total(self):
+        return sum(self.counts) + self.overflow
+
+    def row(self, index):
+        start = index * self.columns
+        return self.counts[start:start + self.columns]
+
+    def boxes(self):
+        """[{'box': n, 'eggs': count}] in box order"""
+        return [{'box': number, 'eggs': eggs} for number, eggs in enumerate(self.counts, start=1)]
+
+
+class CageGrid:
+    """All partitions of one cage"""
+
+    def __init__(self, cage_id, spec):
+        self.cage_id = cage_id
+        self.spec = spec
+        self.partitions = [BoxGrid(spec.rows, spec.columns) for _ in range(spec.partitions)]
+
+    def partition(self, index):
+        return self.partitions[index] if 0 <= index < len(self.partitions) else None
+
+    @property
+    def total(self):
+        return sum(partition.total for partition in self.partitions)
+
+
+def cage_grids(user, fallback_cage_ids=()):
+    """
+    Empty grids for every cage the user owns, from one query.
+
+    A user without cages (e.g. an owner whose workers record eggs against
+    cages set up by someone else) gets grids for fallback_cage_ids instead.
+    Each grid follows its cage's CageLayout, standard when there is none.
+    """
+    cages = Cage.objects.filter(user=user).select_related('layout').order_by('id')
+    grids = {cage.id: CageGrid(cage.id, cage_spec(cage)) for cage in cages}
+
+    if not grids and fallback_cage_ids:
+        cages = Cage.objects.filter(id__in=fallback_cage_ids).select_related('layout')
+        specs = {cage.id: cage_spec(cage) for cage in cages}
+        grids = {
+            cage_id: CageGrid(cage_id, specs.get(cage_id, STANDARD_LAYOUT))
+            for cage_id in sorted(fallback_cage_ids)
+        }
+    return grids
+
+
+def fill_cage_grids(user, eggs):
+    """
+    The user's cage grids filled from an Egg queryset.
+
+    Uses one grouped query for the eggs, whatever the number of cages or boxes.
+    Returns (grids, shade_total, grand_total), grids being {cage_id: CageGrid}.
+    """
+    rows = list(eggs.values('source', 'cage_id', 'partition_index', 'box_number').annotate(
+        total=Sum('egg_count')
+    ).order_by())
+    # The cages eggs were recorded in stand in when the user owns none
+    recorded_in = {row['cage_id'] for row in rows if row['source'] != 'shade' and row['cage_id'] is not None}
+    grids = cage_grids(user, recorded_in)
+    shade_total = 0
+    grand_total = 0
+
+    for row in rows:
+        eggs_in_row = row['total'] or 0
+        grand_total += eggs_in_row
+        if row['source'] == 'shade':
+            shade_total += eggs_in_row
+            continue
+
+        grid = grids.get(row['cage_id'])
+        if grid is None or row['box_number'] is None:
+            continue
+        partition = grid.partition(row['partition_index'] or 0)
+        if partition is not None:
+            partition.add(row['box_number'], eggs_in_row)
+
+    return grids, shade_total, grand_total
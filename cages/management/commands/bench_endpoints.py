@@ -0,0 +1,248 @@
+import json
+import logging
+import math
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+import django
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import URLPattern, URLResolver, reverse
+from rest_framework.authtoken.models import Token
+from chicken_backend import metrics
+from cages import urls as cages_urls
+from cages.models import Cage, Egg, Notification
+from cages.report_jobs import request_report
+from cages.synthetic import seed_farm
+from .seed_farm import seed_owner
+
+# Routes that can't be timed as a single request
+SKIPPED_ROUTES = {
+    'notification-events': 'stream',
+}
+
+
+def cages_routes(patterns=None):
+    """(name, path parameter names) of every named route in cages.urls"""
+    for pattern in cages_urls.urlpatterns if patterns is None else patterns:
+        if isinstance(pattern, URLResolver):
+            yield from cages_routes(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            params = list(pattern.pattern.regex.groupindex)
+            # The router's .json/.api suffix variants repeat the plain routes
+            if 'format' not in params:
+                yield pattern.name, params
+
+
+def path_arguments(owner):
+    """Sample values for path parameters, from the seeded data"""
+    today = datetime.now().date()
+    job, created = request_report('sales', today - timedelta(days=30), today, owner)
+    return {
+        'cage': Cage.objects.filter(user=owner).values_list('id', flat=True).first(),
+        'egg': Egg.objects.filter(chicken__cage__user=owner).values_list('id', flat=True).first(),
+        'job_id': job.id,
+        'notification_id': Notification.objects.filter(user=owner).values_list('id', flat=True).first(),
+        'report_type': 'sales',
+    }
+
+
+def route_path(name, params, samples):
+    kwargs = {}
+    for param in params:
+        # Router detail routes name their parameter pk, e.g. cage-detail
+        value = samples.get(name.split('-')[0] if param == 'pk' else param)
+        if value is None:
+            return None
+        kwargs[param] = value
+    return reverse(name, kwargs=kwargs)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time every GET endpoint in cages.urls against synthetic farms of several sizes, '
+        'in a throwaway test database, and compare with a saved baseline'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', default='1,3,10', help='Comma separated farm ages to test (default 1,3,10)')
+        parser.add_argument('--cages', type=int, default=4, help='Cages in each synthetic farm (default 4)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed for the synthetic data')
+        parser.add_argument('--runs', type=int, default=10, help='Timed requests per endpoint (default 10)')
+        parser.add_argument('--warm-cache', action='store_true', help='Keep the cache between requests')
+        parser.add_argument('--only', action='append', help='Only time this route name. Can be given more than once.')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Baseline JSON file from an earlier run to compare against')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Fractional median slowdown counted as a regression (default 0.2)'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=5.0,
+            help='Slowdowns smaller than this are treated as noise (default 5)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [float(value) for value in options['years'].split(',')]
+        except ValueError:
+            raise CommandError('--years must be comma separated numbers, e.g. 1,3,10')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        report = {
+            'meta': {
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'cages': options['cages'],
+                'seed': options['seed'],
+                'runs': options['runs'],
+                'warm_cache': options['warm_cache'],
+                'seed_seconds': {},
+            },
+            'results': {},
+        }
+
+        setup_test_environment()
+        # A throwaway test database and report storage; the real data is never touched
+        old_config = setup_databases(verbosity=0, interactive=False)
+        media = tempfile.TemporaryDirectory(prefix='bench-endpoints-')
+        media_settings = override_settings(MEDIA_ROOT=media.name)
+        media_settings.enable()
+        # 404 and 405 answers from probing the routes are expected
+        request_logger = logging.getLogger('django.request')
+        request_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            for years in sizes:
+                label = f'{years:g}'
+                self.stdout.write(self.style.MIGRATE_HEADING(f'{label} years of data'))
+                report['results'][label] = self.bench_size(years, label, options, report['meta'])
+        finally:
+            request_logger.setLevel(request_level)
+            media_settings.disable()
+            media.cleanup()
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, sort_keys=True)
+            self.stdout.write(f'Wrote {options["output"]}')
+
+        if baseline:
+            regressions = self.compare(baseline, report, options)
+            if regressions:
+                raise CommandError(f'{regressions} endpoint(s) regressed against {options["compare"]}')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}'))
+
+    def bench_size(self, years, label, options, meta):
+        # Starts from an empty database each time
+        call_command('flush', interactive=False, verbosity=0)
+        cache.clear()
+        started = time.perf_counter()
+        owner = seed_owner('bench-owner@example.com')
+        seed_farm(owner, round(years * 365), options['cages'], options['seed'])
+        meta['seed_seconds'][label] = round(time.perf_counter() - started, 2)
+
+        client = Client(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=owner).key}')
+        samples = path_arguments(owner)
+        results = {}
+        with override_settings(METRICS_SLOW_REQUEST_MS=10 ** 9):
+            for name, params in cages_routes():
+                if options['only'] and name not in options['only']:
+                    continue
+                result = self.bench_route(client, name, params, samples, options)
+                results[name] = result
+                self.write_result(name, result)
+        return results
+
+    def bench_route(self, client, name, params, samples, options):
+        if name in SKIPPED_ROUTES:
+            return {'skipped': SKIPPED_ROUTES[name]}
+        path = route_path(name, params, samples)
+        if path is None:
+            return {'skipped': 'no sample data for its path parameters'}
+
+        timings = []
+        queries = []
+        status = None
+        # The first request warms imports and connections and is not counted
+        for run in range(options['runs'] + 1):
+            if not options['warm_cache']:
+                cache.clear()
+            metrics.registry.clear()
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - started
+            if response.status_code == 405:
+                return {'path': path, 'skipped': 'not a GET endpoint'}
+            status = response.status_code
+            if run:
+                timings.append(elapsed * 1000)
+                queries.append(sum(
+                    histogram.total for (metric, _), histogram in metrics.registry.histograms.items()
+                    if metric == 'http_request_db_queries'
+                ))
+
+        return {
+            'path': path,
+            'status': status,
+            'median_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'queries': statistics.median(queries),
+        }
+
+    def write_result(self, name, result):
+        if 'skipped' in result:
+            self.stdout.write(f'  {name:<36} skipped ({result["skipped"]})')
+            return
+        line = (
+            f'  {name:<36} {result["status"]}  median {result["median_ms"]:8.2f}ms  '
+            f'p95 {result["p95_ms"]:8.2f}ms  {result["queries"]:g} queries'
+        )
+        self.stdout.write(line if result['status'] < 400 else self.style.WARNING(line))
+
+    def compare(self, baseline, report, options):
+        """Print slowdowns and query growth against the baseline; returns how many regressed"""
+        regressions = 0
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared with {options["compare"]}'))
+        for label, results in report['results'].items():
+            previous_results = baseline.get('results', {}).get(label, {})
+            for name, result in results.items():
+                previous = previous_results.get(name)
+                if not previous or 'median_ms' not in previous or 'median_ms' not in result:
+                    continue
+                delta = result['median_ms'] - previous['median_ms']
+                slower = (
+                    result['median_ms'] > previous['median_ms'] * (1 + options['threshold'])
+                    and delta > options['min_delta_ms']
+                )
+                more_queries = result['queries'] > previous['queries']
+                if not (slower or more_queries):
+                    continue
+                regressions += 1
+                self.stdout.write(self.style.ERROR(
+                    f'  {label} years {name}: median {previous["median_ms"]:.2f}ms -> {result["median_ms"]:.2f}ms, '
+                    f'queries {previous["queries"]:g} -> {result["queries"]:g}'
+                ))
+        return regressions
@@ -0,0 +1,92 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Run in a fresh interpreter: load the web application the way a worker
+# does, then answer one request through it
+WORKER_SCRIPT = '''
+import json, time
+started = time.perf_counter()
+from chicken_backend.{module} import application
+loaded = time.perf_counter()
+{request}
+print(json.dumps({{'load': loaded - started, 'first_request': time.perf_counter() - loaded, 'status': status}}))
+'''
+
+WSGI_REQUEST = '''
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': '/readyz/', 'REQUEST_METHOD': 'GET'}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(environ, lambda status, headers: statuses.append(status)))
+status = int(statuses[0].split()[0])
+'''
+
+ASGI_REQUEST = '''
+import asyncio
+messages = []
+async def receive():
+    return {'type': 'http.request', 'body': b'', 'more_body': False}
+async def send(message):
+    messages.append(message)
+scope = {
+    'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+    'scheme': 'http', 'path': '/readyz/', 'raw_path': b'/readyz/', 'query_string': b'',
+    'headers': [(b'host', b'127.0.0.1')], 'server': ('127.0.0.1', 8000), 'client': ('127.0.0.1', 1),
+}
+asyncio.run(application(scope, receive, send))
+status = messages[0]['status']
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure worker time-to-first-request, starting several workers at once like gunicorn'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Workers started together per round (default 4)')
+        parser.add_argument('--rounds', type=int, default=3, help='Rounds to run (default 3)')
+        parser.add_argument('--module', choices=['asgi', 'wsgi'], default='asgi', help='Application to load (default asgi)')
+
+    def start_worker(self, script):
+        env = os.environ.copy()
+        # The probe request comes from 127.0.0.1
+        env['ALLOWED_HOSTS'] = ','.join(filter(None, [env.get('ALLOWED_HOSTS'), '127.0.0.1']))
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=settings.BASE_DIR, env=env)
+        total = time.perf_counter() - started
+        if result.returncode != 0:
+            return {'error': result.stderr.strip().splitlines()[-1:] or ['exit status %d' % result.returncode]}
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        timings['total'] = total
+        return timings
+
+    def handle(self, *args, **options):
+        request = ASGI_REQUEST if options['module'] == 'asgi' else WSGI_REQUEST
+        script = WORKER_SCRIPT.format(module=options['module'], request=request)
+        totals = []
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for round_number in range(1, options['rounds'] + 1):
+                results = list(pool.map(self.start_worker, [script] * options['workers']))
+                for worker, timings in enumerate(results, 1):
+                    if 'error' in timings:
+                        self.stdout.write(self.style.ERROR(f'round {round_number} worker {worker}: {timings["error"][0]}'))
+                        continue
+                    totals.append(timings['total'])
+                    self.stdout.write(
+                        f'round {round_number} worker {worker}: ready {timings["total"]:.3f}s '
+                        f'(load {timings["load"]:.3f}s, first request {timings["first_request"] * 1000:.1f}ms, '
+                        f'status {timings["status"]})'
+                    )
+
+        if totals:
+            self.stdout.write(self.style.SUCCESS(
+                f'time to first request over {len(totals)} workers: '
+                f'median {statistics.median(totals):.3f}s, max {max(totals):.3f}s'
+            ))
@@ -0,0 +1,30 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from cages.rollups import rebuild_egg_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the DailyEggRollup table from existing Egg records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            action='append',
+            dest='dates',
+            help='Only rebuild this date (YYYY-MM-DD). Can be given more than once.'
+        )
+
+    def handle(self, *args, **options):
+        dates = None
+        if options['dates']:
+            try:
+                dates = [datetime.strptime(value, '%Y-%m-%d').date() for value in options['dates']]
+            except ValueError:
+                raise CommandError('Invalid date format. Use YYYY-MM-DD.')
+
+        with transaction.atomic():
+            rows = rebuild_egg_rollups(dates)
+
+        scope = ', '.join(str(d) for d in dates) if dates else 'all dates'
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} egg rollup rows for {scope}'))
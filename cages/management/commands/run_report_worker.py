@@ -0,0 +1,40 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from cages.report_jobs import claim_job, run_job, prune_artifacts
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF report jobs from the ReportJob table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs that are queued now, then exit'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between checks when the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        pruned = prune_artifacts()
+        if pruned:
+            self.stdout.write(f'Pruned {pruned} old report artifacts')
+
+        while True:
+            close_old_connections()
+            job = claim_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            if run_job(job):
+                self.stdout.write(self.style.SUCCESS(f'Rendered {job}'))
+            else:
+                self.stderr.write(self.style.ERROR(f'Failed {job}'))
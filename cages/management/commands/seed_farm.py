@@ -0,0 +1,59 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from authentication.models import User
+from cages.models import Egg
+from cages.synthetic import seed_farm
+
+
+def seed_owner(email):
+    """The approved owner synthetic data is written for, created if missing"""
+    owner, created = User.objects.get_or_create(email=email, defaults={
+        'username': email.split('@')[0], 'role': 'owner', 'is_approved': True, 'farm_name': 'Synthetic Farm',
+    })
+    if created:
+        owner.set_password('synthetic-farm')
+        owner.save()
+    return owner
+
+
+class Command(BaseCommand):
+    help = 'Fill the database with years of synthetic farm history for benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=float, default=1, help='Years of daily history to write (default 1)')
+        parser.add_argument('--cages', type=int, default=4, help='Cages to create (default 4)')
+        parser.add_argument('--seed', type=int, default=1, help='Random seed; the same seed builds the same farm')
+        parser.add_argument('--end-date', help='Last day of history (YYYY-MM-DD, default today)')
+        parser.add_argument(
+            '--owner',
+            default='synthetic-owner@example.com',
+            help='Email of the owner the data belongs to, created if missing'
+        )
+        parser.add_argument(
+            '--allow-existing',
+            action='store_true',
+            help='Seed even though the database already holds egg records'
+        )
+
+    def handle(self, *args, **options):
+        days = round(options['years'] * 365)
+        if days < 1 or options['cages'] < 1:
+            raise CommandError('--years and --cages must be positive.')
+
+        end_date = None
+        if options['end_date']:
+            try:
+                end_date = datetime.strptime(options['end_date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Invalid date format. Use YYYY-MM-DD.')
+
+        if not options['allow_existing'] and Egg.objects.exists():
+            raise CommandError('The database already has egg records; use --allow-existing to add to them.')
+
+        result = seed_farm(seed_owner(options['owner']), days, options['cages'], options['seed'], end_date)
+
+        for model, count in sorted(result.counts.items()):
+            self.stdout.write(f'{model}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {result.days} days for {result.cages} cages ({result.hens} hens) owned by {options["owner"]}'
+        ))
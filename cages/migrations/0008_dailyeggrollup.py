@@ -0,0 +1,61 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:27
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def count_from_metadata(metadata):
+    if not metadata or not isinstance(metadata, dict):
+        return 1
+    if 'egg_count' in metadata:
+        count = metadata['egg_count']
+        return int(count) if isinstance(count, (int, float)) else 0
+    return sum(int(count) for count in metadata.values() if isinstance(count, (int, float)))
+
+
+def backfill_rollups(apps, schema_editor):
+    Egg = apps.get_model('cages', 'Egg')
+    DailyEggRollup = apps.get_model('cages', 'DailyEggRollup')
+
+    totals = defaultdict(lambda: [0, 0])
+    rows = Egg.objects.values_list('laid_date', 'source', 'cage_id', 'partition_index', 'metadata')
+    for laid_date, source, cage_id, partition_index, metadata in rows.iterator():
+        key = (laid_date, source, cage_id, partition_index)
+        totals[key][0] += count_from_metadata(metadata)
+        totals[key][1] += 1
+
+    DailyEggRollup.objects.bulk_create([
+        DailyEggRollup(
+            date=laid_date, source=source, cage_id=cage_id, partition_index=partition_index,
+            egg_count=egg_count, record_count=record_count
+        )
+        for (laid_date, source, cage_id, partition_index), (egg_count, record_count) in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0007_egg_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyEggRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('source', models.CharField(default='cage', max_length=50)),
+                ('cage_id', models.IntegerField(blank=True, null=True)),
+                ('partition_index', models.IntegerField(blank=True, null=True)),
+                ('egg_count', models.IntegerField(default=0)),
+                ('record_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'source'], name='cages_rollup_date_source_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
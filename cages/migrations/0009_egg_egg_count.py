@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:28
+
+from django.db import migrations, models
+
+
+def count_from_metadata(metadata):
+    if not metadata or not isinstance(metadata, dict):
+        # Legacy records were created one per egg
+        return 1
+    if 'egg_count' in metadata:
+        # New format: {'egg_count': 4}
+        count = metadata['egg_count']
+        return max(int(count), 0) if isinstance(count, (int, float)) else 0
+    # Old format: {box: count, ...}
+    return sum(max(int(count), 0) for count in metadata.values() if isinstance(count, (int, float)))
+
+
+def backfill_egg_count(apps, schema_editor):
+    Egg = apps.get_model('cages', 'Egg')
+
+    batch = []
+    for egg in Egg.objects.only('id', 'metadata').iterator(chunk_size=2000):
+        egg_count = count_from_metadata(egg.metadata)
+        if egg_count != 1:
+            egg.egg_count = egg_count
+            batch.append(egg)
+        if len(batch) >= 2000:
+            Egg.objects.bulk_update(batch, ['egg_count'])
+            batch = []
+    if batch:
+        Egg.objects.bulk_update(batch, ['egg_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0008_dailyeggrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='egg',
+            name='egg_count',
+            field=models.PositiveIntegerField(db_index=True, default=1),
+        ),
+        migrations.RunPython(backfill_egg_count, migrations.RunPython.noop),
+    ]
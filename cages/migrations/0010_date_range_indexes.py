@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cages', '0009_egg_egg_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='egg',
+            index=models.Index(fields=['laid_date', 'recorded_by'], name='cages_egg_date_recorder_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='egg',
+            index=models.Index(fields=['laid_date', 'source', 'cage_id', 'partition_index', 'box_number'], name='cages_egg_date_location_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date', 'expense_type'], name='cages_expense_date_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedconsumption',
+            index=models.Index(fields=['date'], name='cages_feedconsumption_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedpurchase',
+            index=models.Index(fields=['date'], name='cages_feedpurchase_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalrecord',
+            index=models.Index(fields=['date'], name='cages_medicalrecord_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read', 'created_at'], name='cages_notif_user_read_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date'], name='cages_sale_date_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def record_opening_balance(apps, schema_editor):
+    """Start the ledger with whatever the store already holds"""
+    Store = apps.get_model('cages', 'Store')
+    StockMovement = apps.get_model('cages', 'StockMovement')
+    store = Store.objects.filter(id=1).first()
+    if store and store.trays_in_stock:
+        StockMovement.objects.create(
+            date=timezone.now().date(),
+            reason='adjustment',
+            change=store.trays_in_stock,
+            balance_after=store.trays_in_stock
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cages', '0010_date_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('reason', models.CharField(choices=[('collection', 'Daily Collection'), ('sale', 'Sale'), ('reset', 'Reset'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('change', models.IntegerField()),
+                ('balance_after', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('sale', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='cages.sale')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['date'], name='cages_stockmove_date_idx')],
+            },
+        ),
+        migrations.RunPython(record_opening_balance, migrations.RunPython.noop),
+    ]
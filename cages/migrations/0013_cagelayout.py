@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_layouts(apps, schema_editor):
+    """Cage 2 is the farm's combined 4x8 cage; every other cage is a standard 4x4"""
+    Cage = apps.get_model('cages', 'Cage')
+    CageLayout = apps.get_model('cages', 'CageLayout')
+    CageLayout.objects.bulk_create([
+        CageLayout(cage_id=cage_id, cage_type='combined', rows=4, columns=8)
+        if cage_id == 2 else
+        CageLayout(cage_id=cage_id, cage_type='standard', rows=4, columns=4)
+        for cage_id in Cage.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0012_reportjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CageLayout',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cage_type', models.CharField(choices=[('standard', 'Standard'), ('combined', 'Combined')], default='standard', max_length=20)),
+                ('rows', models.PositiveSmallIntegerField(default=4)),
+                ('columns', models.PositiveSmallIntegerField(default=4)),
+                ('partitions', models.PositiveSmallIntegerField(default=2)),
+                ('cage', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='layout', to='cages.cage')),
+            ],
+        ),
+        migrations.RunPython(create_layouts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:45
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('cages', '0013_cagelayout'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64)),
+                ('operation_type', models.CharField(choices=[('collection', 'Egg Collection'), ('sale', 'Sale'), ('feed_consumption', 'Feed Consumption'), ('expense', 'Expense')], max_length=20)),
+                ('result', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_operations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='syncoperation',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='cages_syncop_user_key_uniq'),
+        ),
+    ]
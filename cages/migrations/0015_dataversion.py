@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 00:49
+
+from django.db import migrations, models
+
+
+def create_versions(apps, schema_editor):
+    """Start every data family at version 1"""
+    DataVersion = apps.get_model('cages', 'DataVersion')
+    DataVersion.objects.bulk_create([
+        DataVersion(family=family, version=1)
+        for family in ('eggs', 'sales', 'expenses', 'feed', 'settings', 'stock', 'flock')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0014_syncoperation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('family', models.CharField(max_length=30, unique=True)),
+                ('version', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
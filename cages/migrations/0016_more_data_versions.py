@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def create_versions(apps, schema_editor):
+    """Version rows for the families conditional GETs are based on"""
+    DataVersion = apps.get_model('cages', 'DataVersion')
+    for family in ('medical', 'notifications'):
+        DataVersion.objects.get_or_create(family=family, defaults={'version': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0015_dataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
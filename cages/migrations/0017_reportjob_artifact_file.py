@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+def drop_finished_jobs(apps, schema_editor):
+    """Artifacts held in the database are dropped; the reports are rendered again on request"""
+    ReportJob = apps.get_model('cages', 'ReportJob')
+    ReportJob.objects.filter(status__in=['done', 'failed']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0016_more_data_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_finished_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='reportjob',
+            name='artifact',
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='artifact',
+            field=models.FileField(blank=True, max_length=255, upload_to='reports/'),
+        ),
+    ]
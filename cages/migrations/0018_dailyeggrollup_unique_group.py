@@ -0,0 +1,40 @@
+from django.db import migrations, models
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def rebuild_rollups(apps, schema_editor):
+    """Concurrent rebuilds may have left duplicate groups; recount them from the eggs"""
+    Egg = apps.get_model('cages', 'Egg')
+    DailyEggRollup = apps.get_model('cages', 'DailyEggRollup')
+
+    totals = Egg.objects.values('laid_date', 'source', 'cage_id', 'partition_index').annotate(
+        total=Sum('egg_count'), records=Count('id')
+    ).order_by()
+    DailyEggRollup.objects.all().delete()
+    DailyEggRollup.objects.bulk_create([
+        DailyEggRollup(
+            date=row['laid_date'], source=row['source'], cage_id=row['cage_id'],
+            partition_index=row['partition_index'], egg_count=row['total'] or 0, record_count=row['records']
+        )
+        for row in totals
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cages', '0017_reportjob_artifact_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='dailyeggrollup',
+            constraint=models.UniqueConstraint(
+                models.F('date'), models.F('source'),
+                Coalesce('cage_id', Value(-1)), Coalesce('partition_index', Value(-1)),
+                name='cages_rollup_group_unique',
+            ),
+        ),
+    ]
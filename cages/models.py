@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from authentication.models import User
 
 class Cage(models.Model):
@@ -12,6 +14,22 @@ class Cage(models.Model):
     def __str__(self):
         return f"{self.name} - {self.user.farm_name}"
 
+class CageLayout(models.Model):
+    """Box grid of a cage: each partition has rows x columns boxes numbered row by row"""
+    CAGE_TYPES = [
+        ('standard', 'Standard'),
+        ('combined', 'Combined'),
+    ]
+
+    cage = models.OneToOneField(Cage, on_delete=models.CASCADE, related_name='layout')
+    cage_type = models.CharField(max_length=20, choices=CAGE_TYPES, default='standard')
+    rows = models.PositiveSmallIntegerField(default=4)
+    columns = models.PositiveSmallIntegerField(default=4)
+    partitions = models.PositiveSmallIntegerField(default=2)  # 0 = front, 1 = back
+
+    def __str__(self):
+        return f"{self.cage.name}: {self.partitions} x {self.rows}x{self.columns} boxes"
+
 class Chicken(models.Model):
     GENDER_CHOICES = [
         ('M', 'Male'),
@@ -42,14 +60,53 @@ class Egg(models.Model):
     box_number = models.IntegerField(null=True, blank=True)  # Store box number (1-4 or 1-8 depending on cage type)
     recorded_by = models.ForeignKey('authentication.User', on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    egg_count = models.PositiveIntegerField(default=1, db_index=True)  # Number of eggs this record stands for
     metadata = models.JSONField(blank=True, default=dict)  # Store additional data like egg count
 
+    class Meta:
+        indexes = [
+            # Per-user duplicate checks and reminders
+            models.Index(fields=['laid_date', 'recorded_by'], name='cages_egg_date_recorder_idx'),
+            # Collection tables and per-cage breakdowns
+            models.Index(
+                fields=['laid_date', 'source', 'cage_id', 'partition_index', 'box_number'],
+                name='cages_egg_date_location_idx'
+            ),
+        ]
+
     def __str__(self):
         if self.chicken:
             return f"Egg from {self.chicken.tag_id} on {self.laid_date}"
         else:
             return f"{self.source.title()} egg on {self.laid_date}"
 
+
+class DailyEggRollup(models.Model):
+    """Pre-summed egg counts per day, source, cage and partition"""
+    date = models.DateField()
+    source = models.CharField(max_length=50, default='cage')
+    cage_id = models.IntegerField(null=True, blank=True)
+    partition_index = models.IntegerField(null=True, blank=True)
+    egg_count = models.IntegerField(default=0)
+    record_count = models.IntegerField(default=0)  # Number of Egg rows summed into egg_count
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'source'], name='cages_rollup_date_source_idx'),
+        ]
+        constraints = [
+            # One row per group. Shade eggs have no cage or partition; the
+            # coalesce makes those NULLs collide too (Django 4.2 has no nulls_distinct)
+            models.UniqueConstraint(
+                'date', 'source', Coalesce('cage_id', Value(-1)), Coalesce('partition_index', Value(-1)),
+                name='cages_rollup_group_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source.title()} eggs on {self.date}: {self.egg_count}"
+
 class Store(models.Model):
     """Egg stock management in trays"""
     trays_in_stock = models.IntegerField(default=0)
@@ -62,6 +119,32 @@ class Store(models.Model):
     def __str__(self):
         return f"Store: {self.trays_in_stock} trays"
 
+class StockMovement(models.Model):
+    """Ledger of every change to the Store tray count"""
+    REASON_CHOICES = [
+        ('collection', 'Daily Collection'),
+        ('sale', 'Sale'),
+        ('reset', 'Reset'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    date = models.DateField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    change = models.IntegerField()  # Positive when trays come in, negative when they go out
+    balance_after = models.IntegerField()
+    sale = models.ForeignKey('Sale', on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_movements')
+    recorded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['date'], name='cages_stockmove_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_reason_display()}: {self.change:+d} trays on {self.date}"
+
 class FeedPurchase(models.Model):
     """Weekly feed purchases"""
     date = models.DateField()
@@ -71,6 +154,11 @@ class FeedPurchase(models.Model):
     cost_per_kg = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='cages_feedpurchase_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         if self.quantity_kg and self.total_cost:
             self.cost_per_kg = self.total_cost / self.quantity_kg
@@ -85,6 +173,11 @@ class FeedConsumption(models.Model):
     quantity_used_kg = models.DecimalField(max_digits=8, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='cages_feedconsumption_date_idx'),
+        ]
+
     def __str__(self):
         return f"Feed Used: {self.quantity_used_kg}kg on {self.date}"
 
@@ -96,6 +189,11 @@ class Sale(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='cages_sale_date_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.total_amount = self.trays_sold * self.price_per_tray
         super().save(*args, **kwargs)
@@ -118,6 +216,11 @@ class Expense(models.Model):
     recorded_by = models.ForeignKey('authentication.User', on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'expense_type'], name='cages_expense_date_type_idx'),
+        ]
+
     def __str__(self):
         return f"{self.expense_type.title()}: {self.amount} on {self.date}"
 
@@ -142,6 +245,11 @@ class MedicalRecord(models.Model):
     recorded_by = models.ForeignKey('authentication.User', on_delete=models.SET_NULL, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date'], name='cages_medicalrecord_date_idx'),
+        ]
+
     def __str__(self):
         chicken_info = f"Chicken {self.chicken.tag_id}" if self.chicken else "General"
         return f"{chicken_info}: {self.treatment_type.title()} on {self.date}"
@@ -164,7 +272,8 @@ class Notification(models.Model):
         ('system', 'System Notification'),
     ]
     
-    user = models.ForeignKey('authentication.User', on_delete=models.CASCADE, related_name='notifications')
+    # Lookups by user are served by the (user, is_read, created_at) index below
+    user = models.ForeignKey('authentication.User', on_delete=models.CASCADE, related_name='notifications', db_index=False)
     notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES)
     title = models.CharField(max_length=200)
     message = models.TextField()
@@ -174,6 +283,97 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'is_read', 'created_at'], name='cages_notif_user_read_idx'),
+        ]
 
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+
+
+class ReportJob(models.Model):
+    """A PDF report rendered off the request path, with its stored artifact"""
+    REPORT_TYPES = [
+        ('sales', 'Sales'),
+        ('expenses', 'Expenses'),
+        ('feed', 'Feed'),
+        ('egg-collection-table', 'Egg Collection Table'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    report_type = models.CharField(max_length=30, choices=REPORT_TYPES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    # Set for reports whose content depends on who asks (the egg collection table)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    # Hash of the source data the report was built from; an artifact is
+    # reused only while the fingerprint still matches
+    fingerprint = models.CharField(max_length=64)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True)
+    # The rendered PDF, in default storage (MEDIA_ROOT) rather than the database
+    artifact = models.FileField(upload_to='reports/', max_length=255, blank=True)
+    filename = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['report_type', 'start_date', 'end_date', 'fingerprint'], name='cages_reportjob_key_idx'),
+            models.Index(fields=['status', 'created_at'], name='cages_reportjob_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.report_type} report {self.start_date} to {self.end_date} ({self.status})"
+
+
+class SyncOperation(models.Model):
+    """
+    An operation applied through the batch sync endpoint.
+
+    Clients send a key they generated with each queued operation; the key
+    is stored with the result so a retried batch replays the earlier
+    result instead of recording the operation twice.
+    """
+    OPERATION_TYPES = [
+        ('collection', 'Egg Collection'),
+        ('sale', 'Sale'),
+        ('feed_consumption', 'Feed Consumption'),
+        ('expense', 'Expense'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_operations')
+    idempotency_key = models.CharField(max_length=64)
+    operation_type = models.CharField(max_length=20, choices=OPERATION_TYPES)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='cages_syncop_user_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.operation_type} {self.idempotency_key} by {self.user}"
+
+
+class DataVersion(models.Model):
+    """
+    A counter per family of farm data (eggs, sales, feed, ...), bumped on
+    every write to that family. Cached responses are keyed by the versions
+    they were built from, so a bump makes them miss.
+    """
+    family = models.CharField(max_length=30, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.family} v{self.version}"
@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import date as date_type
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from .streaming import StreamingResponse
+
+# Newest first; id breaks ties between rows on the same date
+KEYSET_ORDERING = ('-date', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def history_page_size(request):
+    """Page size from ?page_size=, capped at HISTORY_MAX_PAGE_SIZE"""
+    default = getattr(settings, 'HISTORY_PAGE_SIZE', 200)
+    maximum = getattr(settings, 'HISTORY_MAX_PAGE_SIZE', 1000)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (ValueError, TypeError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(row):
+    raw = f"{row['date'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Turn a cursor back into the (date, id) of the last row already seen"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        day, row_id = raw.split('|')
+        return date_type.fromisoformat(day), int(row_id)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def after_cursor(queryset, cursor):
+    """Rows that come after the cursor in (-date, -id) order"""
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    if not cursor:
+        return queryset
+    last_date, last_id = decode_cursor(cursor)
+    return queryset.filter(Q(date__lt=last_date) | Q(date=last_date, id__lt=last_id))
+
+
+def keyset_page(queryset, fields, request, cursor_param='cursor'):
+    """
+    One page of queryset.values(*fields), newest first.
+
+    Returns (rows, pagination), where pagination holds the cursor for the
+    next page (None on the last page). Raises InvalidCursor for a cursor
+    that wasn't produced by this module.
+    """
+    size = history_page_size(request)
+    rows = list(after_cursor(queryset, request.GET.get(cursor_param)).values(*fields)[:size + 1])
+    has_more = len(rows) > size
+    rows = rows[:size]
+    return rows, {
+        'page_size': size,
+        'has_more': has_more,
+        'next_cursor': encode_cursor(rows[-1]) if has_more else None,
+    }
+
+
+def wants_ndjson(request):
+    return request.GET.get('stream') == 'ndjson'
+
+
+def iter_rows(queryset, fields, cursor=None, extra=None):
+    """
+    Lazily iterate queryset.values(*fields) in chunks, newest first.
+
+    The cursor is checked straight away so a bad one can still be answered
+    with a 400 before any of the stream is sent.
+    """
+    chunk_size = getattr(settings, 'HISTORY_STREAM_CHUNK_SIZE', 500)
+    rows = after_cursor(queryset, cursor).values(*fields).iterator(chunk_size=chunk_size)
+    if extra:
+        return ({**row, **extra} for row in rows)
+    return rows
+
+
+def ndjson_response(rows):
+    """Stream rows as newline-delimited JSON, one object per line"""
+    lines = (json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+    return StreamingResponse(lines, content_type='application/x-ndjson')
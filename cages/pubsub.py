@@ -0,0 +1,59 @@
+import threading
+import asyncio
+
+
+class Subscription:
+    """One open event stream waiting to be woken"""
+
+    def __init__(self, families):
+        self.families = set(families)
+        self.loop = asyncio.get_running_loop()
+        self.changed = asyncio.Event()
+
+    async def wait(self, timeout):
+        """True if woken before the timeout"""
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.changed.clear()
+        return True
+
+
+class Hub:
+    """
+    In-process wake-ups for open event streams.
+
+    Writers call publish() (from any thread) after committing; streams in
+    this process subscribed to one of the families are woken and re-read
+    the database. Streams in other worker processes are not reached and
+    find the change when they next poll.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, families):
+        subscription = Subscription(families)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, families):
+        families = set(families)
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.families & families]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.changed.set)
+            except RuntimeError:
+                # Its event loop has closed
+                self.unsubscribe(subscription)
+
+
+hub = Hub()
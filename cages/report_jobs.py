@@ -0,0 +1,276 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction, close_old_connections, connection
+from django.db.models import Sum, Count, Max, Q
+from django.utils import timezone
+from . import farm_settings, versions
+from .finance import FEED_COST_LOOKBACK_DAYS
+from .models import Cage, Chicken, Egg, Sale, Expense, FeedPurchase, FeedConsumption, ReportJob
+from .reports import (
+    PERIOD_REPORT_TYPES, render_egg_collection_table, render_period_report,
+    egg_collection_table_filename, period_report_filename,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = PERIOD_REPORT_TYPES + ('egg-collection-table',)
+
+# Reports whose content depends on the owner asking for them
+OWNER_SCOPED_REPORTS = ('egg-collection-table',)
+
+# Bump when the PDF layout changes so stored artifacts are rebuilt
+RENDER_VERSION = 3
+
+# Data families (see cages.versions) each report is built from
+REPORT_FAMILIES = {
+    'sales': ('sales',),
+    'expenses': ('expenses', 'feed'),
+    'feed': ('feed',),
+    'egg-collection-table': ('eggs', 'flock', 'settings'),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def report_owner(report_type, user):
+    return user if report_type in OWNER_SCOPED_REPORTS else None
+
+
+def report_filename(report_type, start_date, end_date):
+    if report_type == 'egg-collection-table':
+        return egg_collection_table_filename(start_date)
+    return period_report_filename(report_type, start_date, end_date)
+
+
+def _signature(queryset, *sum_fields):
+    return queryset.aggregate(
+        count=Count('id'), last_id=Max('id'), **{field: Sum(field) for field in sum_fields}
+    )
+
+
+def data_fingerprint(report_type, start_date, end_date, owner=None):
+    """
+    Hash of everything a report is built from.
+
+    The data versions of the report's families change with every write,
+    including edits that leave the totals as they were; row counts, the
+    newest id and the summed amounts of each source table in the range
+    cover writes made without a version bump.
+    """
+    period = Q(date__gte=start_date, date__lte=end_date)
+    parts = {'version': RENDER_VERSION, 'type': report_type}
+    families = REPORT_FAMILIES.get(report_type, ())
+    if families:
+        parts['data_versions'] = versions.current(families)
+
+    if report_type == 'sales':
+        parts['sales'] = _signature(Sale.objects.filter(period), 'trays_sold', 'total_amount')
+    elif report_type == 'expenses':
+        cost_window = Q(date__gte=start_date - timedelta(days=FEED_COST_LOOKBACK_DAYS), date__lte=end_date)
+        parts['expenses'] = _signature(Expense.objects.filter(period), 'amount')
+        parts['consumption'] = _signature(FeedConsumption.objects.filter(period), 'quantity_used_kg')
+        parts['purchases'] = _signature(FeedPurchase.objects.filter(cost_window), 'quantity_kg', 'total_cost')
+    elif report_type == 'feed':
+        parts['purchases'] = _signature(FeedPurchase.objects.filter(period), 'quantity_kg', 'total_cost')
+        parts['consumption'] = _signature(FeedConsumption.objects.filter(period), 'quantity_used_kg')
+    elif report_type == 'egg-collection-table':
+        parts['eggs'] = _signature(Egg.objects.filter(laid_date=start_date), 'egg_count')
+        parts['cages'] = list(Cage.objects.filter(user=owner).order_by('id').values_list(
+            'id', 'layout__rows', 'layout__columns', 'layout__partitions'
+        ))
+        parts['total_chickens'] = farm_settings.total_chickens()
+        if parts['total_chickens'] is None:
+            parts['chickens'] = Chicken.objects.filter(cage__user=owner).count()
+
+    encoded = json.dumps(parts, cls=DjangoJSONEncoder, sort_keys=True)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def render_report(report_type, start_date, end_date, owner=None):
+    if report_type == 'egg-collection-table':
+        return render_egg_collection_table(owner, start_date)
+    return render_period_report(report_type, start_date, end_date)
+
+
+def _same_report(report_type, start_date, end_date, owner):
+    return ReportJob.objects.filter(
+        report_type=report_type, start_date=start_date, end_date=end_date, owner=owner
+    )
+
+
+def find_artifact(report_type, start_date, end_date, owner, fingerprint):
+    """The finished job whose artifact matches the current data, if any"""
+    return _same_report(report_type, start_date, end_date, owner).filter(
+        fingerprint=fingerprint, status='done'
+    ).first()
+
+
+def open_artifact(job):
+    """A finished job's PDF opened from storage, or None if the file is gone"""
+    try:
+        return job.artifact.open('rb')
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _store_artifact(job, output, fingerprint):
+    # Copied into storage in chunks, never read whole
+    job.artifact.save(job.filename or f'report-{job.id}.pdf', File(output), save=False)
+    now = timezone.now()
+    ReportJob.objects.filter(id=job.id).update(
+        status='done', artifact=job.artifact.name, fingerprint=fingerprint, finished_at=now, error=''
+    )
+    # Older artifacts for the same report are out of date now
+    _same_report(job.report_type, job.start_date, job.end_date, job.owner_id).exclude(id=job.id).filter(
+        status__in=['done', 'failed']
+    ).delete()
+    prune_artifacts()
+
+
+def prune_artifacts():
+    """Delete finished jobs older than REPORT_ARTIFACT_MAX_AGE_DAYS"""
+    max_age = getattr(settings, 'REPORT_ARTIFACT_MAX_AGE_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=max_age)
+    return ReportJob.objects.filter(status__in=['done', 'failed'], created_at__lt=cutoff).delete()[0]
+
+
+def request_report(report_type, start_date, end_date, user):
+    """
+    Queue a report, reusing an identical pending, running or finished job.
+
+    Returns (job, created).
+    """
+    owner = report_owner(report_type, user)
+    fingerprint = data_fingerprint(report_type, start_date, end_date, owner)
+    return _request(report_type, start_date, end_date, user, owner, fingerprint)
+
+
+def _request(report_type, start_date, end_date, user, owner, fingerprint):
+    existing = _same_report(report_type, start_date, end_date, owner).filter(
+        fingerprint=fingerprint, status__in=['pending', 'running', 'done']
+    ).first()
+    if existing:
+        return existing, False
+
+    job = ReportJob.objects.create(
+        report_type=report_type,
+        start_date=start_date,
+        end_date=end_date,
+        owner=owner,
+        requested_by=user,
+        fingerprint=fingerprint,
+        filename=report_filename(report_type, start_date, end_date)
+    )
+    transaction.on_commit(lambda: dispatch(job.id))
+    return job, True
+
+
+def open_or_request(report_type, start_date, end_date, user, render=True):
+    """
+    A report's stored PDF while the data is unchanged. Otherwise it is
+    rendered (then stored) in the calling thread, or with render=False
+    left to a background job.
+
+    Returns (artifact, None) with the file opened from storage, or
+    (None, job) for the pending or running job.
+    """
+    owner = report_owner(report_type, user)
+    fingerprint = data_fingerprint(report_type, start_date, end_date, owner)
+    job = find_artifact(report_type, start_date, end_date, owner, fingerprint)
+    if job:
+        artifact = open_artifact(job)
+        if artifact:
+            return artifact, None
+        # The file is gone from storage; render the report again
+        job.delete()
+    if not render:
+        job, created = _request(report_type, start_date, end_date, user, owner, fingerprint)
+        return None, job
+
+    job = ReportJob.objects.create(
+        report_type=report_type,
+        start_date=start_date,
+        end_date=end_date,
+        owner=owner,
+        requested_by=user,
+        fingerprint=fingerprint,
+        status='running',
+        filename=report_filename(report_type, start_date, end_date),
+        started_at=timezone.now()
+    )
+    with render_report(report_type, start_date, end_date, owner) as output:
+        _store_artifact(job, output, fingerprint)
+    return open_artifact(job), None
+
+
+def _claimable():
+    stale_seconds = getattr(settings, 'REPORT_JOB_STALE_SECONDS', 600)
+    stale_before = timezone.now() - timedelta(seconds=stale_seconds)
+    # Running jobs whose worker died are picked up again once stale
+    return Q(status='pending') | Q(status='running', started_at__lt=stale_before)
+
+
+def claim_job(job_id=None):
+    """
+    Atomically mark a queued job as running and return it.
+
+    The conditional UPDATE means only one worker (thread or process) wins
+    each job. Returns None when there is nothing to claim.
+    """
+    candidates = ReportJob.objects.filter(_claimable()).order_by('created_at')
+    if job_id is not None:
+        candidates = candidates.filter(id=job_id)
+    for candidate_id in candidates.values_list('id', flat=True)[:5]:
+        claimed = ReportJob.objects.filter(_claimable(), id=candidate_id).update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ReportJob.objects.get(id=candidate_id)
+    return None
+
+
+def run_job(job):
+    """Render a claimed job and store its artifact, or record the failure"""
+    owner = job.owner if job.owner_id else None
+    try:
+        # Fingerprint the data the PDF is actually built from
+        fingerprint = data_fingerprint(job.report_type, job.start_date, job.end_date, owner)
+        with render_report(job.report_type, job.start_date, job.end_date, owner) as output:
+            _store_artifact(job, output, fingerprint)
+    except Exception as e:
+        logger.exception('Report job %s failed', job.id)
+        ReportJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+        return False
+    return True
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        job = claim_job(job_id)
+        if job:
+            run_job(job)
+    finally:
+        connection.close()
+
+
+def dispatch(job_id):
+    """Hand a job to the in-process pool unless a separate worker runs them"""
+    if getattr(settings, 'REPORT_WORKER_MODE', 'thread') != 'thread':
+        return
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_WORKER_THREADS', 2),
+                thread_name_prefix='report-worker'
+            )
+    _executor.submit(_run_in_thread, job_id)
@@ -0,0 +1,3 @@
+"""PDF reports: styles and rendering engine, and the report definitions"""
+from .egg_collection import egg_collection_table_filename, performance_comment, render_egg_collection_table
+from .period import PERIOD_REPORTS, PERIOD_REPORT_TYPES, period_report_filename, render_period_report
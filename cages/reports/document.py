@@ -0,0 +1,97 @@
+"""
+Reports are described as data and rendered here.
+
+A report is a sequence of blocks: Title, Heading, Text, Gap and Grid (a
+table of strings with one of the shared styles). render() turns them
+into a PDF, so report modules only gather numbers and never touch
+ReportLab objects.
+
+Blocks and Grid rows may be generators. The document pulls flowables
+only as the page layout reaches them, and long grids are laid out as
+LongTable pieces of REPORT_TABLE_CHUNK_ROWS rows that repeat the header,
+so rows streamed from the database are never all held at once.
+"""
+import tempfile
+from collections import namedtuple
+from itertools import islice
+from django.conf import settings
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, LongTable
+from .styles import PARAGRAPH_STYLES
+
+Title = namedtuple('Title', ['text'])
+Heading = namedtuple('Heading', ['text', 'level'], defaults=[2])
+Text = namedtuple('Text', ['text'])
+Gap = namedtuple('Gap', ['height'])
+# rows: header row first, then the body; any iterable
+Grid = namedtuple('Grid', ['rows', 'widths', 'style'])
+
+# Flowables queued ahead of the one being laid out, enough for headings
+# kept with the table that follows them
+LOOKAHEAD = 8
+
+
+def section(heading, rows, widths, style, gap=20):
+    """A titled table followed by a gap, the usual unit of a report"""
+    return [Heading(heading), Grid(rows, widths, style), Gap(gap)]
+
+
+def _tables(block):
+    rows = iter(block.rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    chunk_rows = getattr(settings, 'REPORT_TABLE_CHUNK_ROWS', 200)
+    body = list(islice(rows, chunk_rows))
+    # The first piece is kept even without rows; later ones only with some
+    while True:
+        table = LongTable([header] + body, colWidths=block.widths, repeatRows=1)
+        table.setStyle(block.style)
+        yield table
+        body = list(islice(rows, chunk_rows))
+        if not body:
+            return
+
+
+_FLOWABLES = {
+    Title: lambda block: [Paragraph(block.text, PARAGRAPH_STYLES['title'])],
+    Heading: lambda block: [Paragraph(block.text, PARAGRAPH_STYLES[f'heading{block.level}'])],
+    Text: lambda block: [Paragraph(block.text, PARAGRAPH_STYLES['normal'])],
+    Gap: lambda block: [Spacer(1, block.height)],
+    Grid: _tables,
+}
+
+
+def _flowables(blocks):
+    for block in blocks:
+        yield from _FLOWABLES[type(block)](block)
+
+
+class _StreamingDocTemplate(SimpleDocTemplate):
+    """Tops up the story from a generator as flowables are laid out"""
+
+    def __init__(self, output, pending, **kwargs):
+        super().__init__(output, **kwargs)
+        self._pending = pending
+        self._story = None
+
+    def build(self, flowables, **kwargs):
+        self._story = flowables
+        super().build(flowables, **kwargs)
+
+    def filterFlowables(self, flowables):
+        # Also called with ReportLab's own list of page start actions
+        if flowables is self._story:
+            flowables.extend(islice(self._pending, max(0, LOOKAHEAD - len(flowables))))
+
+
+def render(blocks):
+    """
+    The PDF for a sequence of blocks, in a temporary file positioned at its
+    start. It is kept in memory up to REPORT_SPOOL_MAX_BYTES, on disk beyond.
+    """
+    output = tempfile.SpooledTemporaryFile(max_size=getattr(settings, 'REPORT_SPOOL_MAX_BYTES', 1024 * 1024))
+    pending = _flowables(blocks)
+    _StreamingDocTemplate(output, pending, pagesize=letter).build(list(islice(pending, LOOKAHEAD)))
+    output.seek(0)
+    return output
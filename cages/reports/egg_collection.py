@@ -0,0 +1,96 @@
+from django.db.models import Q
+from .. import farm_settings
+from ..layout import fill_cage_grids
+from ..models import Chicken, Egg
+from . import styles
+from .document import Title, Heading, Gap, Grid, section, render
+
+FARM_NAME = "Joe Farm"
+
+# (lowest laying percentage, comment), best first
+PERFORMANCE_COMMENTS = (
+    (90, "Excellent laying performance! Flock is performing exceptionally well."),
+    (80, "Very good production. Flock health and feed quality are optimal."),
+    (70, "Good laying percentage. Monitor feed quality and health."),
+    (60, "Average production. Consider reviewing feed and health management."),
+    (50, "Below average production. Check for health issues or feed problems."),
+    (30, "Poor laying performance. Immediate attention to flock health required."),
+    (0, "Critical: Very low production. Urgent veterinary attention needed."),
+)
+
+
+def egg_collection_table_filename(collection_date):
+    return f"egg_collection_table_{collection_date}.pdf"
+
+
+def performance_comment(laying_percentage):
+    return next(comment for floor, comment in PERFORMANCE_COMMENTS if laying_percentage >= floor)
+
+
+def egg_collection_blocks(user, collection_date):
+    """Blocks of the egg collection table for one date"""
+    # Include eggs from user's chickens or eggs recorded by this user
+    eggs = Egg.objects.filter(laid_date=collection_date).filter(Q(chicken__cage__user=user) | Q(recorded_by=user))
+
+    total_chickens = farm_settings.total_chickens()
+    if total_chickens is None:
+        total_chickens = Chicken.objects.filter(cage__user=user).count()
+
+    # Lay every egg into its cage's box grid with one grouped query
+    grids, shade_eggs, total_eggs_today = fill_cage_grids(user, eggs)
+    laying_percentage = (total_eggs_today / total_chickens * 100) if total_chickens > 0 else 0
+    comment = performance_comment(laying_percentage)
+
+    blocks = [
+        Title(f"{FARM_NAME} - Egg Collection Table - {collection_date}"),
+        Gap(12),
+        Grid([
+            ['Date:', str(collection_date)],
+            ['Total Eggs Collected:', str(total_eggs_today)],
+            ['Total Chickens:', str(total_chickens)],
+            ['Laying Percentage:', f"{laying_percentage:.2f}%"],
+            ['Performance:', comment],
+            ['Trays Produced:', f"{total_eggs_today // 30} full trays + {total_eggs_today % 30} remaining eggs"],
+        ], [150, 250], styles.COLLECTION_SUMMARY),
+        Gap(20),
+    ]
+
+    for cage_id, grid in grids.items():
+        blocks += [Heading(f"Cage {cage_id}"), Gap(6)]
+
+        # One table per partition (0 = front, 1 = back), laid out as the cage's box grid
+        partition_totals = []
+        for index, partition in enumerate(grid.partitions[:2]):
+            rows = [['Box'] + [str(column + 1) for column in range(partition.columns)]]
+            rows += [[f'Row {row + 1}'] + [str(count) for count in partition.row(row)] for row in range(partition.rows)]
+            blocks += [
+                Heading(f"{'Front' if index == 0 else 'Back'} Partition", 3),
+                Grid(rows, [40] + [30] * partition.columns, styles.BOX_GRID),
+                Gap(12),
+            ]
+            partition_totals.append(partition.total)
+
+        front_total, back_total = (partition_totals + [0, 0])[:2]
+        blocks += [
+            Grid([
+                ['Front Partition:', str(front_total)],
+                ['Back Partition:', str(back_total)],
+                ['Cage Total:', str(grid.total)],
+            ], [120, 80], styles.CAGE_TOTALS),
+            Gap(20),
+        ]
+
+    blocks += section("Shade Eggs", [['Shade Eggs:', str(shade_eggs)]], [120, 80], styles.SHADE_TOTALS)
+    blocks += section("Overall Summary", [
+        ['Total Cage Eggs:', str(total_eggs_today - shade_eggs)],
+        ['Total Shade Eggs:', str(shade_eggs)],
+        ['Grand Total:', str(total_eggs_today)],
+        ['Laying Percentage:', f"{laying_percentage:.2f}%"],
+        ['Performance Comment:', comment],
+    ], [150, 250], styles.OVERALL_TOTALS)
+    return blocks
+
+
+def render_egg_collection_table(user, collection_date):
+    """Egg collection table PDF for one date, as a file (see render())"""
+    return render(egg_collection_blocks(user, collection_date))
@@ -0,0 +1,170 @@
+from itertools import chain
+from django.conf import settings
+from django.db.models import Sum, Count, Avg
+from ..finance import period_financials
+from ..models import Sale, Expense, FeedPurchase, FeedConsumption
+from . import styles
+from .document import Title, Heading, Text, Gap, Grid, section, render
+from .egg_collection import FARM_NAME
+
+FEED_ACCOUNTING_NOTE = """
+IMPORTANT ACCOUNTING NOTE:
+• Feed Purchases = CAPITAL EXPENSES (inventory investment, not counted in profit/loss)
+• Feed Consumption = OPERATING EXPENSES (daily costs that affect profit/loss)
+• Profit/Loss = Revenue - Operating Expenses (feed consumption + other daily costs)
+"""
+
+
+def period_report_filename(report_type, start_date, end_date):
+    return f"{report_type}_report_{start_date}_to_{end_date}.pdf"
+
+
+def _rows(model, start_date, end_date, *fields):
+    """Field tuples for a date range, newest first, streamed from the database"""
+    queryset = model.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
+    return queryset.values_list(*fields).iterator(chunk_size=getattr(settings, 'HISTORY_STREAM_CHUNK_SIZE', 500))
+
+
+def sales_blocks(start_date, end_date):
+    summary = Sale.objects.filter(date__gte=start_date, date__lte=end_date).aggregate(
+        count=Count('id'), trays=Sum('trays_sold'), revenue=Sum('total_amount'), avg_price=Avg('price_per_tray')
+    )
+
+    blocks = [
+        Grid([
+            ['Total Sales:', str(summary['count'])],
+            ['Total Trays Sold:', str(summary['trays'] or 0)],
+            ['Total Revenue:', f"Ksh {summary['revenue'] or 0}"],
+            ['Average Price per Tray:', f"Ksh {summary['avg_price'] or 0:.2f}"],
+        ], [200, 200], styles.SALES_SUMMARY),
+        Gap(20),
+    ]
+    if summary['count']:
+        rows = (
+            [str(day), str(trays), f"Ksh {price}", f"Ksh {amount}"]
+            for day, trays, price, amount in _rows(
+                Sale, start_date, end_date, 'date', 'trays_sold', 'price_per_tray', 'total_amount'
+            )
+        )
+        header = ['Date', 'Trays Sold', 'Price per Tray', 'Total Amount']
+        blocks.append(Grid(chain([header], rows), [100, 80, 120, 120], styles.LISTING))
+    return blocks
+
+
+def expenses_blocks(start_date, end_date):
+    # Feed consumption is costed at the weighted average purchase price
+    finance = period_financials(start_date, end_date)
+    avg_cost_per_kg = finance['avg_feed_cost_per_kg']
+    operating_total = finance['expenses_total'] + finance['feed_cost']
+
+    blocks = [
+        Grid([
+            ['Report Period:', f"{start_date} to {end_date}"],
+            ['Total Expense Records:', str(finance['expense_count'])],
+            ['Operating Expenses (Medicine, Labor, etc.):', f"Ksh {finance['expenses_total']:.2f}"],
+            ['Feed Consumption Cost:', f"Ksh {finance['feed_cost']:.2f}"],
+            ['Total Operating Costs:', f"Ksh {operating_total:.2f}"],
+            ['Average Daily Operating Cost:', f"Ksh {(operating_total / ((end_date - start_date).days + 1)):.2f}"],
+        ], [250, 150], styles.PERIOD_SUMMARY),
+        Gap(20),
+    ]
+
+    if finance['expense_count']:
+        rows = (
+            [str(day), expense_type.title(), f"Ksh {amount}", description or '']
+            for day, expense_type, amount, description in _rows(
+                Expense, start_date, end_date, 'date', 'expense_type', 'amount', 'description'
+            )
+        )
+        header = ['Date', 'Type', 'Amount', 'Description']
+        blocks += section(
+            "Operating Expenses (Medicine, Labor, Utilities, etc.)", chain([header], rows),
+            [80, 80, 100, 200], styles.LISTING
+        )
+
+    if finance['feed_consumption_count']:
+        rows = (
+            [str(day), f"{used} kg", f"Ksh {used * avg_cost_per_kg if avg_cost_per_kg is not None else 0:.2f}"]
+            for day, used in _rows(FeedConsumption, start_date, end_date, 'date', 'quantity_used_kg')
+        )
+        header = ['Date', 'Feed Used (kg)', 'Estimated Cost']
+        blocks += [
+            Heading("Feed Consumption (Daily Operating Costs)"),
+            Grid(chain([header], rows), [80, 100, 100], styles.LISTING),
+        ]
+    return blocks
+
+
+def feed_blocks(start_date, end_date):
+    # Feed consumption for the period is costed at the period's weighted average price
+    finance = period_financials(start_date, end_date, cost_lookback_days=0)
+    avg_cost_per_kg = finance['avg_feed_cost_per_kg'] or 0
+    total_bought = finance['feed_bought_kg']
+    total_used = finance['feed_used_kg']
+
+    blocks = [
+        Title(f"{FARM_NAME} - Feed Report"),
+        Gap(12),
+        Grid([
+            ['Report Period:', f"{start_date} to {end_date}"],
+            ['CAPITAL EXPENSES (Investments):', ''],
+            ['• Feed Purchases (Inventory):', f"{total_bought} kg @ Ksh {finance['capital_expenses']} total"],
+            ['• Average Cost per kg:', f"Ksh {avg_cost_per_kg:.2f}"],
+            ['OPERATING EXPENSES (Daily Costs):', ''],
+            ['• Feed Consumption:', f"{total_used} kg @ Ksh {finance['feed_cost']:.2f} total"],
+            ['• Feed Remaining in Inventory:', f"{total_bought - total_used} kg"],
+            ['Feed Efficiency:', f"{(total_used / total_bought * 100):.1f}%" if total_bought > 0 else 'N/A'],
+        ], [200, 200], styles.FEED_SUMMARY),
+        Gap(20),
+    ]
+
+    if finance['feed_purchase_count']:
+        rows = (
+            [
+                str(day),
+                feed_type or 'General',
+                str(quantity),
+                f"Ksh {total_cost}",
+                f"Ksh {cost_per_kg:.2f}" if cost_per_kg else 'N/A',
+            ]
+            for day, feed_type, quantity, total_cost, cost_per_kg in _rows(
+                FeedPurchase, start_date, end_date, 'date', 'feed_type', 'quantity_kg', 'total_cost', 'cost_per_kg'
+            )
+        )
+        header = ['Date', 'Feed Type', 'Quantity (kg)', 'Total Cost', 'Cost per kg']
+        blocks += section(
+            "Feed Purchases (Capital Investment - Not Operating Expenses)", chain([header], rows),
+            [80, 80, 80, 100, 100], styles.LISTING
+        )
+
+    if finance['feed_consumption_count']:
+        rows = (
+            [str(day), str(used), f"Ksh {used * avg_cost_per_kg if avg_cost_per_kg > 0 else 0:.2f}"]
+            for day, used in _rows(FeedConsumption, start_date, end_date, 'date', 'quantity_used_kg')
+        )
+        header = ['Date', 'Feed Used (kg)', 'Cost (Operating Expense)']
+        blocks += section(
+            "Feed Consumption (Operating Expenses - Daily Farm Costs)", chain([header], rows),
+            [100, 100, 150], styles.LISTING
+        )
+        blocks.append(Text(FEED_ACCOUNTING_NOTE))
+    return blocks
+
+
+# Report type -> function returning its blocks for a date range
+PERIOD_REPORTS = {
+    'sales': sales_blocks,
+    'expenses': expenses_blocks,
+    'feed': feed_blocks,
+}
+
+# Period reports offered by download_report
+PERIOD_REPORT_TYPES = tuple(PERIOD_REPORTS)
+
+
+def render_period_report(report_type, start_date, end_date):
+    """Sales, expenses or feed report PDF for a date range, as a file (see render())"""
+    title = Title(f"{FARM_NAME} - {report_type.title()} Report ({start_date} to {end_date})")
+    # Other types get a report with only its title
+    blocks = PERIOD_REPORTS[report_type](start_date, end_date) if report_type in PERIOD_REPORTS else []
+    return render([title, Gap(12)] + blocks)
@@ -0,0 +1,84 @@
+"""
+Paragraph and table styles shared by every report.
+
+They are built once at import time and frozen: a report that needs a
+different look gets its own named style here instead of adjusting a
+shared one, so nothing set while rendering one request can leak into
+the next.
+"""
+from types import MappingProxyType
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.platypus import TableStyle
+
+
+class FrozenParagraphStyle(ParagraphStyle):
+    """A ParagraphStyle whose attributes can't be changed after it is built"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__dict__['_frozen'] = True
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f'Report style {self.name!r} is shared and read-only')
+        super().__setattr__(name, value)
+
+
+class FrozenTableStyle(TableStyle):
+    """A TableStyle whose commands can't be added to after it is built"""
+
+    def __init__(self, cmds):
+        super().__init__(cmds)
+        self._cmds = tuple(self._cmds)
+
+    def add(self, *cmd):
+        raise TypeError('Report table styles are shared and read-only')
+
+
+def _paragraph_style(sample, name, **overrides):
+    attributes = {key: value for key, value in sample.__dict__.items() if key not in ('name', 'parent')}
+    attributes.update(overrides)
+    return FrozenParagraphStyle(name, **attributes)
+
+
+_sample = getSampleStyleSheet()
+
+PARAGRAPH_STYLES = MappingProxyType({
+    'title': _paragraph_style(_sample['Title'], 'ReportTitle', fontSize=18, spaceAfter=20),
+    'heading2': _paragraph_style(_sample['Heading2'], 'ReportHeading2'),
+    'heading3': _paragraph_style(_sample['Heading3'], 'ReportHeading3'),
+    'normal': _paragraph_style(_sample['Normal'], 'ReportNormal'),
+})
+
+del _sample
+
+
+def _table_style(align, font_size, header_padding, header=colors.grey, body=colors.beige, body_font=False, extra=()):
+    """A header row on a coloured body with a full grid; body_font sizes every row, not just the header"""
+    return FrozenTableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), align),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1 if body_font else 0), font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), header_padding),
+        ('BACKGROUND', (0, 1), (-1, -1), body),
+        *extra,
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ])
+
+
+# Egg collection table: larger text throughout for reading off a printout
+COLLECTION_SUMMARY = _table_style('LEFT', 14, 8, body_font=True)
+BOX_GRID = _table_style('CENTER', 12, 8, body_font=True)
+CAGE_TOTALS = _table_style('LEFT', 14, 8, colors.green, colors.lightgreen, body_font=True)
+SHADE_TOTALS = _table_style('LEFT', 14, 8, colors.blue, colors.lightblue, body_font=True)
+OVERALL_TOTALS = _table_style('LEFT', 14, 8, colors.darkblue, colors.lightcyan, body_font=True)
+
+# Period reports
+SALES_SUMMARY = _table_style('LEFT', 14, 12)
+PERIOD_SUMMARY = _table_style('LEFT', 12, 8)
+# Rows 1 and 4 are section labels spanning both columns
+FEED_SUMMARY = _table_style('LEFT', 12, 8, extra=[('SPAN', (0, 1), (1, 1)), ('SPAN', (0, 4), (1, 4))])
+LISTING = _table_style('CENTER', 12, 12)
@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync, sync_to_async
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection
+from . import versions
+from .coalesce import single_flight
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = 'cages:swr'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def soft_ttl():
+    return getattr(settings, 'SUMMARY_CACHE_SOFT_SECONDS', 30)
+
+
+def hard_ttl():
+    return getattr(settings, 'SUMMARY_CACHE_SECONDS', 600)
+
+
+def cache_key(name, user, families, today):
+    stamp = versions.stamp(versions.current(families))
+    return f'{CACHE_PREFIX}:{name}:{user.pk}:{today.isoformat()}:{stamp}'
+
+
+def _store(key, compute):
+    data = compute()
+    cache.set(key, {'data': data, 'built_at': time.time()}, hard_ttl())
+    return data
+
+
+def _refresh(key, compute):
+    close_old_connections()
+    try:
+        _store(key, compute)
+    except Exception:
+        logger.exception('Background refresh of %s failed', key)
+    finally:
+        connection.close()
+
+
+def refresh_in_background(key, compute):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='summary-refresh')
+    _executor.submit(_refresh, key, compute)
+
+
+def cached_payload(name, user, families, compute, today=None):
+    """
+    compute() served stale-while-revalidate.
+
+    The key holds the owner, the day and the current version of every
+    data family the payload is built from, so any write to those families
+    (see cages.versions) makes the next read miss. A hit is returned
+    straight away; once it is older than SUMMARY_CACHE_SOFT_SECONDS one
+    background refresh is started so time-dependent figures catch up.
+    Concurrent misses share one computation.
+    """
+    today = today or datetime.now().date()
+    key = cache_key(name, user, families, today)
+    entry = cache.get(key)
+    if entry is None:
+        return single_flight(key, lambda: _store(key, compute))
+
+    if time.time() - entry['built_at'] > soft_ttl() and cache.add(f'{key}:refreshing', True, soft_ttl()):
+        refresh_in_background(key, compute)
+    return entry['data']
+
+
+async def cached_payload_async(name, user, families, compute, today=None):
+    """
+    cached_payload() for async views, sharing its cache entries.
+
+    compute is a coroutine function. Misses are not coalesced, as waiting
+    on another thread would block the event loop.
+    """
+    today = today or datetime.now().date()
+    key = await sync_to_async(cache_key)(name, user, families, today)
+    entry = await cache.aget(key)
+    if entry is None:
+        data = await compute()
+        await cache.aset(key, {'data': data, 'built_at': time.time()}, hard_ttl())
+        return data
+
+    if time.time() - entry['built_at'] > soft_ttl() and await cache.aadd(f'{key}:refreshing', True, soft_ttl()):
+        refresh_in_background(key, async_to_sync(compute))
+    return entry['data']
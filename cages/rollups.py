@@ -0,0 +1,97 @@
+from django.db import connection, models, transaction
+from django.db.models import Sum, Count
+from .models import Egg, DailyEggRollup
+
+# First key of the rollup rebuild advisory locks; the second is the date's ordinal
+ROLLUP_LOCK_NAMESPACE = 0x526F6C6C
+
+_date_field = models.DateField()
+
+
+def rebuild_egg_rollups(dates=None):
+    """
+    Recompute DailyEggRollup rows from Egg records.
+
+    Args:
+        dates: Iterable of dates to rebuild. When None the whole history is rebuilt.
+
+    Call this inside the same transaction that writes or deletes the Egg rows
+    so the rollup never disagrees with the records it summarises. Rebuilds of
+    the same dates are serialised, so two concurrent submissions for a day
+    can't both insert its rows.
+    """
+    # No savepoint: callers already hold a transaction, and the locks belong to it
+    with transaction.atomic(savepoint=False):
+        if dates is not None:
+            dates = set(dates)
+        _lock_dates(dates)
+        return _rebuild(dates)
+
+
+def _lock_dates(dates):
+    """
+    Per-date locks held to the end of the transaction (PostgreSQL; SQLite
+    runs one writer at a time already). A full rebuild takes the namespace
+    lock exclusively, date rebuilds take it shared.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        if dates is None:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, 0)', [ROLLUP_LOCK_NAMESPACE])
+            return
+        cursor.execute('SELECT pg_advisory_xact_lock_shared(%s, 0)', [ROLLUP_LOCK_NAMESPACE])
+        # Sorted so two rebuilds never wait on each other's dates in opposite order
+        days = sorted({_date_field.to_python(day) for day in dates if day is not None})
+        for day in days:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [ROLLUP_LOCK_NAMESPACE, day.toordinal()])
+
+
+def _rebuild(dates):
+    eggs = Egg.objects.all()
+    rollups = DailyEggRollup.objects.all()
+    if dates is not None:
+        eggs = eggs.filter(laid_date__in=dates)
+        rollups = rollups.filter(date__in=dates)
+
+    totals = list(eggs.values('laid_date', 'source', 'cage_id', 'partition_index').annotate(
+        total=Sum('egg_count'),
+        records=Count('id')
+    ).order_by())
+
+    rollups.delete()
+    DailyEggRollup.objects.bulk_create([
+        DailyEggRollup(
+            date=row['laid_date'],
+            source=row['source'],
+            cage_id=row['cage_id'],
+            partition_index=row['partition_index'],
+            egg_count=row['total'] or 0,
+            record_count=row['records']
+        )
+        for row in totals
+    ], batch_size=500)
+
+    return len(totals)
+
+
+def egg_count_totals(**windows):
+    """
+    Sum pre-aggregated egg counts for several windows in a single query.
+
+    Each keyword is a Q object over DailyEggRollup fields, e.g.
+    egg_count_totals(today=Q(date=today), week=Q(date__gte=week_start)).
+    Returns a dict with the same keys and integer totals.
+    """
+    totals = DailyEggRollup.objects.aggregate(**{
+        name: Sum('egg_count', filter=condition) for name, condition in windows.items()
+    })
+    return {name: total or 0 for name, total in totals.items()}
+
+
+def daily_egg_totals(start_date, end_date):
+    """Egg totals per day between two dates (inclusive), as {date: count}"""
+    rows = DailyEggRollup.objects.filter(
+        date__gte=start_date, date__lte=end_date
+    ).values('date').annotate(total=Sum('egg_count')).order_by()
+    return {row['date']: row['total'] or 0 for row in rows}
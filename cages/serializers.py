@@ -1,12 +1,52 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Cage, Chicken, Egg, Notification
+from .models import Cage, CageLayout, Chicken, Egg, Notification
+from .layout import STANDARD_LAYOUT, cage_spec, layout_for, save_layout
+from .versions import batched
 
 class CageSerializer(serializers.ModelSerializer):
+    # Box layout, stored on the cage's CageLayout; a new cage without one is standard
+    type = serializers.ChoiceField(choices=CageLayout.CAGE_TYPES, required=False, write_only=True)
+    rows = serializers.IntegerField(min_value=1, max_value=16, required=False, write_only=True)
+    columns = serializers.IntegerField(min_value=1, max_value=16, required=False, write_only=True)
+    # 0 = front, 1 = back
+    partitions = serializers.IntegerField(min_value=1, max_value=2, required=False, write_only=True)
+
+    LAYOUT_FIELDS = ('type', 'rows', 'columns', 'partitions')
+
     class Meta:
         model = Cage
-        fields = ['id', 'name', 'capacity', 'current_count', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'capacity', 'current_count', 'created_at', 'updated_at', 'type', 'rows', 'columns', 'partitions']
         read_only_fields = ['current_count', 'created_at', 'updated_at']
 
+    def _pop_layout(self, validated_data):
+        layout = {name: validated_data.pop(name, None) for name in self.LAYOUT_FIELDS}
+        layout['cage_type'] = layout.pop('type')
+        return layout
+
+    def create(self, validated_data):
+        layout = self._pop_layout(validated_data)
+        # One flock version bump for the cage and its layout
+        with transaction.atomic(), batched():
+            cage = super().create(validated_data)
+            cage.layout = CageLayout.objects.create(cage=cage, **layout_for(STANDARD_LAYOUT, **layout)._asdict())
+        return cage
+
+    def update(self, instance, validated_data):
+        layout = self._pop_layout(validated_data)
+        with transaction.atomic():
+            cage = super().update(instance, validated_data)
+            if any(value is not None for value in layout.values()):
+                save_layout(cage, **layout)
+        return cage
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Type and box grid from the cage's layout
+        spec = cage_spec(instance)
+        data.update(type=spec.cage_type, rows=spec.rows, columns=spec.columns, partitions=spec.partitions)
+        return data
+
 class ChickenSerializer(serializers.ModelSerializer):
     class Meta:
         model = Chicken
@@ -18,7 +58,7 @@ class EggSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Egg
-        fields = ['id', 'chicken', 'chicken_tag', 'laid_date', 'weight_g', 'quality', 'created_at']
+        fields = ['id', 'chicken', 'chicken_tag', 'laid_date', 'weight_g', 'quality', 'egg_count', 'created_at']
         read_only_fields = ['created_at']
 
 
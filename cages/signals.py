@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from . import farm_settings, versions
+from .models import FarmSettings, ReportJob
+
+
+@receiver(post_save, sender=FarmSettings)
+@receiver(post_delete, sender=FarmSettings)
+def invalidate_farm_settings(sender, **kwargs):
+    # Clear now for this request and again after commit, so a reader can't
+    # re-cache the old values while the write's transaction is still open
+    farm_settings.invalidate()
+    transaction.on_commit(farm_settings.invalidate)
+
+
+@receiver(post_delete, sender=ReportJob)
+def delete_report_artifact(sender, instance, **kwargs):
+    # After commit, so a rolled back delete keeps its file
+    if instance.artifact:
+        storage, name = instance.artifact.storage, instance.artifact.name
+        transaction.on_commit(lambda: storage.delete(name))
+
+
+def bump_data_version(sender, **kwargs):
+    # Runs inside the write's transaction, so the new version becomes
+    # visible together with the data it describes
+    versions.bump(versions.MODEL_FAMILIES[sender])
+
+
+for model in versions.MODEL_FAMILIES:
+    post_save.connect(bump_data_version, sender=model, dispatch_uid=f'bump_data_version_save_{model.__name__}')
+    post_delete.connect(bump_data_version, sender=model, dispatch_uid=f'bump_data_version_delete_{model.__name__}')
@@ -0,0 +1,84 @@
+from datetime import datetime
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Store, StockMovement
+
+# The farm keeps a single store row
+STORE_ID = 1
+
+
+class InsufficientStock(Exception):
+    """Raised when removing more trays than the store holds"""
+
+    def __init__(self, requested, available):
+        self.requested = requested
+        self.available = available
+        super().__init__(f'Insufficient stock. Only {available} trays available.')
+
+
+def current_stock():
+    """Trays currently in the store, creating the store row if needed"""
+    store, created = Store.objects.get_or_create(id=STORE_ID, defaults={'trays_in_stock': 0})
+    return store.trays_in_stock
+
+
+def _balance():
+    return Store.objects.filter(id=STORE_ID).values_list('trays_in_stock', flat=True).get()
+
+
+def _record(change, reason, date=None, recorded_by=None, sale=None):
+    return StockMovement.objects.create(
+        date=date or datetime.now().date(),
+        reason=reason,
+        change=change,
+        balance_after=_balance(),
+        sale=sale,
+        recorded_by=recorded_by
+    )
+
+
+def add_trays(trays, reason='collection', date=None, recorded_by=None):
+    """
+    Add trays to the store and record the movement.
+
+    The increment happens in the database (F expression), so concurrent
+    requests can't overwrite each other's counts. Returns the StockMovement.
+    """
+    with transaction.atomic():
+        updated = Store.objects.filter(id=STORE_ID).update(
+            trays_in_stock=F('trays_in_stock') + trays, last_updated=timezone.now()
+        )
+        if not updated:
+            current_stock()
+            Store.objects.filter(id=STORE_ID).update(
+                trays_in_stock=F('trays_in_stock') + trays, last_updated=timezone.now()
+            )
+        return _record(trays, reason, date, recorded_by)
+
+
+def remove_trays(trays, reason='sale', date=None, recorded_by=None, sale=None):
+    """
+    Take trays out of the store and record the movement.
+
+    The decrement only applies while the store still holds enough trays, so
+    the stock never goes below zero even under concurrent sales. Raises
+    InsufficientStock without changing anything otherwise.
+    """
+    with transaction.atomic():
+        updated = Store.objects.filter(id=STORE_ID, trays_in_stock__gte=trays).update(
+            trays_in_stock=F('trays_in_stock') - trays, last_updated=timezone.now()
+        )
+        if not updated:
+            raise InsufficientStock(trays, current_stock())
+        return _record(-trays, reason, date, recorded_by, sale)
+
+
+def reset_stock(date=None, recorded_by=None):
+    """Empty the store, recording the trays written off. Returns the StockMovement."""
+    with transaction.atomic():
+        current_stock()
+        store = Store.objects.select_for_update().get(id=STORE_ID)
+        change = -store.trays_in_stock
+        Store.objects.filter(id=STORE_ID).update(trays_in_stock=0, last_updated=timezone.now())
+        return _record(change, 'reset', date, recorded_by)
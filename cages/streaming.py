@@ -0,0 +1,54 @@
+"""
+Streaming responses that stay streamed under the ASGI handler.
+
+Django 4.2's ASGI handler reads a synchronous streaming_content with
+sync_to_async(list) before sending the first byte, so NDJSON exports and
+PDF downloads would be held whole in memory. These responses hand the
+handler an async iterator instead, which pulls a few parts at a time on
+the request's sync thread (where database cursors for the stream live).
+Under WSGI they behave like the Django classes they extend.
+"""
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, StreamingHttpResponse
+
+# Most parts and bytes pulled from the sync iterator per thread hop
+PARTS_PER_HOP = 64
+BYTES_PER_HOP = 64 * 1024
+
+
+def _take(iterator):
+    parts = []
+    size = 0
+    for part in iterator:
+        parts.append(part)
+        size += len(part)
+        if len(parts) >= PARTS_PER_HOP or size >= BYTES_PER_HOP:
+            break
+    return parts
+
+
+class AsyncPullMixin:
+    """Serves a sync streaming_content to the ASGI handler without reading it all first"""
+
+    async def __aiter__(self):
+        if self.is_async:
+            async for part in self.streaming_content:
+                yield part
+            return
+        iterator = iter(self.streaming_content)
+        take = sync_to_async(_take)
+        while True:
+            parts = await take(iterator)
+            if not parts:
+                return
+            for part in parts:
+                yield part
+
+
+class StreamingResponse(AsyncPullMixin, StreamingHttpResponse):
+    pass
+
+
+class StreamingFileResponse(AsyncPullMixin, FileResponse):
+    # Larger reads than FileResponse's 4KB, since each hop costs a thread switch
+    block_size = 64 * 1024
@@ -0,0 +1,515 @@
+import threading
+from asgiref.sync import sync_to_async
+from datetime import datetime, timedelta
+from django.db.models import Sum, Count, Q
+from . import farm_settings
+from .models import Cage, Chicken, Egg, Store, Sale, Expense
+from .finance import period_financials
+from .rollups import egg_count_totals, daily_egg_totals
+from .fanout import fan_out
+
+# Ksh per kg market rate used when there is no feed purchase history
+DEFAULT_FEED_COST_PER_KG = 55.71
+
+
+class RequestMemo:
+    """
+    Values computed once per request and shared between summary builders.
+
+    The dashboard and the financial summary need many of the same figures
+    (chicken count, weekly financials, egg totals); building both from one
+    memo means each underlying query runs once.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        value = compute()
+        with self._lock:
+            return self._values.setdefault(key, value)
+
+
+def week_bounds(day):
+    """Monday and Sunday of the week containing day"""
+    week_start = day - timedelta(days=day.weekday())
+    return week_start, week_start + timedelta(days=6)
+
+
+def chicken_count_setting(memo):
+    """The total_chickens farm setting as an int, or None when missing or invalid"""
+    return memo.get('total_chickens', farm_settings.total_chickens)
+
+
+def feed_per_chicken_daily(memo):
+    """Daily feed requirement per chicken in kg"""
+    return memo.get('feed_per_chicken_daily_kg', farm_settings.feed_per_chicken_daily_kg)
+
+
+def trays_in_store(memo):
+    def load():
+        store, created = Store.objects.get_or_create(id=1, defaults={'trays_in_stock': 0})
+        return store.trays_in_stock
+    return memo.get('trays_in_store', load)
+
+
+def week_financials(memo, today):
+    """period_financials() for the week containing today"""
+    week_start, week_end = week_bounds(today)
+    return memo.get(('finance', week_start), lambda: period_financials(week_start, week_end))
+
+
+def farm_egg_totals(memo, today):
+    """Today's, this week's and this month's egg totals in one rollup query"""
+    week_start, week_end = week_bounds(today)
+    month_start = today.replace(day=1)
+    return memo.get(('egg_totals', today), lambda: egg_count_totals(
+        cage_today=Q(date=today, source='cage'),
+        shade_today=Q(date=today, source='shade'),
+        week_to_date=Q(date__gte=week_start, date__lte=today),
+        week=Q(date__gte=week_start, date__lte=week_end),
+        month_to_date=Q(date__gte=month_start, date__lte=today),
+    ))
+
+
+def financial_summary_data(memo=None, today=None):
+    """Financial summary for the current week with proper expense accounting"""
+    memo = memo or RequestMemo()
+    today = today or datetime.now().date()
+
+    total_chickens = chicken_count_setting(memo) or 0
+
+    # Revenue, operating costs (feed consumption + non-feed expenses),
+    # capital expenses (feed purchases) and feed inventory for the week
+    finance = week_financials(memo, today)
+    total_feed_used_kg = finance['feed_used_kg']
+
+    # Current metrics from the daily egg rollup (cage eggs + shade eggs)
+    egg_totals = farm_egg_totals(memo, today)
+    eggs_today = egg_totals['cage_today'] + egg_totals['shade_today']
+
+    # Feed efficiency (eggs per kg of feed) and avg eggs per hen
+    feed_efficiency = egg_totals['week'] / total_feed_used_kg if total_feed_used_kg > 0 else 0
+    avg_eggs_per_hen = eggs_today / total_chickens if total_chickens > 0 else 0
+
+    return {
+        'total_hens': total_chickens,
+        'eggs_today': eggs_today,
+        'trays_in_store': trays_in_store(memo),
+        'trays_sold': finance['trays_sold'],
+        'total_revenue': round(finance['revenue'], 2),
+        'operating_expenses': round(finance['operating_costs'], 2),
+        'capital_expenses': round(finance['capital_expenses'], 2),
+        'total_expenses': round(finance['operating_costs'], 2),  # For backward compatibility
+        'feed_consumption_cost': round(finance['feed_cost'], 2),
+        'other_operating_expenses': round(finance['other_operating_expenses'], 2),
+        'profit_loss': round(finance['profit_loss'], 2),
+        'profit_margin': round(finance['profit_margin'], 2),
+        'feed_efficiency': round(feed_efficiency, 2),
+        'avg_eggs_per_hen': round(avg_eggs_per_hen, 2),
+        'feed_bought_week': round(finance['feed_bought_kg'], 2),
+        'feed_used_week': round(total_feed_used_kg, 2),
+        'feed_remaining': round(finance['feed_remaining_kg'], 2)
+    }
+
+
+def today_cage_breakdown(user, today):
+    """
+    Today's cage eggs split by cage into front (partition 0) and back totals.
+
+    One grouped query covers every cage the owner has, plus eggs the owner
+    recorded or laid by their chickens, so the cost doesn't grow with the
+    number of cages. Cages with no eggs today are left out.
+    """
+    owner_cages = Cage.objects.filter(user=user).values('id')
+    rows = Egg.objects.filter(laid_date=today, source='cage', cage_id__isnull=False).filter(
+        Q(cage_id__in=owner_cages) | Q(chicken__cage__user=user) | Q(recorded_by=user)
+    ).values('cage_id', 'partition_index').annotate(total=Sum('egg_count')).order_by('cage_id')
+
+    cage_breakdown = {}
+    for row in rows:
+        eggs = row['total'] or 0
+        if not eggs:
+            continue
+        cage = cage_breakdown.setdefault(row['cage_id'], {'total': 0, 'front': 0, 'back': 0})
+        cage['total'] += eggs
+        cage['front' if row['partition_index'] == 0 else 'back'] += eggs
+    return cage_breakdown
+
+
+def dashboard_queries(user, memo, today):
+    """
+    The dashboard's independent queries, as {name: loader}.
+
+    dashboard_overview_data() reads each one through the memo, so running
+    them all first (see cages.fanout) leaves it nothing left to query.
+    """
+    def flock_size():
+        # Total chicken count from settings, falling back to the chickens on record
+        total = chicken_count_setting(memo)
+        return Chicken.objects.filter(cage__user=user).count() if total is None else total
+
+    return {
+        'total_cages': lambda: Cage.objects.filter(user=user).count(),
+        'total_chickens': flock_size,
+        # Egg totals come pre-summed from the daily rollup table
+        'egg_totals': lambda: farm_egg_totals(memo, today),
+        'cage_breakdown': lambda: today_cage_breakdown(user, today),
+        'total_capacity': lambda: Cage.objects.aggregate(total=Sum('capacity'))['total'] or 0,
+        'current_occupancy': lambda: Chicken.objects.count(),
+        # Today's operating expenses (excluding feed purchases which are capital expenses)
+        'today_expenses': lambda: Expense.objects.filter(
+            date=today
+        ).exclude(expense_type='feed').aggregate(total=Sum('amount'))['total'] or 0,
+        'feed_per_chicken': lambda: feed_per_chicken_daily(memo),
+        'week_financials': lambda: week_financials(memo, today),
+        'trays_in_store': lambda: trays_in_store(memo),
+    }
+
+
+def dashboard_overview_data(user, memo=None, today=None):
+    """Farm-wide statistics for the owner dashboard"""
+    memo = memo or RequestMemo()
+    today = today or datetime.now().date()
+    month_start = today.replace(day=1)
+
+    queries = dashboard_queries(user, memo, today)
+
+    def query(name):
+        return memo.get(('dashboard', name), queries[name])
+
+    total_cages = query('total_cages')
+    total_chickens = query('total_chickens')
+
+    egg_totals = query('egg_totals')
+    cage_eggs_today = egg_totals['cage_today']
+    shade_eggs_today = egg_totals['shade_today']
+    total_eggs_today = cage_eggs_today + shade_eggs_today
+    total_eggs_week = egg_totals['week_to_date']
+    total_eggs_month = egg_totals['month_to_date']
+
+    cage_breakdown = query('cage_breakdown')
+
+    # Averages and the laying percentage for the flock
+    days_this_month = (today - month_start).days + 1
+    avg_daily_eggs = total_eggs_month / days_this_month if days_this_month > 0 else 0
+    avg_weekly_eggs = total_eggs_week / 7
+    avg_monthly_eggs = total_eggs_month
+    laying_percentage = total_eggs_today / total_chickens * 100 if total_chickens > 0 else 0
+
+    feed_per_chicken = query('feed_per_chicken')
+    feed_requirement_daily = total_chickens * feed_per_chicken
+    feed_requirement_weekly = feed_requirement_daily * 7
+    feed_requirement_monthly = feed_requirement_daily * 30
+
+    # Estimate revenue based on current market prices
+    revenue_daily = total_eggs_today * 0.15  # $0.15 per egg market rate
+    revenue_weekly = total_eggs_week * 0.15
+    revenue_monthly = total_eggs_month * 0.15
+
+    # Cage utilization
+    total_capacity = query('total_capacity')
+    current_occupancy = query('current_occupancy')
+    utilization_rate = (current_occupancy / total_capacity * 100) if total_capacity > 0 else 0
+
+    today_expenses = query('today_expenses')
+
+    # Today's feed consumption cost, priced at the same weighted average
+    # cost per kg the weekly financials use
+    feed_cost_today = 0
+    if total_chickens > 0 and feed_per_chicken > 0:
+        avg_cost_per_kg = query('week_financials')['avg_feed_cost_per_kg']
+        if avg_cost_per_kg is None:
+            # Use standard market rate if no purchase history available
+            avg_cost_per_kg = DEFAULT_FEED_COST_PER_KG
+        feed_cost_today = feed_requirement_daily * float(avg_cost_per_kg)
+
+    total_expenses_today = float(today_expenses) + feed_cost_today
+
+    financial_data = financial_summary_data(memo, today)
+
+    return {
+        'total_cages': total_cages,
+        'total_chickens': total_chickens,
+        'total_capacity': total_capacity,
+        'utilization_rate': round(utilization_rate, 2),
+        'egg_production': {
+            'today': total_eggs_today,
+            'today_breakdown': {
+                'cage_eggs': cage_eggs_today,
+                'shade_eggs': shade_eggs_today,
+                'cages': cage_breakdown,
+                'total': total_eggs_today
+            },
+            'this_week': total_eggs_week,
+            'this_month': total_eggs_month,
+            'avg_daily': round(avg_daily_eggs, 2),
+            'avg_weekly': round(avg_weekly_eggs, 2),
+            'avg_monthly': round(avg_monthly_eggs, 2),
+            'laying_percentage': round(laying_percentage, 2),
+        },
+        'tray_calculations': {
+            'today': {
+                'trays': total_eggs_today // 30,
+                'remaining_eggs': total_eggs_today % 30
+            },
+            'this_week': {
+                'trays': total_eggs_week // 30,
+                'remaining_eggs': total_eggs_week % 30
+            },
+            'this_month': {
+                'trays': total_eggs_month // 30,
+                'remaining_eggs': total_eggs_month % 30
+            }
+        },
+        'feed_requirements': {
+            'daily_kg': round(feed_requirement_daily, 2),
+            'weekly_kg': round(feed_requirement_weekly, 2),
+            'monthly_kg': round(feed_requirement_monthly, 2),
+        },
+        'revenue_estimates': {
+            'daily_usd': round(revenue_daily, 2),
+            'weekly_usd': round(revenue_weekly, 2),
+            'monthly_usd': round(revenue_monthly, 2),
+        },
+        # Financial summary figures, built from the same memo
+        'total_hens': financial_data['total_hens'],
+        'eggs_today': financial_data['eggs_today'],
+        'trays_in_store': financial_data['trays_in_store'],
+        'trays_sold': financial_data['trays_sold'],
+        'total_revenue': financial_data['total_revenue'],
+        'total_expenses': financial_data['total_expenses'],
+        'expenses_today': round(total_expenses_today, 2),
+        'profit_loss': financial_data['profit_loss'],
+        'profit_margin': financial_data['profit_margin'],
+        'feed_efficiency': financial_data['feed_efficiency'],
+        'avg_eggs_per_hen': financial_data['avg_eggs_per_hen'],
+        'feed_bought_week': financial_data['feed_bought_week'],
+        'feed_remaining': financial_data['feed_remaining']
+    }
+
+
+def detailed_report_queries(user, report_date):
+    """
+    The detailed report's independent queries, as {name: loader}.
+
+    detailed_report_data() reads each one through the memo, so running
+    them all first (see cages.fanout) leaves it nothing left to query.
+    """
+    # Get date range for weekly/monthly data
+    week_start = report_date - timedelta(days=report_date.weekday())
+    month_start = report_date.replace(day=1)
+    last_week = report_date - timedelta(days=7)
+    summary_start = report_date - timedelta(days=6)
+
+    def flock_size():
+        total = farm_settings.total_chickens()
+        return Chicken.objects.filter(cage__user=user).count() if total is None else total
+
+    def trays_in_stock():
+        store, created = Store.objects.get_or_create(id=1, defaults={'trays_in_stock': 0})
+        return store.trays_in_stock
+
+    user_eggs = Egg.objects.filter(laid_date__gte=last_week, laid_date__lte=report_date).filter(
+        Q(chicken__cage__user=user) | Q(recorded_by=user)
+    )
+    week_sales = Sale.objects.filter(date__gte=last_week, date__lte=report_date)
+    week_expenses = Expense.objects.filter(date__gte=last_week, date__lte=report_date)
+
+    return {
+        # Basic farm info
+        'total_cages': lambda: Cage.objects.filter(user=user).count(),
+        'total_chickens': flock_size,
+        'total_capacity': lambda: Cage.objects.aggregate(total=Sum('capacity'))['total'] or 0,
+        # Egg production for the specific date, week and month from the daily rollup
+        'egg_totals': lambda: egg_count_totals(
+            cage_today=Q(date=report_date, source='cage'),
+            shade_today=Q(date=report_date, source='shade'),
+            week=Q(date__gte=week_start, date__lte=report_date),
+            month=Q(date__gte=month_start, date__lte=report_date),
+        ),
+        # Financial data for the week: revenue, operating costs and feed inventory
+        'finance': lambda: period_financials(week_start, report_date),
+        'trays_in_stock': trays_in_stock,
+        # Recent activity for the last 7 days
+        'recent_eggs': lambda: list(user_eggs.order_by('-laid_date')[:10]),
+        'recent_sales': lambda: list(week_sales.order_by('-date')[:5]),
+        'recent_expenses': lambda: list(week_expenses.order_by('-date')[:5]),
+        'egg_collection_records': lambda: list(
+            user_eggs.values('laid_date', 'source').annotate(count=Count('id')).order_by('-laid_date')
+        ),
+        'sales_records': lambda: list(
+            week_sales.values('date', 'trays_sold', 'price_per_tray', 'total_amount').order_by('-date')
+        ),
+        'expense_records': lambda: list(
+            week_expenses.values('date', 'expense_type', 'amount', 'description').order_by('-date')
+        ),
+        # Per-day totals for the daily summaries, one grouped query each
+        'eggs_by_day': lambda: daily_egg_totals(summary_start, report_date),
+        'sales_by_day': lambda: {
+            row['date']: row for row in Sale.objects.filter(date__gte=summary_start, date__lte=report_date).values(
+                'date'
+            ).annotate(trays=Sum('trays_sold'), revenue=Sum('total_amount')).order_by()
+        },
+        'expenses_by_day': lambda: dict(
+            Expense.objects.filter(date__gte=summary_start, date__lte=report_date).values('date').annotate(
+                total=Sum('amount')
+            ).order_by().values_list('date', 'total')
+        ),
+    }
+
+
+def detailed_report_data(user, report_date, memo=None):
+    """Farm activity for the week up to report_date, for the detailed reports page"""
+    memo = memo or RequestMemo()
+    queries = detailed_report_queries(user, report_date)
+
+    def query(name):
+        return memo.get(('detailed', name), queries[name])
+
+    total_cages = query('total_cages')
+    total_chickens = query('total_chickens')
+
+    egg_totals = query('egg_totals')
+    cage_eggs_today = egg_totals['cage_today']
+    shade_eggs_today = egg_totals['shade_today']
+    total_eggs_today = cage_eggs_today + shade_eggs_today
+
+    # Weekly and monthly egg totals
+    eggs_week = egg_totals['week']
+    eggs_month = egg_totals['month']
+
+    finance = query('finance')
+    total_revenue = finance['revenue']
+    total_feed_used_kg = finance['feed_used_kg']
+    feed_cost_this_week = finance['feed_cost']
+    total_operating_expenses = finance['other_operating_expenses']
+    total_operating_costs = finance['operating_costs']
+
+    # Profit/Loss
+    profit_loss = finance['profit_loss']
+
+    # Feed inventory
+    feed_remaining = finance['feed_remaining_kg']
+
+    recent_eggs = query('recent_eggs')
+    recent_sales = query('recent_sales')
+    recent_expenses = query('recent_expenses')
+
+    # Calculate daily summaries for the week
+    eggs_by_day = query('eggs_by_day')
+    sales_by_day = query('sales_by_day')
+    expenses_by_day = query('expenses_by_day')
+    daily_summaries = []
+    for i in range(7):
+        day_date = report_date - timedelta(days=i)
+        day_eggs = eggs_by_day.get(day_date, 0)
+        day_sales = sales_by_day.get(day_date, {})
+        day_revenue = day_sales.get('revenue') or 0
+        day_expenses = expenses_by_day.get(day_date) or 0
+
+        daily_summaries.append({
+            'date': day_date.isoformat(),
+            'eggs_collected': day_eggs,
+            'trays_sold': day_sales.get('trays') or 0,
+            'revenue': round(day_revenue, 2),
+            'expenses': round(day_expenses, 2),
+            'profit_loss': round(day_revenue - day_expenses, 2),
+            'status': 'recorded' if day_eggs > 0 else 'no_data'
+        })
+
+    # Compile comprehensive report matching frontend expectations
+    data = {
+        'date_range': {
+            'start_date': (report_date - timedelta(days=7)).isoformat(),
+            'end_date': report_date.isoformat()
+        },
+        'summary_totals': {
+            'total_eggs': total_eggs_today,
+            'total_trays_sold': finance['trays_sold'],
+            'total_revenue': round(total_revenue, 2),
+            'total_expenses': round(total_operating_costs, 2),
+            'total_profit_loss': round(profit_loss, 2)
+        },
+        'egg_collection_records': query('egg_collection_records'),
+        'sales_records': query('sales_records'),
+        'expense_records': query('expense_records'),
+        'daily_summaries': daily_summaries,
+        'farm_overview': {
+            'total_cages': total_cages,
+            'total_chickens': total_chickens,
+            'total_capacity': query('total_capacity'),
+        },
+        'egg_production': {
+            'today': {
+                'total': total_eggs_today,
+                'cage_eggs': cage_eggs_today,
+                'shade_eggs': shade_eggs_today,
+                'trays_produced': total_eggs_today // 30,
+                'remaining_eggs': total_eggs_today % 30
+            },
+            'this_week': eggs_week,
+            'this_month': eggs_month,
+            'laying_percentage': round((total_eggs_today / total_chickens * 100), 2) if total_chickens > 0 else 0
+        },
+        'financial_summary': {
+            'revenue': round(total_revenue, 2),
+            'operating_expenses': round(total_operating_costs, 2),
+            'feed_cost': round(feed_cost_this_week, 2),
+            'other_expenses': round(total_operating_expenses, 2),
+            'profit_loss': round(profit_loss, 2),
+            'profit_margin': round(finance['profit_margin'], 2)
+        },
+        'inventory_status': {
+            'trays_in_store': query('trays_in_stock'),
+            'feed_remaining_kg': round(feed_remaining, 2),
+            'feed_used_this_week': round(total_feed_used_kg, 2)
+        },
+        'recent_activities': {
+            'eggs_collected': [
+                {
+                    'date': egg.laid_date.isoformat(),
+                    'source': egg.source,
+                    'cage_id': egg.cage_id,
+                    'partition': egg.partition_index
+                } for egg in recent_eggs
+            ],
+            'sales': [
+                {
+                    'date': sale.date.isoformat(),
+                    'trays_sold': sale.trays_sold,
+                    'price_per_tray': sale.price_per_tray,
+                    'total_amount': sale.total_amount
+                } for sale in recent_sales
+            ],
+            'expenses': [
+                {
+                    'date': expense.date.isoformat(),
+                    'type': expense.expense_type,
+                    'amount': expense.amount,
+                    'description': expense.description
+                } for expense in recent_expenses
+            ]
+        }
+    }
+
+    return data
+
+
+async def dashboard_overview_data_async(user, today=None):
+    """dashboard_overview_data() with its independent queries run concurrently"""
+    memo = RequestMemo()
+    today = today or datetime.now().date()
+    await fan_out(memo, 'dashboard', dashboard_queries(user, memo, today))
+    return await sync_to_async(dashboard_overview_data)(user, memo, today)
+
+
+async def detailed_report_data_async(user, report_date):
+    """detailed_report_data() with its independent queries run concurrently"""
+    memo = RequestMemo()
+    await fan_out(memo, 'detailed', detailed_report_queries(user, report_date))
+    return await sync_to_async(detailed_report_data)(user, report_date, memo)
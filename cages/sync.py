@@ -0,0 +1,234 @@
+from datetime import date as date_type, datetime
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from .egg_collection import (
+    CollectionError, already_recorded, already_recorded_message, build_collection,
+    collection_notifications, notification_recipients,
+)
+from .models import Egg, Sale, Expense, FeedConsumption, Notification, SyncOperation
+from .rollups import rebuild_egg_rollups
+from .stock import InsufficientStock, add_trays, remove_trays
+from .versions import bump
+
+OPERATION_TYPES = ('collection', 'sale', 'feed_consumption', 'expense')
+
+# Everything but egg collection is owner-only, as on the single-item endpoints
+OWNER_OPERATIONS = ('sale', 'feed_consumption', 'expense')
+
+MAX_KEY_LENGTH = 64
+
+
+class OperationRejected(ValueError):
+    pass
+
+
+class KeyConflict(Exception):
+    """Another request applied some of the batch's idempotency keys first"""
+
+
+def _date(value):
+    if not value:
+        return datetime.now().date()
+    if isinstance(value, date_type):
+        return value
+    try:
+        return date_type.fromisoformat(str(value))
+    except ValueError:
+        raise OperationRejected(f'Invalid date: {value}')
+
+
+def _positive(value, name, cast=Decimal):
+    if value in (None, ''):
+        raise OperationRejected(f'{name} is required')
+    try:
+        number = cast(value)
+    except (ValueError, TypeError, InvalidOperation):
+        raise OperationRejected(f'{name} must be a number')
+    if not number > 0:
+        raise OperationRejected(f'{name} must be greater than 0')
+    return number
+
+
+class SyncBatch:
+    """
+    Applies one batch of operations for a user.
+
+    Stock changes happen as each operation is applied, so a sale can use
+    trays collected earlier in the same batch. Everything else is gathered
+    and written with bulk inserts by flush().
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.eggs = []
+        self.notifications = []
+        self.feed = []
+        self.expenses = []
+        self.records = []
+        self.collection_dates = set()
+        self._recipients = None
+
+    def recipients(self):
+        if self._recipients is None:
+            self._recipients = notification_recipients(self.user)
+        return self._recipients
+
+    def collection(self, data):
+        if not data.get('date'):
+            raise OperationRejected('Date is required')
+        collection_date = _date(data.get('date'))
+        if collection_date in self.collection_dates or already_recorded(self.user, collection_date):
+            raise OperationRejected(already_recorded_message(self.user, collection_date))
+
+        try:
+            collection = build_collection(
+                self.user, collection_date, data.get('shade_eggs', 0), data.get('cages', [])
+            )
+        except CollectionError as e:
+            # Bad counts reject this operation alone, before anything is written
+            raise OperationRejected(str(e))
+        except (TypeError, ValueError, AttributeError) as e:
+            raise OperationRejected(f'Invalid collection data: {e}')
+        if collection.trays > 0:
+            add_trays(collection.trays, 'collection', date=collection_date, recorded_by=self.user)
+
+        self.collection_dates.add(collection_date)
+        self.eggs.extend(collection.eggs)
+        self.notifications.extend(
+            collection_notifications(self.user, collection_date, collection, self.recipients())
+        )
+        return {
+            'date': collection_date.isoformat(),
+            'total_eggs': collection.total_eggs,
+            'shade_eggs': collection.shade_eggs,
+            'cage_eggs': collection.cage_eggs,
+            'trays_added': collection.trays,
+        }
+
+    def sale(self, data):
+        trays_sold = _positive(data.get('trays_sold'), 'trays_sold', int)
+        price_per_tray = _positive(data.get('price_per_tray'), 'price_per_tray')
+        sale_date = _date(data.get('date'))
+
+        movement = remove_trays(trays_sold, 'sale', date=sale_date, recorded_by=self.user)
+        sale = Sale.objects.create(date=sale_date, trays_sold=trays_sold, price_per_tray=price_per_tray)
+        movement.sale = sale
+        movement.save(update_fields=['sale'])
+        return {
+            'sale_id': sale.id,
+            'date': sale_date.isoformat(),
+            'trays_sold': trays_sold,
+            'total_amount': str(sale.total_amount),
+            'trays_in_stock': movement.balance_after,
+        }
+
+    def feed_consumption(self, data):
+        quantity_used_kg = _positive(data.get('quantity_used_kg'), 'quantity_used_kg')
+        usage_date = _date(data.get('date'))
+        self.feed.append(FeedConsumption(date=usage_date, quantity_used_kg=quantity_used_kg))
+        return {'date': usage_date.isoformat(), 'quantity_used_kg': str(quantity_used_kg)}
+
+    def expense(self, data):
+        expense_type = data.get('expense_type')
+        if not expense_type:
+            raise OperationRejected('expense_type is required')
+        if len(expense_type) > Expense._meta.get_field('expense_type').max_length:
+            raise OperationRejected(f'Unknown expense_type: {expense_type}')
+        amount = _positive(data.get('amount'), 'amount')
+        description = (data.get('description') or '')[:Expense._meta.get_field('description').max_length]
+        expense_date = _date(data.get('date'))
+        self.expenses.append(Expense(
+            date=expense_date,
+            expense_type=expense_type,
+            description=description,
+            amount=amount,
+            recorded_by=self.user
+        ))
+        return {'date': expense_date.isoformat(), 'expense_type': expense_type, 'amount': str(amount)}
+
+    def apply(self, operation_type, data):
+        if operation_type in OWNER_OPERATIONS and self.user.role != 'owner':
+            raise OperationRejected('Access denied. Owner role required.')
+        if not isinstance(data, dict):
+            raise OperationRejected('data must be an object')
+        return getattr(self, operation_type)(data)
+
+    def flush(self):
+        Egg.objects.bulk_create(self.eggs, batch_size=500)
+        if self.collection_dates:
+            rebuild_egg_rollups(self.collection_dates)
+        Notification.objects.bulk_create(self.notifications, batch_size=500)
+        FeedConsumption.objects.bulk_create(self.feed, batch_size=500)
+        Expense.objects.bulk_create(self.expenses, batch_size=500)
+        # Bulk inserts don't send post_save, so advance the versions here
+        bumped = [family for family, rows in (
+            ('eggs', self.eggs), ('notifications', self.notifications), ('feed', self.feed), ('expenses', self.expenses)
+        ) if rows]
+        if bumped:
+            bump(*bumped)
+        try:
+            SyncOperation.objects.bulk_create(self.records, batch_size=500)
+        except IntegrityError:
+            # The unique (user, key) constraint: another request got there first
+            raise KeyConflict()
+
+
+def _rejected(key, operation_type, detail):
+    return {'key': key, 'type': operation_type, 'status': 'rejected', 'detail': detail}
+
+
+def apply_operations(user, operations):
+    """
+    Apply queued operations in order inside one transaction.
+
+    Each operation is {'key': ..., 'type': ..., 'data': {...}}. Keys already
+    applied for this user are replayed with their stored result; an
+    operation that fails validation is rejected on its own without
+    stopping the rest. Returns one result per operation, in order.
+    """
+    keys = [op.get('key') for op in operations if isinstance(op, dict) and isinstance(op.get('key'), str)]
+    previous = {
+        record.idempotency_key: record
+        for record in SyncOperation.objects.filter(user=user, idempotency_key__in=keys)
+    }
+
+    batch = SyncBatch(user)
+    results = []
+    seen = set()
+    with transaction.atomic():
+        for op in operations:
+            if not isinstance(op, dict):
+                results.append(_rejected(None, None, 'Each operation must be an object'))
+                continue
+            key, operation_type = op.get('key'), op.get('type')
+
+            if not isinstance(key, str) or not key or len(key) > MAX_KEY_LENGTH:
+                results.append(_rejected(key, operation_type, f'key must be a string of 1 to {MAX_KEY_LENGTH} characters'))
+                continue
+            if key in seen:
+                results.append(_rejected(key, operation_type, 'Duplicate key in batch'))
+                continue
+            seen.add(key)
+
+            if key in previous:
+                record = previous[key]
+                results.append({'key': key, 'type': record.operation_type, 'status': 'replayed', 'result': record.result})
+                continue
+            if operation_type not in OPERATION_TYPES:
+                results.append(_rejected(key, operation_type, f'Unknown operation type: {operation_type}'))
+                continue
+
+            try:
+                result = batch.apply(operation_type, op.get('data') or {})
+            except (OperationRejected, CollectionError, InsufficientStock) as e:
+                results.append(_rejected(key, operation_type, str(e)))
+                continue
+
+            batch.records.append(SyncOperation(
+                user=user, idempotency_key=key, operation_type=operation_type, result=result
+            ))
+            results.append({'key': key, 'type': operation_type, 'status': 'applied', 'result': result})
+
+        batch.flush()
+
+    return results
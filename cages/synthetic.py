@@ -0,0 +1,208 @@
+"""
+Synthetic farm history for benchmarks and load tests.
+
+seed_farm() writes years of plausible daily records for one owner: box by
+box egg collections built through the same code as real submissions, the
+sales, stock movements, feed, expenses and medical records that go with
+them, and a collection notification per day. The output depends only on
+the arguments, so two runs with the same seed build the same farm.
+"""
+import math
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+from . import farm_settings, versions
+from .egg_collection import build_collection, collection_notifications
+from .layout import STANDARD_LAYOUT, COMBINED_LAYOUT
+from .models import (
+    Cage, CageLayout, Sale, Expense, FeedPurchase, FeedConsumption, MedicalRecord,
+    Notification, Store, StockMovement,
+)
+from .rollups import rebuild_egg_rollups
+from .stock import STORE_ID
+
+# Hens housed per box and the flock's average laying rate
+HENS_PER_BOX = 4
+LAYING_RATE = 0.78
+
+FEED_BAG_KG = 50
+FEED_PRICE_PER_KG = 50
+TRAY_PRICE = 300
+# Yearly price rise applied to feed and trays
+INFLATION = 0.08
+
+# Rows held in memory before they are written
+BATCH_SIZE = 5000
+
+SeedResult = namedtuple('SeedResult', ['days', 'cages', 'hens', 'counts'])
+
+
+class _Writer:
+    """Buffers unsaved rows per model and bulk-creates them in batches"""
+
+    def __init__(self):
+        self.pending = {}
+        self.counts = {}
+
+    def add(self, obj):
+        rows = self.pending.setdefault(type(obj), [])
+        rows.append(obj)
+        if len(rows) >= BATCH_SIZE:
+            self.flush(type(obj))
+
+    def flush(self, model=None):
+        for current in [model] if model else list(self.pending):
+            rows = self.pending.pop(current, [])
+            if rows:
+                current.objects.bulk_create(rows, batch_size=1000)
+                self.counts[current.__name__] = self.counts.get(current.__name__, 0) + len(rows)
+
+
+def _price(base, rng, day_index):
+    drift = (1 + INFLATION) ** (day_index / 365)
+    return Decimal(str(round(base * drift * rng.uniform(0.95, 1.05), 2)))
+
+
+def _laying_rate(rng, day):
+    # Fewer eggs in the short-day months, plus day to day noise
+    season = 0.08 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 172) / 365)
+    return min(0.98, max(0.3, LAYING_RATE + season + rng.gauss(0, 0.03)))
+
+
+def create_cages(owner, count):
+    """count cages alternating standard and combined layouts, with their layouts"""
+    cages = []
+    for n in range(count):
+        spec = STANDARD_LAYOUT if n % 2 == 0 else COMBINED_LAYOUT
+        boxes = spec.rows * spec.columns * spec.partitions
+        cage = Cage.objects.create(
+            user=owner, name=f'Cage {n + 1}', capacity=boxes * HENS_PER_BOX, current_count=boxes * HENS_PER_BOX
+        )
+        CageLayout.objects.create(
+            cage=cage, cage_type=spec.cage_type, rows=spec.rows, columns=spec.columns, partitions=spec.partitions
+        )
+        cages.append((cage, spec))
+    return cages
+
+
+def _collection_payload(rng, day, cages):
+    rate = _laying_rate(rng, day)
+    payload = []
+    for cage, spec in cages:
+        partitions = []
+        for partition in range(1, spec.partitions + 1):
+            eggs = [
+                {'boxNumber': box, 'value': sum(rng.random() < rate for _ in range(HENS_PER_BOX))}
+                for box in range(1, spec.rows * spec.columns + 1)
+            ]
+            partitions.append({'partitionIndex': partition, 'eggsCollected': eggs})
+        payload.append({'cageId': cage.id, 'partitions': partitions})
+    return payload
+
+
+def seed_farm(owner, days, cage_count, seed=1, end_date=None):
+    """
+    Write days of history ending at end_date (default today) for owner.
+
+    Creates cage_count new cages and sets the total_chickens setting to
+    their hens. Everything runs in one transaction; data versions are
+    bumped once at the end. Returns a SeedResult with rows written per model.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.now().date()
+    start_date = end_date - timedelta(days=days - 1)
+    writer = _Writer()
+    notifications = []
+
+    with transaction.atomic():
+        cages = create_cages(owner, cage_count)
+        hens = sum(cage.capacity for cage, _ in cages)
+        farm_settings.set_setting('total_chickens', hens)
+
+        store, created = Store.objects.get_or_create(id=STORE_ID, defaults={'trays_in_stock': 0})
+        balance = store.trays_in_stock
+        feed_stock = 0.0
+
+        for day_index in range(days):
+            day = start_date + timedelta(days=day_index)
+
+            collection = build_collection(owner, day, rng.randint(0, 15), _collection_payload(rng, day, cages))
+            for egg in collection.eggs:
+                writer.add(egg)
+            notifications.extend(collection_notifications(owner, day, collection, recipients=[owner]))
+            if collection.trays:
+                balance += collection.trays
+                writer.add(StockMovement(
+                    date=day, reason='collection', change=collection.trays, balance_after=balance, recorded_by=owner
+                ))
+
+            # Sold most days, clearing most of the store
+            if day.weekday() != 6 and balance:
+                trays = max(1, int(balance * rng.uniform(0.6, 1.0)))
+                price = _price(TRAY_PRICE, rng, day_index)
+                sale = Sale(date=day, trays_sold=trays, price_per_tray=price, total_amount=trays * price)
+                writer.add(sale)
+                balance -= trays
+                # Linked to its sale by date; the sale id isn't known before the bulk insert
+                writer.add(StockMovement(
+                    date=day, reason='sale', change=-trays, balance_after=balance, recorded_by=owner
+                ))
+
+            # Feed is bought in bags on Mondays for the coming week
+            daily_feed = hens * farm_settings.DEFAULT_FEED_PER_CHICKEN_KG * rng.uniform(0.95, 1.05)
+            if day.weekday() == 0 or feed_stock < daily_feed:
+                bags = math.ceil(max(daily_feed * 7 - feed_stock, FEED_BAG_KG) / FEED_BAG_KG)
+                quantity = Decimal(bags * FEED_BAG_KG)
+                cost_per_kg = _price(FEED_PRICE_PER_KG, rng, day_index)
+                writer.add(FeedPurchase(
+                    date=day, feed_type='Layers mash', quantity_kg=quantity,
+                    total_cost=quantity * cost_per_kg, cost_per_kg=cost_per_kg
+                ))
+                feed_stock += float(quantity)
+            feed_stock -= daily_feed
+            writer.add(FeedConsumption(date=day, quantity_used_kg=Decimal(str(round(daily_feed, 2)))))
+
+            if day.weekday() == 4:
+                writer.add(Expense(
+                    date=day, expense_type='transport', description='Market delivery',
+                    amount=_price(1500, rng, day_index), recorded_by=owner
+                ))
+            if day.day == 1:
+                writer.add(Expense(
+                    date=day, expense_type='maintenance', description='Cage repairs and cleaning',
+                    amount=_price(4000, rng, day_index), recorded_by=owner
+                ))
+                writer.add(MedicalRecord(
+                    date=day, treatment_type='checkup', description='Monthly flock health check',
+                    cost=_price(2000, rng, day_index), vet_name='Dr. Synthetic', recorded_by=owner
+                ))
+            if day_index % 90 == 0:
+                cost = _price(6000, rng, day_index)
+                writer.add(MedicalRecord(
+                    date=day, treatment_type='vaccination', description='Newcastle disease booster',
+                    medication='Lasota', dosage='1 drop per bird', cost=cost, vet_name='Dr. Synthetic',
+                    recorded_by=owner
+                ))
+                writer.add(Expense(
+                    date=day, expense_type='medicine', description='Vaccination', amount=cost, recorded_by=owner
+                ))
+
+        writer.flush()
+
+        # created_at is set on insert; move each notification to its day
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        for notification in notifications:
+            collected = datetime.strptime(notification.metadata['collection_date'], '%Y-%m-%d')
+            notification.created_at = timezone.make_aware(collected.replace(hour=18))
+            notification.is_read = collected.date() < end_date - timedelta(days=7)
+        Notification.objects.bulk_update(notifications, ['created_at', 'is_read'], batch_size=1000)
+        writer.counts['Notification'] = len(notifications)
+
+        Store.objects.filter(id=STORE_ID).update(trays_in_stock=balance, last_updated=timezone.now())
+        rebuild_egg_rollups()
+        versions.bump('eggs', 'sales', 'expenses', 'feed', 'settings', 'stock', 'flock', 'medical', 'notifications')
+
+    return SeedResult(days=days, cages=cage_count, hens=hens, counts=writer.counts)
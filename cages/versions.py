@@ -0,0 +1,86 @@
+import contextvars
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import (
+    Cage, CageLayout, Chicken, Egg, Sale, Expense, FeedPurchase, FeedConsumption,
+    FarmSettings, StockMovement, MedicalRecord, Notification, DataVersion,
+)
+from .pubsub import hub
+
+# Which data family each model's writes belong to (see cages.signals).
+# Bulk inserts skip signals, so code using bulk_create calls bump() itself.
+MODEL_FAMILIES = {
+    Egg: 'eggs',
+    Sale: 'sales',
+    Expense: 'expenses',
+    FeedPurchase: 'feed',
+    FeedConsumption: 'feed',
+    FarmSettings: 'settings',
+    StockMovement: 'stock',
+    Cage: 'flock',
+    CageLayout: 'flock',
+    Chicken: 'flock',
+    MedicalRecord: 'medical',
+    Notification: 'notifications',
+}
+
+# Families bumped inside a batched() block, waiting for it to end
+_batch = contextvars.ContextVar('version_batch', default=None)
+
+# Everything the dashboard and financial summary are built from
+SUMMARY_FAMILIES = ('eggs', 'sales', 'expenses', 'feed', 'settings', 'stock', 'flock')
+
+
+def bump(*families):
+    """Advance the version of each family by one and wake open event streams"""
+    families = set(families)
+    pending = _batch.get()
+    if pending is not None:
+        pending.update(families)
+        return
+    now = timezone.now()
+    transaction.on_commit(lambda: hub.publish(families))
+    updated = DataVersion.objects.filter(family__in=families).update(version=F('version') + 1, updated_at=now)
+    if updated == len(families):
+        return
+    existing = set(DataVersion.objects.filter(family__in=families).values_list('family', flat=True))
+    for family in families - existing:
+        # First write to this family
+        version, created = DataVersion.objects.get_or_create(family=family, defaults={'version': 1})
+        if not created:
+            DataVersion.objects.filter(family=family).update(version=F('version') + 1, updated_at=now)
+
+
+@contextmanager
+def batched():
+    """
+    Bumps made inside the block, such as the per-row post_delete bumps of a
+    queryset delete, are applied once when it ends without an error.
+    """
+    families = set()
+    token = _batch.set(families)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    if families:
+        bump(*families)
+
+
+def current(families):
+    """
+    {family: (version, updated_at)} from one query. Families that have
+    never been written are at version 0 with no timestamp.
+    """
+    versions = {family: (0, None) for family in families}
+    rows = DataVersion.objects.filter(family__in=families).values_list('family', 'version', 'updated_at')
+    for family, version, updated_at in rows:
+        versions[family] = (version, updated_at)
+    return versions
+
+
+def stamp(versions):
+    """Compact string naming a set of versions, e.g. 'eggs.12-sales.3'"""
+    return '-'.join(f'{family}.{version}' for family, (version, _) in sorted(versions.items()))
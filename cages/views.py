@@ -1,40 +1,62 @@
+import logging
 
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.authentication import SessionAuthentication
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Sum, Count, Avg, Q, Case, When, IntegerField
 from datetime import datetime, timedelta
-from django.http import HttpResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from io import BytesIO
-from .models import Cage, Chicken, Egg, Store, FeedPurchase, FeedConsumption, Sale, Expense, FarmSettings, MedicalRecord, Notification
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.urls import reverse
+from itertools import chain
+from collections import Counter
+from django.conf import settings
+from authentication.authentication import QueryParamTokenAuthentication
+from . import farm_settings
+from .models import Cage, Chicken, Egg, Store, FeedPurchase, FeedConsumption, Sale, Expense, MedicalRecord, Notification, ReportJob
 from .serializers import CageSerializer, ChickenSerializer, EggSerializer, NotificationSerializer
+from .rollups import rebuild_egg_rollups, egg_count_totals, daily_egg_totals
+from .finance import period_financials
+from .summaries import (
+    dashboard_overview_data, financial_summary_data, detailed_report_data,
+    dashboard_overview_data_async, detailed_report_data_async,
+)
+from .coalesce import request_key, single_flight
+from .response_cache import cached_payload, cached_payload_async
+from .conditional import conditional
+from .events import event_stream, token_user
+from .versions import SUMMARY_FAMILIES, batched, bump
+from .stock import InsufficientStock, add_trays, remove_trays, reset_stock
+from .streaming import StreamingFileResponse
+from .pagination import InvalidCursor, keyset_page, wants_ndjson, iter_rows, ndjson_response
+from .reports import (
+    PERIOD_REPORT_TYPES, render_period_report, egg_collection_table_filename, performance_comment, period_report_filename,
+)
+from .report_jobs import REPORT_TYPES, open_artifact, open_or_request, request_report
+from .layout import fill_cage_grids
+from .sync import KeyConflict, apply_operations
+from .egg_collection import (
+    CollectionError, already_recorded, already_recorded_message, build_collection,
+    collection_notifications, build_egg_collection_notification,
+)
+
+logger = logging.getLogger(__name__)
 
 class CageViewSet(viewsets.ModelViewSet):
     serializer_class = CageSerializer
 
     def get_queryset(self):
-        return Cage.objects.filter(user=self.request.user)
+        # The serializer reads each cage's layout
+        return Cage.objects.filter(user=self.request.user).select_related('layout')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        # Override cage type based on ID to fix incorrect database values
-        cage_id = instance.id
-        if cage_id == 1:
-            data['type'] = 'standard'
-        elif cage_id == 2:
-            data['type'] = 'combined'
-        return data
-
 class ChickenViewSet(viewsets.ModelViewSet):
     serializer_class = ChickenSerializer
 
@@ -53,11 +75,27 @@ class EggViewSet(viewsets.ModelViewSet):
     serializer_class = EggSerializer
 
     def get_queryset(self):
-        return Egg.objects.filter(chicken__cage__user=self.request.user)
+        # chicken_tag is read from the chicken of every egg
+        return Egg.objects.filter(chicken__cage__user=self.request.user).select_related('chicken')
 
     def perform_create(self, serializer):
         chicken = get_object_or_404(Chicken, id=self.request.data.get('chicken'), cage__user=self.request.user)
-        serializer.save()
+        with transaction.atomic():
+            egg = serializer.save()
+            rebuild_egg_rollups([egg.laid_date])
+
+    def perform_update(self, serializer):
+        # An edit can move the egg to another day; both days are recounted
+        old_date = serializer.instance.laid_date
+        with transaction.atomic():
+            egg = serializer.save()
+            rebuild_egg_rollups([old_date, egg.laid_date])
+
+    def perform_destroy(self, instance):
+        laid_date = instance.laid_date
+        with transaction.atomic():
+            instance.delete()
+            rebuild_egg_rollups([laid_date])
 
     @action(detail=False, methods=['post'], url_path='submit-cage')
     def submit_cage(self, request):
@@ -68,30 +106,33 @@ class EggViewSet(viewsets.ModelViewSet):
         # Get the cage
         cage = get_object_or_404(Cage, id=cage_id, user=request.user)
 
-        # Process each partition
-        for partition in partitions:
-            partition_index = partition.get('partitionIndex')
-            eggs_collected = partition.get('eggsCollected', [])
-            comments = partition.get('comments', '')
-
-            # For each egg collected, create an egg record
-            for egg_data in eggs_collected:
-                # Create egg record for each collected egg
-                # We'll associate it with a chicken from this cage if possible
-                chicken = Chicken.objects.filter(cage=cage).first()
-                Egg.objects.create(
-                    chicken=chicken,  # Associate with first chicken in cage
-                    laid_date=request.data.get('date', None),
-                    weight_g=0.0,  # Default weight, can be updated later
-                    quality='Good'  # Default quality rating
-                )
+        with transaction.atomic():
+            # Process each partition
+            for partition in partitions:
+                partition_index = partition.get('partitionIndex')
+                eggs_collected = partition.get('eggsCollected', [])
+                comments = partition.get('comments', '')
+
+                # For each egg collected, create an egg record
+                for egg_data in eggs_collected:
+                    # Create egg record for each collected egg
+                    # We'll associate it with a chicken from this cage if possible
+                    chicken = Chicken.objects.filter(cage=cage).first()
+                    Egg.objects.create(
+                        chicken=chicken,  # Associate with first chicken in cage
+                        laid_date=request.data.get('date', None),
+                        weight_g=0.0,  # Default weight, can be updated later
+                        quality='Good'  # Default quality rating
+                    )
+
+            rebuild_egg_rollups([request.data.get('date', None)])
 
         return Response({'message': 'Cage data submitted successfully'}, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['post'], url_path='submit-daily-collection')
     def submit_daily_collection(self, request):
         data = request.data
-        print(f"DEBUG: submit_daily_collection called with data: {data}")
+        logger.debug('submit_daily_collection called with data: %s', data)
         collection_date = data.get('date')
         shade_eggs = data.get('shade_eggs', 0)
         cages_data = data.get('cages', [])
@@ -101,150 +142,46 @@ class EggViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Date is required'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Check if data has already been submitted for this date by this user
-        existing_eggs = Egg.objects.filter(
-            laid_date=collection_date,
-            recorded_by=request.user
-        )
-
-        if existing_eggs.exists():
-            recorder_name = request.user.username or request.user.email
+        if already_recorded(request.user, collection_date):
             return Response({
-                'detail': f'Egg collection data has already been recorded for {collection_date} by {recorder_name}. Each date can only be recorded once per user.'
+                'detail': already_recorded_message(request.user, collection_date)
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Allow submission with just shade eggs or just cage data
-        if shade_eggs <= 0 and not cages_data:
-            return Response({'detail': 'Cannot submit empty data. Please enter egg counts or shade eggs.'}, status=status.HTTP_400_BAD_REQUEST)
-        
-        print(f"DEBUG: Data validation passed")
-        
         try:
-            # Process the daily egg collection data
-            # We'll track eggs from both shade areas and cage collections
-
-            total_eggs_collected = shade_eggs
-
-            # Process shade eggs - create ONE record with count stored in metadata
-            if shade_eggs > 0:
-                Egg.objects.create(
-                    chicken=None,  # Shade eggs aren't tied to specific chickens
-                    laid_date=collection_date,
-                    weight_g=0.0,  # Weight measured separately if needed
-                    quality='Good',  # Assumed good quality for shade eggs
-                    source='shade',
-                    recorded_by=request.user,
-                    metadata={'egg_count': shade_eggs}  # Store count in metadata
-                )
-
-            # Process each cage
-            for cage_data in cages_data:
-                cage_id = cage_data.get('cageId')
-                cage_type = cage_data.get('cageType')
-                partitions = cage_data.get('partitions', [])
-
-                if not cage_id:
-                    continue
-
-                # Assume cage_id is valid for this user
-
-                # Process each partition
-                for partition in partitions:
-                    partition_index = partition.get('partitionIndex')
-                    eggs_collected = partition.get('eggsCollected', [])
-                    comments = partition.get('comments', '')
-                    
-                    # Group eggs by box to avoid duplicate records
-                    box_eggs = {}
-                    for egg_data in eggs_collected:
-                        box_number = None
-                        egg_count = 1
-
-                        if isinstance(egg_data, dict):
-                            if 'boxNumber' in egg_data:
-                                box_number = egg_data['boxNumber']
-                            elif 'box_number' in egg_data:
-                                box_number = egg_data['box_number']
-
-                            if 'value' in egg_data:
-                                egg_count = egg_data['value']
-                            elif 'count' in egg_data:
-                                egg_count = egg_data['count']
-
-                        # Store the count for this box (don't create individual records)
-                        if box_number:
-                            box_eggs[box_number] = egg_count
-                            total_eggs_collected += egg_count
-
-                    # Create ONE egg record per box with the count stored in metadata
-                    for box_number, egg_count in box_eggs.items():
-                        Egg.objects.create(
-                            chicken=None,
-                            laid_date=collection_date,
-                            weight_g=0.0,
-                            quality='Good',
-                            source='cage',
-                            cage_id=cage_id,
-                            partition_index=partition_index - 1,
-                            box_number=box_number,
-                            recorded_by=request.user,
-                            metadata={'egg_count': egg_count}  # Store count in metadata
-                        )
-
-            # Convert eggs to trays for storage (30 eggs per tray)
-            trays_to_add = total_eggs_collected // 30
-            if trays_to_add > 0:
-                store, created = Store.objects.get_or_create(id=1, defaults={'trays_in_stock': 0})
-                store.trays_in_stock += trays_to_add
-                store.save()
-            
-            print(f"DEBUG: Submission successful, trays added: {trays_to_add}")
-            
-            # Calculate cage eggs (total - shade eggs)
-            cage_eggs = total_eggs_collected - shade_eggs
-            
-            # Send notification to owner
-            from authentication.models import User
-            recorder_name = request.user.username or request.user.email or 'A team member'
-            
-            # Find the owner(s) for this farm and send notifications
-            # If the current user is the owner, send notification to themselves
-            # If the current user is a worker, send notification to the owner
-            if request.user.role == 'owner':
-                # User is owner, send notification to themselves
-                send_egg_collection_notification(
-                    owner=request.user,
-                    collection_date=collection_date,
-                    recorder_name=recorder_name,
-                    total_eggs=total_eggs_collected,
-                    cage_eggs=cage_eggs,
-                    shade_eggs=shade_eggs
-                )
-            else:
-                # User is a worker, find the owner and notify them
-                # Get owner(s) from cages (the user who owns the cages)
-                owners = User.objects.filter(role='owner')
-                for owner in owners:
-                    send_egg_collection_notification(
-                        owner=owner,
-                        collection_date=collection_date,
-                        recorder_name=recorder_name,
-                        total_eggs=total_eggs_collected,
-                        cage_eggs=cage_eggs,
-                        shade_eggs=shade_eggs
-                    )
-            
+            # Allow submission with just shade eggs or just cage data
+            collection = build_collection(request.user, collection_date, shade_eggs, cages_data)
+
+            notifications = collection_notifications(request.user, collection_date, collection)
+
+            # Eggs, rollup, store and notifications succeed or fail together
+            with transaction.atomic():
+                Egg.objects.bulk_create(collection.eggs, batch_size=500)
+                bump('eggs')
+
+                # Keep the daily rollup in step with the records just written
+                rebuild_egg_rollups([collection_date])
+
+                # Convert eggs to trays for storage (30 eggs per tray)
+                if collection.trays > 0:
+                    add_trays(collection.trays, 'collection', date=collection_date, recorded_by=request.user)
+
+                Notification.objects.bulk_create(notifications)
+                bump('notifications')
+
+            logger.debug('Daily collection for %s submitted, trays added: %s', collection_date, collection.trays)
+
             return Response({
-                'message': f'Daily collection submitted successfully. Added {trays_to_add} trays to store.',
-                'total_eggs': total_eggs_collected,
-                'shade_eggs': shade_eggs,
-                'cage_eggs': cage_eggs,
-                'trays_added': trays_to_add
+                'message': f'Daily collection submitted successfully. Added {collection.trays} trays to store.',
+                'total_eggs': collection.total_eggs,
+                'shade_eggs': collection.shade_eggs,
+                'cage_eggs': collection.cage_eggs,
+                'trays_added': collection.trays
             }, status=status.HTTP_201_CREATED)
 
+        except CollectionError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
-        
-            print(f"DEBUG: Exception during submission: {str(e)}")
-        
+            logger.exception('Daily collection submission failed')
             return Response({'detail': f'Error processing submission: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -253,251 +190,40 @@ def dashboard_overview(request):
     if request.user.role != 'owner':
         return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
 
-    # Get real data from database
-    total_cages = Cage.objects.filter(user=request.user).count()
-
-    # Get the total chicken count from settings or database
-    chicken_setting = FarmSettings.objects.filter(key='total_chickens').first()
-    if chicken_setting:
-        try:
-            total_chickens = int(chicken_setting.value)
-        except (ValueError, TypeError):
-            total_chickens = Chicken.objects.filter(cage__user=request.user).count()
-    else:
-        total_chickens = Chicken.objects.filter(cage__user=request.user).count()
-
-    # Calculate egg production metrics with detailed breakdown
-    today = datetime.now().date()
-    week_start = today - timedelta(days=today.weekday())
-    month_start = today.replace(day=1)
-
-    # Get today's egg collection data
-    today_eggs = Egg.objects.filter(laid_date=today).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    )
-
-    # Count eggs by source - sum actual values from metadata, not record count
-    def count_eggs_from_metadata(eggs_queryset, source_filter=None):
-        """Sum all egg values from metadata JSON field"""
-        total = 0
-        for egg in eggs_queryset:
-            if egg.metadata:
-                # Check if metadata has 'egg_count' key (new format)
-                if isinstance(egg.metadata, dict):
-                    if 'egg_count' in egg.metadata:
-                        # New format: {'egg_count': 4}
-                        count = egg.metadata['egg_count']
-                        if isinstance(count, (int, float)):
-                            total += int(count)
-                    else:
-                        # Old format: iterate over box values
-                        for box, count in egg.metadata.items():
-                            if isinstance(count, (int, float)):
-                                total += int(count)
-        return total
-
-    # Filter by source and count from metadata
-    cage_eggs_qs = today_eggs.filter(source='cage')
-    shade_eggs_qs = today_eggs.filter(source='shade')
-    
-    # Count actual eggs from metadata (these are integers for response)
-    cage_eggs_today = count_eggs_from_metadata(cage_eggs_qs)
-    shade_eggs_today = count_eggs_from_metadata(shade_eggs_qs)
-    total_eggs_today = cage_eggs_today + shade_eggs_today
-
-    # Break down eggs by cage for detailed reporting
-    cage_breakdown = {}
-    for cage_id in [1, 2]:  # Standard farm has 2 cages
-        cage_eggs = today_eggs.filter(cage_id=cage_id, source='cage')
-        
-        # Sum eggs from metadata for each partition
-        front_total = 0
-        back_total = 0
-        for egg in cage_eggs:
-            if egg.metadata:
-                # Determine partition from metadata or use partition_index
-                partition_idx = getattr(egg, 'partition_index', 0)
-                for box, count in egg.metadata.items():
-                    if isinstance(count, (int, float)):
-                        if partition_idx == 0:
-                            front_total += int(count)
-                        else:
-                            back_total += int(count)
-        
-        total_cage_eggs = front_total + back_total
-        
-        if total_cage_eggs > 0:
-            cage_breakdown[cage_id] = {
-                'total': total_cage_eggs,
-                'front': front_total,
-                'back': back_total
-            }
-
-    # Weekly and monthly totals - sum from metadata
-    week_eggs = Egg.objects.filter(laid_date__gte=week_start, laid_date__lte=today).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    )
-    month_eggs = Egg.objects.filter(laid_date__gte=month_start, laid_date__lte=today).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    )
-    
-    total_eggs_week = count_eggs_from_metadata(week_eggs)
-    total_eggs_month = count_eggs_from_metadata(month_eggs)
-
-    # Calculate averages
-    days_this_month = (today - month_start).days + 1
-    avg_daily_eggs = total_eggs_month / days_this_month if days_this_month > 0 else 0
-    avg_weekly_eggs = total_eggs_week / 7
-    avg_monthly_eggs = total_eggs_month
-
-    # Calculate the laying percentage for the flock
-    if total_chickens > 0:
-        laying_percentage = total_eggs_today / total_chickens * 100
-    else:
-        laying_percentage = 0
+    # Served from cache until a collection, sale, expense or feed record changes
+    return Response(cached_payload(
+        'dashboard_overview', request.user, SUMMARY_FAMILIES, lambda: dashboard_overview_data(request.user)
+    ))
 
-    # Get feed requirements from farm settings, with a reasonable default
-    feed_setting = FarmSettings.objects.filter(key='feed_per_chicken_daily_kg').first()
-    if feed_setting:
-        feed_per_chicken_daily = float(feed_setting.value)
-    else:
-        feed_per_chicken_daily = 0.12  # Standard feed requirement per chicken
-
-    feed_requirement_daily = total_chickens * feed_per_chicken_daily
-    feed_requirement_weekly = feed_requirement_daily * 7
-    feed_requirement_monthly = feed_requirement_daily * 30
-
-    # Estimate revenue based on current market prices
-    revenue_daily = total_eggs_today * 0.15  # $0.15 per egg market rate
-    revenue_weekly = total_eggs_week * 0.15
-    revenue_monthly = total_eggs_month * 0.15
-
-    # Get cage utilization
-    total_capacity = Cage.objects.aggregate(total=Sum('capacity'))['total'] or 0
-    current_occupancy = Chicken.objects.count()
-    utilization_rate = (current_occupancy / total_capacity * 100) if total_capacity > 0 else 0
-
-    # Convert eggs to trays for packaging (30 eggs = 1 tray)
-    trays_today = total_eggs_today // 30
-    remaining_eggs_today = total_eggs_today % 30
-    trays_week = total_eggs_week // 30
-    remaining_eggs_week = total_eggs_week % 30
-    trays_month = total_eggs_month // 30
-    remaining_eggs_month = total_eggs_month % 30
-
-    # Calculate today's operating expenses
-    today = datetime.now().date()
 
-    # Get today's operating expenses (excluding feed purchases which are capital expenses)
-    today_expenses = Expense.objects.filter(
-        date=today
-    ).exclude(expense_type='feed').aggregate(total=Sum('amount'))['total'] or 0
-
-    # Calculate today's feed consumption cost based on actual usage
-    # This represents the operating expense for feed consumed
-    feed_cost_today = 0
-    if total_chickens > 0 and feed_per_chicken_daily > 0:
-        # Calculate expected daily feed consumption
-        daily_feed_kg = total_chickens * feed_per_chicken_daily
-
-        # Get cost per kg from recent feed purchases
-        recent_purchases = FeedPurchase.objects.filter(
-            date__gte=today - timedelta(days=90)  # Last 3 months for accurate average
-        ).order_by('-date')
-
-        if recent_purchases.exists():
-            # Calculate weighted average cost per kg
-            total_cost = 0
-            total_qty = 0
-            for purchase in recent_purchases:
-                if purchase.quantity_kg and purchase.total_cost:
-                    total_cost += purchase.total_cost
-                    total_qty += purchase.quantity_kg
-
-            if total_qty > 0:
-                avg_cost_per_kg = total_cost / total_qty
-                feed_cost_today = daily_feed_kg * avg_cost_per_kg
-        else:
-            # Use standard market rate if no purchase history available
-            avg_cost_per_kg = 55.71  # Ksh per kg - current market rate
-            feed_cost_today = daily_feed_kg * avg_cost_per_kg
+async def async_owner(request):
+    """The authenticated owner for an async view, as (user, error_response)"""
+    user = await token_user(request)
+    if user is None:
+        return None, JsonResponse({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if user.role != 'owner':
+        return None, JsonResponse({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
+    return user, None
 
-    # Note: Feed purchases are capital expenses (inventory investment) and are not
-    # included in daily operating expenses. Only feed consumption affects daily profit/loss.
 
-    total_expenses_today = today_expenses + feed_cost_today
+def json_response(data):
+    # Rendered like DRF's Response so both variants return the same bytes
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json')
 
-    # Get financial summary data for the dashboard
-    from django.test import RequestFactory
-    factory = RequestFactory()
-    financial_request = factory.get('/api/cages/financial/summary/')
-    financial_request.user = request.user
-    financial_data = financial_summary(financial_request).data
 
-    data = {
-        'total_cages': total_cages,
-        'total_chickens': total_chickens,
-        'total_capacity': total_capacity,
-        'utilization_rate': round(utilization_rate, 2),
-        'egg_production': {
-            'today': total_eggs_today,
-            'today_breakdown': {
-                'cage_eggs': cage_eggs_today,
-                'shade_eggs': shade_eggs_today,
-                'cages': cage_breakdown,
-                'total': total_eggs_today
-            },
-            'this_week': total_eggs_week,
-            'this_month': total_eggs_month,
-            'avg_daily': round(avg_daily_eggs, 2),
-            'avg_weekly': round(avg_weekly_eggs, 2),
-            'avg_monthly': round(avg_monthly_eggs, 2),
-            'laying_percentage': round(laying_percentage, 2),
-        },
-        'tray_calculations': {
-            'today': {
-                'trays': trays_today,
-                'remaining_eggs': remaining_eggs_today
-            },
-            'this_week': {
-                'trays': trays_week,
-                'remaining_eggs': remaining_eggs_week
-            },
-            'this_month': {
-                'trays': trays_month,
-                'remaining_eggs': remaining_eggs_month
-            }
-        },
-        'feed_requirements': {
-            'daily_kg': round(feed_requirement_daily, 2),
-            'weekly_kg': round(feed_requirement_weekly, 2),
-            'monthly_kg': round(feed_requirement_monthly, 2),
-        },
-        'revenue_estimates': {
-            'daily_usd': round(revenue_daily, 2),
-            'weekly_usd': round(revenue_weekly, 2),
-            'monthly_usd': round(revenue_monthly, 2),
-        },
-        # Include financial summary data from the financial API
-        'total_hens': financial_data.get('total_hens', total_chickens),
-        'eggs_today': financial_data.get('eggs_today', total_eggs_today),
-        'trays_in_store': financial_data.get('trays_in_store', 0),
-        'trays_sold': financial_data.get('trays_sold', 0),
-        'total_revenue': financial_data.get('total_revenue', 0),
-        'total_expenses': financial_data.get('total_expenses', 0),
-        'expenses_today': round(total_expenses_today, 2),
-        'profit_loss': financial_data.get('profit_loss', 0),
-        'profit_margin': financial_data.get('profit_margin', 0),
-        'feed_efficiency': financial_data.get('feed_efficiency', 0),
-        'avg_eggs_per_hen': financial_data.get('avg_eggs_per_hen', 0),
-        'feed_bought_week': financial_data.get('feed_bought_week', 0),
-        'feed_remaining': financial_data.get('feed_remaining', 0)
-    }
+async def dashboard_overview_async(request):
+    """dashboard_overview for the ASGI server, running its independent queries concurrently"""
+    user, error = await async_owner(request)
+    if error:
+        return error
 
-    return Response(data)
+    return json_response(await cached_payload_async(
+        'dashboard_overview', user, SUMMARY_FAMILIES, lambda: dashboard_overview_data_async(user)
+    ))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('eggs', 'flock', 'settings')
 def egg_collection_table(request):
     """Generate egg collection table data for PDF/Excel export"""
     # Get date from query params, default to today
@@ -513,60 +239,18 @@ def egg_collection_table(request):
     # Include ALL eggs for this date (no user filter - all farm eggs are visible)
     eggs = Egg.objects.filter(laid_date=collection_date)
 
-    # Calculate laying percentage and performance comments
-    chicken_setting = FarmSettings.objects.filter(key='total_chickens').first()
-    total_chickens = int(chicken_setting.value) if chicken_setting else Chicken.objects.filter(cage__user=request.user).count()
+    # Lay every egg into its cage's box grid with one grouped query
+    grids, shade_eggs_count, grand_total = fill_cage_grids(request.user, eggs)
 
-    # Calculate total eggs from metadata for accurate laying percentage
-    total_eggs_today = sum(
-        egg.metadata.get('egg_count', 1) if egg.metadata and isinstance(egg.metadata, dict) else 1
-        for egg in eggs
-    )
-    laying_percentage = (total_eggs_today / total_chickens * 100) if total_chickens > 0 else 0
-
-    # Generate automatic performance comments based on laying percentage
-    if laying_percentage >= 90:
-        performance_comment = "Excellent laying performance! Flock is performing exceptionally well."
-    elif laying_percentage >= 80:
-        performance_comment = "Very good production. Flock health and feed quality are optimal."
-    elif laying_percentage >= 70:
-        performance_comment = "Good laying percentage. Monitor feed quality and health."
-    elif laying_percentage >= 60:
-        performance_comment = "Average production. Consider reviewing feed and health management."
-    elif laying_percentage >= 50:
-        performance_comment = "Below average production. Check for health issues or feed problems."
-    elif laying_percentage >= 30:
-        performance_comment = "Poor laying performance. Immediate attention to flock health required."
-    else:
-        performance_comment = "Critical: Very low production. Urgent veterinary attention needed."
-
-    # Organize eggs by cage, partition, and box for the collection table
-    cage_data = {}
-    shade_eggs_count = 0
-    grand_total = 0
-
-    for egg in eggs:
-        # Read count from metadata (new format) or count records (old format)
-        egg_count = 1
-        if egg.metadata and isinstance(egg.metadata, dict) and 'egg_count' in egg.metadata:
-            egg_count = egg.metadata['egg_count']
-        
-        grand_total += egg_count
-        
-        if egg.source == 'shade':
-            shade_eggs_count += egg_count
-        elif egg.cage_id is not None and egg.box_number is not None:
-            cage_id = egg.cage_id
-            partition = egg.partition_index or 0
-            box = egg.box_number
+    # Calculate laying percentage and performance comments
+    total_chickens = farm_settings.total_chickens()
+    if total_chickens is None:
+        total_chickens = Chicken.objects.filter(cage__user=request.user).count()
 
-            if cage_id not in cage_data:
-                cage_data[cage_id] = {}
+    laying_percentage = (grand_total / total_chickens * 100) if total_chickens > 0 else 0
 
-            if partition not in cage_data[cage_id]:
-                cage_data[cage_id][partition] = {}
-            
-            cage_data[cage_id][partition][box] = egg_count
+    # The same comment as the PDF table
+    comment = performance_comment(laying_percentage)
 
     # Format data for table display - exact frontend structure
     table_data = {
@@ -575,85 +259,22 @@ def egg_collection_table(request):
         'shade_total': shade_eggs_count,
         'grand_total': grand_total,
         'laying_percentage': round(laying_percentage, 2),
-        'performance_comment': performance_comment
+        'performance_comment': comment
     }
 
-    # Convert cage data to match frontend structure exactly
-    # Get actual cages from database
-    user_cages = list(Cage.objects.filter(user=request.user).values_list('id', flat=True))
-    if not user_cages:
-        # If no cages exist, use default cages 1 and 2 for display purposes
-        user_cages = [1, 2]
-
-    for cage_id in user_cages:
-        # Get cage type from database first
-        try:
-            cage_obj = Cage.objects.get(id=cage_id)
-            # Override with correct cage type based on ID
-            # This is a workaround for incorrect database values
-            if cage_id == 1:
-                cage_type = 'standard'
-                is_combined = False
-            elif cage_id == 2:
-                cage_type = 'combined'
-                is_combined = True
-            else:
-                cage_type = cage_obj.type
-                is_combined = cage_obj.type == 'combined'
-        except Cage.DoesNotExist:
-            is_combined = (cage_id == 2)  # Assume cage 2 is combined
-            cage_type = 'combined' if cage_id == 2 else 'standard'
-        
-        cage_info = {
+    # Each partition lists its boxes in order (1..rows*columns); data is
+    # stored with partition_index 0 = front, 1 = back
+    for cage_id, grid in grids.items():
+        front, back = grid.partition(0), grid.partition(1)
+        table_data['cages'].append({
             'cage_id': cage_id,
-            'cage_type': cage_type,
-            'front_partition': [],
-            'back_partition': []
-        }
-
-        # Frontend structure: each cage has front and back partitions
-        # Standard cage: 4 rows x 4 columns = 16 boxes total
-        # Combined cage (cage_id=2): 4 rows x 8 columns = 32 boxes total
-        # Data is stored with partition_index (0=front, 1=back)
-        
-        boxes_per_partition = 32 if is_combined else 16
-        
-        # Front partition (partition_index 0) - only include boxes with data
-        front_data = cage_data.get(cage_id, {}).get(0, {})
-        if isinstance(front_data, dict):
-            # Get all box numbers that have data (keys can be int or str)
-            front_box_numbers = sorted([int(k) for k in front_data.keys() if str(k).isdigit() or isinstance(k, int)])
-            # Get max box number to determine rows
-            max_box = max(front_box_numbers) if front_box_numbers else 0
-            boxes_per_row = 8 if max_box > 4 else 4
-            # Create 4 rows
-            for row in range(4):
-                for box_num in range(1, boxes_per_row + 1):
-                    count = front_data.get(str(box_num), front_data.get(box_num, 0))
-                    cage_info['front_partition'].append({
-                        'box': box_num,
-                        'eggs': count
-                    })
-        
-        # Back partition (partition_index 1) - only include boxes with data
-        back_data = cage_data.get(cage_id, {}).get(1, {})
-        if isinstance(back_data, dict):
-            # Get all box numbers that have data (keys can be int or str)
-            back_box_numbers = sorted([int(k) for k in back_data.keys() if str(k).isdigit() or isinstance(k, int)])
-            # Get max box number to determine rows
-            max_box = max(back_box_numbers) if back_box_numbers else 0
-            boxes_per_row = 8 if max_box > 4 else 4
-            # Create 4 rows
-            for row in range(4):
-                for box_num in range(1, boxes_per_row + 1):
-                    count = back_data.get(str(box_num), back_data.get(box_num, 0))
-                    cage_info['back_partition'].append({
-                        'box': box_num,
-                        'eggs': count
-                    })
-
-        cage_info['cage_total'] = sum(p['eggs'] for p in cage_info['front_partition']) + sum(p['eggs'] for p in cage_info['back_partition'])
-        table_data['cages'].append(cage_info)
+            'cage_type': grid.spec.cage_type,
+            'rows': grid.spec.rows,
+            'columns': grid.spec.columns,
+            'front_partition': front.boxes() if front else [],
+            'back_partition': back.boxes() if back else [],
+            'cage_total': grid.total
+        })
 
     table_data['cage_total'] = sum(c['cage_total'] for c in table_data['cages'])
 
@@ -671,17 +292,15 @@ def chicken_count(request):
         key = request.GET.get('key')
         if key:
             # Return specific setting
-            setting = FarmSettings.objects.filter(key=key).first()
-            if setting:
-                return Response({'key': key, 'value': setting.value})
+            value = farm_settings.get_setting(key)
+            if value is not None:
+                return Response({'key': key, 'value': value})
             else:
                 return Response({'key': key, 'value': None, 'detail': f'Setting {key} not found'}, status=status.HTTP_404_NOT_FOUND)
         
         # Return total chicken count (default behavior)
-        setting = FarmSettings.objects.filter(key='total_chickens').first()
-        if setting:
-            total_chickens = int(setting.value)
-        else:
+        total_chickens = farm_settings.total_chickens()
+        if total_chickens is None:
             total_chickens = Chicken.objects.count()
         return Response({'total_chickens': total_chickens})
 
@@ -691,13 +310,7 @@ def chicken_count(request):
             return Response({'detail': 'Valid total_chickens count required'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Store the count in FarmSettings
-        setting, created = FarmSettings.objects.get_or_create(
-            key='total_chickens',
-            defaults={'value': str(new_count)}
-        )
-        if not created:
-            setting.value = str(new_count)
-            setting.save()
+        farm_settings.set_setting('total_chickens', new_count)
 
         return Response({'message': f'Chicken count updated to {new_count}', 'total_chickens': new_count})
 
@@ -710,19 +323,14 @@ def chicken_count(request):
             return Response({'detail': 'key and value are required'}, status=status.HTTP_400_BAD_REQUEST)
 
         # Store the setting
-        setting, created = FarmSettings.objects.get_or_create(
-            key=key,
-            defaults={'value': str(value)}
-        )
-        if not created:
-            setting.value = str(value)
-            setting.save()
+        farm_settings.set_setting(key, value)
 
         return Response({'message': f'Setting {key} updated to {value}'})
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('stock')
 def store_status(request):
     """Get current store status"""
     if request.user.role != 'owner':
@@ -746,21 +354,29 @@ def record_sale(request):
     if not trays_sold or not price_per_tray:
         return Response({'detail': 'trays_sold and price_per_tray are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Record the sale
-    Sale.objects.create(
-        date=date,
-        trays_sold=trays_sold,
-        price_per_tray=price_per_tray
-    )
+    try:
+        trays_sold = int(trays_sold)
+    except (ValueError, TypeError):
+        return Response({'detail': 'trays_sold must be a whole number'}, status=status.HTTP_400_BAD_REQUEST)
+    if trays_sold <= 0:
+        return Response({'detail': 'trays_sold must be greater than 0'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Take the trays out of the store first; the sale is only recorded if
+    # the stock was there
+    try:
+        with transaction.atomic():
+            movement = remove_trays(trays_sold, 'sale', date=date, recorded_by=request.user)
+            sale = Sale.objects.create(
+                date=date,
+                trays_sold=trays_sold,
+                price_per_tray=price_per_tray
+            )
+            movement.sale = sale
+            movement.save(update_fields=['sale'])
+    except InsufficientStock as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Update store stock
-    store, created = Store.objects.get_or_create(id=1, defaults={'trays_in_stock': 0})
-    if store.trays_in_stock >= trays_sold:
-        store.trays_in_stock -= trays_sold
-        store.save()
-        return Response({'message': f'Sale recorded. {trays_sold} trays sold. Store now has {store.trays_in_stock} trays.'})
-    else:
-        return Response({'detail': f'Insufficient stock. Only {store.trays_in_stock} trays available.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'message': f'Sale recorded. {trays_sold} trays sold. Store now has {movement.balance_after} trays.'})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -836,134 +452,51 @@ def record_expense(request):
     return Response({'message': f'Expense recorded: {expense_type} - ${amount}'})
 
 
-@api_view(['GET'])
+@api_view(['POST'])
 @permission_classes([IsAuthenticated])
-def financial_summary(request):
-    """Get financial summary for current week with proper expense accounting"""
-    if request.user.role != 'owner':
-        return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
-
-    # Get current week dates
-    today = datetime.now().date()
-    week_start = today - timedelta(days=today.weekday())
-    week_end = week_start + timedelta(days=6)
-
-    # Get chicken count from FarmSettings
-    chicken_setting = FarmSettings.objects.filter(key='total_chickens').first()
-    if chicken_setting:
-        try:
-            total_chickens = int(chicken_setting.value)
-        except (ValueError, TypeError):
-            total_chickens = 0
-    else:
-        total_chickens = 0
+def sync_operations(request):
+    """
+    Apply a batch of operations queued offline (collections, sales, feed
+    usage, expenses), each carrying a client-generated idempotency key.
 
-    # Get feed consumption rate
-    feed_setting = FarmSettings.objects.filter(key='feed_per_chicken_daily_kg').first()
-    if feed_setting:
-        try:
-            feed_per_chicken_daily = float(feed_setting.value)
-        except (ValueError, TypeError):
-            feed_per_chicken_daily = 0.12
-    else:
-        feed_per_chicken_daily = 0.12
-
-    # Calculate revenue from sales (all sales for the week)
-    weekly_sales = Sale.objects.filter(date__gte=week_start, date__lte=week_end)
-    total_revenue = weekly_sales.aggregate(total=Sum('total_amount'))['total'] or 0
-
-    # Calculate OPERATING EXPENSES (costs of running the farm)
-    # 1. Feed consumption costs (actual daily feed usage)
-    weekly_feed_consumption = FeedConsumption.objects.filter(date__gte=week_start, date__lte=week_end)
-    total_feed_used_kg = weekly_feed_consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-
-    # Calculate feed cost based on consumption (using weighted average price)
-    feed_cost_this_week = 0
-    if total_feed_used_kg > 0:
-        # Get feed purchases to calculate weighted average cost
-        feed_purchases = FeedPurchase.objects.filter(date__gte=week_start - timedelta(days=90), date__lte=week_end)
-        if feed_purchases.exists():
-            total_cost = 0
-            total_qty = 0
-            for purchase in feed_purchases:
-                if purchase.quantity_kg and purchase.total_cost:
-                    total_cost += purchase.total_cost
-                    total_qty += purchase.quantity_kg
-
-            if total_qty > 0:
-                avg_cost_per_kg = total_cost / total_qty
-                feed_cost_this_week = total_feed_used_kg * avg_cost_per_kg
-
-    # 2. Other operating expenses (medicine, labor, utilities, etc.) - exclude feed purchases
-    weekly_expenses = Expense.objects.filter(
-        date__gte=week_start,
-        date__lte=week_end
-    ).exclude(expense_type='feed')  # Feed purchases are capital expenses
-    total_operating_expenses = weekly_expenses.aggregate(total=Sum('amount'))['total'] or 0
-
-    # Total operating costs = feed consumption + other expenses
-    total_operating_costs = feed_cost_this_week + total_operating_expenses
-
-    # Calculate CAPITAL EXPENSES (investments) - feed purchases
-    weekly_feed_purchases = FeedPurchase.objects.filter(date__gte=week_start, date__lte=week_end)
-    total_capital_expenses = weekly_feed_purchases.aggregate(total=Sum('total_cost'))['total'] or 0
-
-    # Calculate profit/loss (revenue - operating costs)
-    profit_loss = total_revenue - total_operating_costs
-    profit_margin = (profit_loss / total_revenue * 100) if total_revenue > 0 else 0
-
-    # Get current metrics from database
-    # Count all eggs for today (cage eggs + shade eggs) with metadata support
-    eggs_today_list = Egg.objects.filter(laid_date=today)
-    eggs_today = sum(
-        egg.metadata.get('egg_count', 1) if egg.metadata and isinstance(egg.metadata, dict) else 1
-        for egg in eggs_today_list
-    )
-    store, created = Store.objects.get_or_create(id=1, defaults={'trays_in_stock': 0})
+    Retrying a batch is safe: keys already applied are replayed, not recorded twice.
+    """
+    data = request.data
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list) or not operations:
+        return Response({'detail': 'operations must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Calculate feed efficiency (eggs per kg of feed)
-    weekly_eggs_list = Egg.objects.filter(laid_date__gte=week_start, laid_date__lte=week_end)
-    weekly_eggs = sum(
-        egg.metadata.get('egg_count', 1) if egg.metadata and isinstance(egg.metadata, dict) else 1
-        for egg in weekly_eggs_list
-    )
-    feed_efficiency = weekly_eggs / total_feed_used_kg if total_feed_used_kg > 0 else 0
+    max_operations = getattr(settings, 'SYNC_MAX_OPERATIONS', 200)
+    if len(operations) > max_operations:
+        return Response({'detail': f'A batch can hold at most {max_operations} operations'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Calculate avg eggs per hen
-    avg_eggs_per_hen = eggs_today / total_chickens if total_chickens > 0 else 0
+    try:
+        results = apply_operations(request.user, operations)
+    except KeyConflict:
+        # Another request applied some of these keys at the same moment
+        return Response({'detail': 'Some of these operations are already being applied. Retry the batch.'}, status=status.HTTP_409_CONFLICT)
 
-    # Calculate feed inventory (bought - used)
-    total_feed_bought = FeedPurchase.objects.aggregate(total=Sum('quantity_kg'))['total'] or 0
-    total_feed_used = FeedConsumption.objects.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-    feed_remaining = total_feed_bought - total_feed_used
+    counts = Counter(result['status'] for result in results)
+    return Response({
+        'results': results,
+        'applied': counts['applied'],
+        'replayed': counts['replayed'],
+        'rejected': counts['rejected'],
+    })
 
-    # Calculate feed bought this week
-    feed_bought_week = weekly_feed_purchases.aggregate(total=Sum('quantity_kg'))['total'] or 0
 
-    data = {
-        'total_hens': total_chickens,
-        'eggs_today': eggs_today,
-        'trays_in_store': store.trays_in_stock,
-        'trays_sold': weekly_sales.aggregate(total=Sum('trays_sold'))['total'] or 0,
-        'total_revenue': round(total_revenue, 2),
-        'operating_expenses': round(total_operating_costs, 2),
-        'capital_expenses': round(total_capital_expenses, 2),
-        'total_expenses': round(total_operating_costs, 2),  # For backward compatibility
-        'feed_consumption_cost': round(feed_cost_this_week, 2),
-        'other_operating_expenses': round(total_operating_expenses, 2),
-        'profit_loss': round(profit_loss, 2),
-        'profit_margin': round(profit_margin, 2),
-        'feed_efficiency': round(feed_efficiency, 2),
-        'avg_eggs_per_hen': round(avg_eggs_per_hen, 2),
-        'feed_bought_week': round(feed_bought_week, 2),
-        'feed_used_week': round(total_feed_used_kg, 2),
-        'feed_remaining': round(feed_remaining, 2)
-    }
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def financial_summary(request):
+    """Get financial summary for current week with proper expense accounting"""
+    if request.user.role != 'owner':
+        return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
 
-    return Response(data)
+    return Response(cached_payload('financial_summary', request.user, SUMMARY_FAMILIES, financial_summary_data))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('sales')
 def sales_history(request):
     """Get sales history"""
     if request.user.role != 'owner':
@@ -990,19 +523,36 @@ def sales_history(request):
     if isinstance(start_date, str):
         start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
 
-    sales = Sale.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
+    sales = Sale.objects.filter(date__gte=start_date, date__lte=end_date)
+    fields = ('id', 'date', 'trays_sold', 'price_per_tray', 'total_amount', 'created_at')
+
+    # One page at a time (?cursor=, ?page_size=) or every row as NDJSON
+    try:
+        if wants_ndjson(request):
+            return ndjson_response(iter_rows(sales, fields, request.GET.get('cursor')))
+        sale_rows, pagination = keyset_page(sales, fields, request)
+    except InvalidCursor as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    totals = sales.aggregate(
+        count=Count('id'),
+        trays=Sum('trays_sold'),
+        revenue=Sum('total_amount'),
+        avg_price=Avg('price_per_tray')
+    )
 
     data = {
         'date_range': {
             'start_date': start_date,
             'end_date': end_date
         },
-        'sales': list(sales.values('id', 'date', 'trays_sold', 'price_per_tray', 'total_amount', 'created_at')),
+        'sales': sale_rows,
+        'pagination': pagination,
         'summary': {
-            'total_sales': sales.count(),
-            'total_trays_sold': sales.aggregate(total=Sum('trays_sold'))['total'] or 0,
-            'total_revenue': sales.aggregate(total=Sum('total_amount'))['total'] or 0,
-            'avg_price_per_tray': sales.aggregate(avg=Avg('price_per_tray'))['avg'] or 0
+            'total_sales': totals['count'],
+            'total_trays_sold': totals['trays'] or 0,
+            'total_revenue': totals['revenue'] or 0,
+            'avg_price_per_tray': totals['avg_price'] or 0
         }
     }
 
@@ -1010,6 +560,7 @@ def sales_history(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('feed')
 def feed_history(request):
     """Get feed purchase and consumption history"""
     if request.user.role != 'owner':
@@ -1026,22 +577,49 @@ def feed_history(request):
     else:
         start_date = end_date - timedelta(days=30)
 
-    purchases = FeedPurchase.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
-    consumption = FeedConsumption.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
+    purchases = FeedPurchase.objects.filter(date__gte=start_date, date__lte=end_date)
+    consumption = FeedConsumption.objects.filter(date__gte=start_date, date__lte=end_date)
+    purchase_fields = ('id', 'date', 'feed_type', 'quantity_kg', 'total_cost', 'cost_per_kg', 'created_at')
+    consumption_fields = ('id', 'date', 'quantity_used_kg', 'created_at')
+
+    # Each list pages with its own cursor; streaming sends purchases then consumption
+    try:
+        if wants_ndjson(request):
+            return ndjson_response(chain(
+                iter_rows(purchases, purchase_fields, request.GET.get('purchases_cursor'),
+                          extra={'record_type': 'purchase'}),
+                iter_rows(consumption, consumption_fields, request.GET.get('consumption_cursor'),
+                          extra={'record_type': 'consumption'})
+            ))
+        purchase_rows, purchase_pagination = keyset_page(
+            purchases, purchase_fields, request, cursor_param='purchases_cursor'
+        )
+        consumption_rows, consumption_pagination = keyset_page(
+            consumption, consumption_fields, request, cursor_param='consumption_cursor'
+        )
+    except InvalidCursor as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    purchase_totals = purchases.aggregate(count=Count('id'), bought=Sum('quantity_kg'), cost=Sum('total_cost'))
+    consumption_totals = consumption.aggregate(used=Sum('quantity_used_kg'))
 
     data = {
         'date_range': {
             'start_date': start_date,
             'end_date': end_date
         },
-        'feed_purchases': list(purchases.values('id', 'date', 'feed_type', 'quantity_kg', 'total_cost', 'cost_per_kg', 'created_at')),
-        'feed_consumption': list(consumption.values('id', 'date', 'quantity_used_kg', 'created_at')),
+        'feed_purchases': purchase_rows,
+        'feed_consumption': consumption_rows,
+        'pagination': {
+            'feed_purchases': purchase_pagination,
+            'feed_consumption': consumption_pagination
+        },
         'summary': {
-            'total_purchases': purchases.count(),
-            'total_feed_bought': purchases.aggregate(total=Sum('quantity_kg'))['total'] or 0,
-            'total_feed_cost': purchases.aggregate(total=Sum('total_cost'))['total'] or 0,
-            'total_feed_used': consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0,
-            'feed_remaining': (purchases.aggregate(total=Sum('quantity_kg'))['total'] or 0) - (consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0)
+            'total_purchases': purchase_totals['count'],
+            'total_feed_bought': purchase_totals['bought'] or 0,
+            'total_feed_cost': purchase_totals['cost'] or 0,
+            'total_feed_used': consumption_totals['used'] or 0,
+            'feed_remaining': (purchase_totals['bought'] or 0) - (consumption_totals['used'] or 0)
         }
     }
 
@@ -1049,6 +627,7 @@ def feed_history(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('expenses')
 def expenses_history(request):
     """Get expenses history"""
     if request.user.role != 'owner':
@@ -1070,25 +649,36 @@ def expenses_history(request):
     else:
         start_date = end_date - timedelta(days=30)
 
-    expenses = Expense.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
+    expenses = Expense.objects.filter(date__gte=start_date, date__lte=end_date)
+    fields = ('id', 'date', 'expense_type', 'description', 'amount', 'recorded_by__username', 'created_at')
+
+    # One page at a time (?cursor=, ?page_size=) or every row as NDJSON
+    try:
+        if wants_ndjson(request):
+            return ndjson_response(iter_rows(expenses, fields, request.GET.get('cursor')))
+        expense_rows, pagination = keyset_page(expenses, fields, request)
+    except InvalidCursor as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Group by expense type
     expense_types = expenses.values('expense_type').annotate(
         count=Count('id'),
         total_amount=Sum('amount')
     ).order_by('expense_type')
+    totals = expenses.aggregate(count=Count('id'), total=Sum('amount'), avg=Avg('amount'))
 
     data = {
         'date_range': {
             'start_date': start_date,
             'end_date': end_date
         },
-        'expenses': list(expenses.values('id', 'date', 'expense_type', 'description', 'amount', 'recorded_by__username', 'created_at')),
+        'expenses': expense_rows,
+        'pagination': pagination,
         'expense_types': list(expense_types),
         'summary': {
-            'total_expenses': expenses.count(),
-            'total_amount': expenses.aggregate(total=Sum('amount'))['total'] or 0,
-            'avg_expense': expenses.aggregate(avg=Avg('amount'))['avg'] or 0
+            'total_expenses': totals['count'],
+            'total_amount': totals['total'] or 0,
+            'avg_expense': totals['avg'] or 0
         }
     }
 
@@ -1152,212 +742,26 @@ def detailed_reports(request):
         except ValueError:
             return Response({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Get date range for weekly/monthly data
-    week_start = report_date - timedelta(days=report_date.weekday())
-    month_start = report_date.replace(day=1)
+    key = request_key('detailed_reports', request.user, {'date': report_date.isoformat()})
+    return Response(single_flight(key, lambda: detailed_report_data(request.user, report_date)))
 
-    # Basic farm info
-    total_cages = Cage.objects.filter(user=request.user).count()
-    chicken_setting = FarmSettings.objects.filter(key='total_chickens').first()
-    total_chickens = int(chicken_setting.value) if chicken_setting else Chicken.objects.filter(cage__user=request.user).count()
 
-    # Egg production data for the specific date
-    eggs_today = Egg.objects.filter(laid_date=report_date).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    )
+async def detailed_reports_async(request):
+    """detailed_reports for the ASGI server, running its independent queries concurrently"""
+    user, error = await async_owner(request)
+    if error:
+        return error
 
-    cage_eggs_today = eggs_today.filter(source='cage').count()
-    shade_eggs_today = eggs_today.filter(source='shade').count()
-    total_eggs_today = cage_eggs_today + shade_eggs_today
-
-    # Weekly and monthly egg totals
-    eggs_week = Egg.objects.filter(laid_date__gte=week_start, laid_date__lte=report_date).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    ).count()
-
-    eggs_month = Egg.objects.filter(laid_date__gte=month_start, laid_date__lte=report_date).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    ).count()
-
-    # Financial data for the week
-    weekly_sales = Sale.objects.filter(date__gte=week_start, date__lte=report_date)
-    total_revenue = weekly_sales.aggregate(total=Sum('total_amount'))['total'] or 0
-
-    # Operating expenses (feed consumption + other expenses)
-    weekly_feed_consumption = FeedConsumption.objects.filter(date__gte=week_start, date__lte=report_date)
-    total_feed_used_kg = weekly_feed_consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-
-    # Calculate feed cost
-    feed_cost_this_week = 0
-    if total_feed_used_kg > 0:
-        feed_purchases = FeedPurchase.objects.filter(date__gte=week_start - timedelta(days=90), date__lte=report_date)
-        if feed_purchases.exists():
-            total_cost = 0
-            total_qty = 0
-            for purchase in feed_purchases:
-                if purchase.quantity_kg and purchase.total_cost:
-                    total_cost += purchase.total_cost
-                    total_qty += purchase.quantity_kg
-
-            if total_qty > 0:
-                avg_cost_per_kg = total_cost / total_qty
-                feed_cost_this_week = total_feed_used_kg * avg_cost_per_kg
-
-    weekly_expenses = Expense.objects.filter(date__gte=week_start, date__lte=report_date).exclude(expense_type='feed')
-    total_operating_expenses = weekly_expenses.aggregate(total=Sum('amount'))['total'] or 0
-    total_operating_costs = feed_cost_this_week + total_operating_expenses
-
-    # Profit/Loss
-    profit_loss = total_revenue - total_operating_costs
-
-    # Store status
-    store, created = Store.objects.get_or_create(id=1, defaults={'trays_in_stock': 0})
-
-    # Feed inventory
-    total_feed_bought = FeedPurchase.objects.aggregate(total=Sum('quantity_kg'))['total'] or 0
-    total_feed_used = FeedConsumption.objects.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-    feed_remaining = total_feed_bought - total_feed_used
-
-    # Get recent egg collection data for the last 7 days
-    recent_eggs = Egg.objects.filter(
-        laid_date__gte=report_date - timedelta(days=7),
-        laid_date__lte=report_date
-    ).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    ).order_by('-laid_date')[:10]
-
-    recent_sales = Sale.objects.filter(
-        date__gte=report_date - timedelta(days=7),
-        date__lte=report_date
-    ).order_by('-date')[:5]
-
-    recent_expenses = Expense.objects.filter(
-        date__gte=report_date - timedelta(days=7),
-        date__lte=report_date
-    ).order_by('-date')[:5]
-
-    # Get egg collection records with count aggregation
-    egg_collection_records = Egg.objects.filter(
-        laid_date__gte=report_date - timedelta(days=7),
-        laid_date__lte=report_date
-    ).filter(
-        Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-    ).values('laid_date', 'source').annotate(count=Count('id')).order_by('-laid_date')
-
-    # Get sales records
-    sales_records = Sale.objects.filter(
-        date__gte=report_date - timedelta(days=7),
-        date__lte=report_date
-    ).values('date', 'trays_sold', 'price_per_tray', 'total_amount').order_by('-date')
-
-    # Get expense records
-    expense_records = Expense.objects.filter(
-        date__gte=report_date - timedelta(days=7),
-        date__lte=report_date
-    ).values('date', 'expense_type', 'amount', 'description').order_by('-date')
-
-    # Calculate daily summaries for the week
-    daily_summaries = []
-    for i in range(7):
-        day_date = report_date - timedelta(days=i)
-        day_eggs = Egg.objects.filter(laid_date=day_date).filter(
-            Q(chicken__cage__user=request.user) | Q(recorded_by=request.user)
-        ).count()
-        day_sales = Sale.objects.filter(date=day_date).aggregate(
-            trays=Sum('trays_sold'),
-            revenue=Sum('total_amount')
-        )
-        day_expenses = Expense.objects.filter(date=day_date).aggregate(total=Sum('amount'))['total'] or 0
-
-        daily_summaries.append({
-            'date': day_date.isoformat(),
-            'eggs_collected': day_eggs,
-            'trays_sold': day_sales['trays'] or 0,
-            'revenue': round(day_sales['revenue'] or 0, 2),
-            'expenses': round(day_expenses, 2),
-            'profit_loss': round((day_sales['revenue'] or 0) - day_expenses, 2),
-            'status': 'recorded' if day_eggs > 0 else 'no_data'
-        })
-
-    # Compile comprehensive report matching frontend expectations
-    data = {
-        'date_range': {
-            'start_date': (report_date - timedelta(days=7)).isoformat(),
-            'end_date': report_date.isoformat()
-        },
-        'summary_totals': {
-            'total_eggs': total_eggs_today,
-            'total_trays_sold': weekly_sales.aggregate(total=Sum('trays_sold'))['total'] or 0,
-            'total_revenue': round(total_revenue, 2),
-            'total_expenses': round(total_operating_costs, 2),
-            'total_profit_loss': round(profit_loss, 2)
-        },
-        'egg_collection_records': list(egg_collection_records),
-        'sales_records': list(sales_records),
-        'expense_records': list(expense_records),
-        'daily_summaries': daily_summaries,
-        'farm_overview': {
-            'total_cages': total_cages,
-            'total_chickens': total_chickens,
-            'total_capacity': Cage.objects.aggregate(total=Sum('capacity'))['total'] or 0,
-        },
-        'egg_production': {
-            'today': {
-                'total': total_eggs_today,
-                'cage_eggs': cage_eggs_today,
-                'shade_eggs': shade_eggs_today,
-                'trays_produced': total_eggs_today // 30,
-                'remaining_eggs': total_eggs_today % 30
-            },
-            'this_week': eggs_week,
-            'this_month': eggs_month,
-            'laying_percentage': round((total_eggs_today / total_chickens * 100), 2) if total_chickens > 0 else 0
-        },
-        'financial_summary': {
-            'revenue': round(total_revenue, 2),
-            'operating_expenses': round(total_operating_costs, 2),
-            'feed_cost': round(feed_cost_this_week, 2),
-            'other_expenses': round(total_operating_expenses, 2),
-            'profit_loss': round(profit_loss, 2),
-            'profit_margin': round((profit_loss / total_revenue * 100), 2) if total_revenue > 0 else 0
-        },
-        'inventory_status': {
-            'trays_in_store': store.trays_in_stock,
-            'feed_remaining_kg': round(feed_remaining, 2),
-            'feed_used_this_week': round(total_feed_used_kg, 2)
-        },
-        'recent_activities': {
-            'eggs_collected': [
-                {
-                    'date': egg.laid_date.isoformat(),
-                    'source': egg.source,
-                    'cage_id': egg.cage_id,
-                    'partition': egg.partition_index
-                } for egg in recent_eggs
-            ],
-            'sales': [
-                {
-                    'date': sale.date.isoformat(),
-                    'trays_sold': sale.trays_sold,
-                    'price_per_tray': sale.price_per_tray,
-                    'total_amount': sale.total_amount
-                } for sale in recent_sales
-            ],
-            'expenses': [
-                {
-                    'date': expense.date.isoformat(),
-                    'type': expense.expense_type,
-                    'amount': expense.amount,
-                    'description': expense.description
-                } for expense in recent_expenses
-            ]
-        }
-    }
+    try:
+        report_date = datetime.strptime(request.GET['date'], '%Y-%m-%d').date() if 'date' in request.GET else datetime.now().date()
+    except ValueError:
+        return JsonResponse({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response(data)
+    return json_response(await detailed_report_data_async(user, report_date))
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('medical')
 def medical_history(request):
     """Get medical records history"""
     if request.user.role != 'owner':
@@ -1382,60 +786,60 @@ def medical_history(request):
     medical_records = MedicalRecord.objects.filter(
         date__gte=start_date,
         date__lte=end_date
-    ).select_related('chicken', 'recorded_by').order_by('-date')
+    )
+    fields = (
+        'id', 'date', 'treatment_type', 'description', 'medication',
+        'dosage', 'cost', 'vet_name', 'notes', 'chicken__tag_id',
+        'recorded_by__username', 'created_at'
+    )
+
+    # One page at a time (?cursor=, ?page_size=) or every row as NDJSON
+    try:
+        if wants_ndjson(request):
+            return ndjson_response(iter_rows(medical_records, fields, request.GET.get('cursor')))
+        record_rows, pagination = keyset_page(medical_records, fields, request)
+    except InvalidCursor as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
     # Group by treatment type
     treatment_types = medical_records.values('treatment_type').annotate(
         count=Count('id'),
         total_cost=Sum('cost')
     ).order_by('treatment_type')
+    totals = medical_records.aggregate(count=Count('id'), total=Sum('cost'), avg=Avg('cost'))
 
     data = {
         'date_range': {
             'start_date': start_date,
             'end_date': end_date
         },
-        'medical_records': list(medical_records.values(
-            'id', 'date', 'treatment_type', 'description', 'medication',
-            'dosage', 'cost', 'vet_name', 'notes', 'chicken__tag_id',
-            'recorded_by__username', 'created_at'
-        )),
+        'medical_records': record_rows,
+        'pagination': pagination,
         'treatment_types': list(treatment_types),
         'summary': {
-            'total_records': medical_records.count(),
-            'total_cost': medical_records.aggregate(total=Sum('cost'))['total'] or 0,
-            'avg_cost': medical_records.aggregate(avg=Avg('cost'))['avg'] or 0
+            'total_records': totals['count'],
+            'total_cost': totals['total'] or 0,
+            'avg_cost': totals['avg'] or 0
         }
     }
 
     return Response(data)
 
+# Downloads are opened directly by the browser, so the token may also
+# come from a form field or ?token=
+DOWNLOAD_AUTHENTICATION = [QueryParamTokenAuthentication, SessionAuthentication]
+
+
 @api_view(['GET'])
+@authentication_classes(DOWNLOAD_AUTHENTICATION)
+@permission_classes([IsAuthenticated])
 def download_egg_collection_table(request):
-    """Download egg collection table as PDF"""
-    # Check authentication - allow both token auth and query param token
-    user = None
-    if request.user.is_authenticated:
-        user = request.user
-    else:
-        # Check for token in Authorization header first
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        if auth_header.startswith('Token '):
-            token = auth_header[6:]  # Remove 'Token ' prefix
-        else:
-            # Check for token in query params (for direct browser access)
-            token = request.GET.get('token')
-
-        if token:
-            from rest_framework.authtoken.models import Token
-            try:
-                token_obj = Token.objects.get(key=token)
-                user = token_obj.user
-            except Token.DoesNotExist:
-                return Response({'detail': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
-        else:
-            return Response({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-
+    """
+    Download egg collection table as PDF, rendered now if the day's data
+    changed since it was stored. Clients sending "Prefer: respond-async"
+    get 202 with the rendering job instead.
+    """
+    user = request.user
     if user.role != 'owner':
         return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -1447,290 +851,25 @@ def download_egg_collection_table(request):
         except ValueError:
             return Response({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Get actual egg data from database for the specified date
-    eggs = Egg.objects.filter(
-        laid_date=collection_date
-    ).filter(
-        # Include eggs from user's chickens or eggs recorded by this user
-        Q(chicken__cage__user=user) | Q(recorded_by=user)
+    # Served from the stored artifact while the day's data is unchanged
+    content, job = open_or_request('egg-collection-table', collection_date, collection_date, user, render=not prefers_async(request))
+    if content is None:
+        return report_job_accepted(job)
+    return StreamingFileResponse(
+        content, as_attachment=True, filename=egg_collection_table_filename(collection_date),
+        content_type='application/pdf'
     )
 
-    # Calculate laying percentage and performance comments
-    chicken_setting = FarmSettings.objects.filter(key='total_chickens').first()
-    total_chickens = int(chicken_setting.value) if chicken_setting else Chicken.objects.filter(cage__user=user).count()
-
-    total_eggs_today = eggs.count()
-    laying_percentage = (total_eggs_today / total_chickens * 100) if total_chickens > 0 else 0
-
-    # Generate automatic performance comments based on laying percentage
-    if laying_percentage >= 90:
-        performance_comment = "Excellent laying performance! Flock is performing exceptionally well."
-    elif laying_percentage >= 80:
-        performance_comment = "Very good production. Flock health and feed quality are optimal."
-    elif laying_percentage >= 70:
-        performance_comment = "Good laying percentage. Monitor feed quality and health."
-    elif laying_percentage >= 60:
-        performance_comment = "Average production. Consider reviewing feed and health management."
-    elif laying_percentage >= 50:
-        performance_comment = "Below average production. Check for health issues or feed problems."
-    elif laying_percentage >= 30:
-        performance_comment = "Poor laying performance. Immediate attention to flock health required."
-    else:
-        performance_comment = "Critical: Very low production. Urgent veterinary attention needed."
-
-    # Organize eggs by cage, partition, and box for the collection table
-    cage_data = {}
-    shade_eggs = 0
-
-    for egg in eggs:
-        if egg.source == 'shade':
-            shade_eggs += 1
-        elif egg.cage_id is not None and egg.box_number is not None:
-            cage_id = egg.cage_id
-            partition = egg.partition_index or 0
-            box = egg.box_number
-
-            if cage_id not in cage_data:
-                cage_data[cage_id] = {}
-
-            if partition not in cage_data[cage_id]:
-                cage_data[cage_id][partition] = {}
-
-            if box not in cage_data[cage_id][partition]:
-                cage_data[cage_id][partition][box] = 0
-
-            cage_data[cage_id][partition][box] += 1
-
-    # Create PDF buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title with farm name and date
-    farm_name = "Joe Farm"
-    title_text = f"{farm_name} - Egg Collection Table - {collection_date}"
-    title = Paragraph(title_text, styles['Title'])
-    title.style.fontSize = 18  # Larger title
-    title.style.spaceAfter = 20
-    story.append(title)
-    story.append(Spacer(1, 12))
-
-    # Performance Summary
-    summary_data = [
-        ['Date:', str(collection_date)],
-        ['Total Eggs Collected:', str(total_eggs_today)],
-        ['Total Chickens:', str(total_chickens)],
-        ['Laying Percentage:', f"{laying_percentage:.2f}%"],
-        ['Performance:', performance_comment],
-        ['Trays Produced:', f"{total_eggs_today // 30} full trays + {total_eggs_today % 30} remaining eggs"]
-    ]
-
-    summary_table = Table(summary_data, colWidths=[150, 250])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),  # Larger font size for better readability
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(summary_table)
-    story.append(Spacer(1, 20))
-
-    # Get actual cages from database
-    user_cages = Cage.objects.filter(user=user).values_list('id', flat=True)
-    if not user_cages:
-        # If no cages exist, use default cages 1 and 2 for display purposes
-        user_cages = [1, 2]
-
-    for cage_id in user_cages:
-        cage_info = {
-            'front_partition': [],
-            'back_partition': []
-        }
-
-        # Frontend structure: each cage has front and back partitions
-        # Each partition has 4 rows x 4 columns = 16 boxes total
-        # Data is stored with partition_index (0=front, 1=back)
-
-        # Front partition (partition_index 0)
-        front_data = cage_data.get(cage_id, {}).get(0, {})  # partition_index 0
-        for box_num in range(1, 17):  # 16 boxes (4x4 grid)
-            count = front_data.get(box_num, 0) if isinstance(front_data, dict) else 0
-            cage_info['front_partition'].append({
-                'box': box_num,
-                'eggs': count
-            })
-
-        # Back partition (partition_index 1)
-        back_data = cage_data.get(cage_id, {}).get(1, {})  # partition_index 1
-        for box_num in range(1, 17):  # 16 boxes (4x4 grid)
-            count = back_data.get(box_num, 0) if isinstance(back_data, dict) else 0
-            cage_info['back_partition'].append({
-                'box': box_num,
-                'eggs': count
-            })
-
-        cage_info['cage_total'] = sum(p['eggs'] for p in cage_info['front_partition']) + sum(p['eggs'] for p in cage_info['back_partition'])
-
-        # Cage Title
-        story.append(Paragraph(f"Cage {cage_id}", styles['Heading2']))
-        story.append(Spacer(1, 6))
-
-        # Front Partition Table
-        story.append(Paragraph("Front Partition", styles['Heading3']))
-        front_data_table = [['Box', '1', '2', '3', '4', '5', '6', '7', '8']]
-        for row in range(4):
-            row_data = [f'Row {row + 1}']
-            for col in range(8):
-                box_index = row * 8 + col
-                eggs = cage_info['front_partition'][box_index]['eggs'] if box_index < len(cage_info['front_partition']) else 0
-                row_data.append(str(eggs))
-            front_data_table.append(row_data)
-
-        front_table = Table(front_data_table, colWidths=[40] + [30] * 8)
-        front_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),  # Larger font size for better readability
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(front_table)
-        story.append(Spacer(1, 12))
-
-        # Back Partition Table
-        story.append(Paragraph("Back Partition", styles['Heading3']))
-        back_data_table = [['Box', '1', '2', '3', '4', '5', '6', '7', '8']]
-        for row in range(4):
-            row_data = [f'Row {row + 1}']
-            for col in range(8):
-                box_index = row * 8 + col
-                eggs = cage_info['back_partition'][box_index]['eggs'] if box_index < len(cage_info['back_partition']) else 0
-                row_data.append(str(eggs))
-            back_data_table.append(row_data)
-
-        back_table = Table(back_data_table, colWidths=[40] + [30] * 8)
-        back_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),  # Larger font size for better readability
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(back_table)
-        story.append(Spacer(1, 12))
-
-        # Cage Summary
-        front_total = sum(p['eggs'] for p in cage_info['front_partition'])
-        back_total = sum(p['eggs'] for p in cage_info['back_partition'])
-        cage_total = cage_info['cage_total']
-
-        cage_summary_data = [
-            ['Front Partition:', str(front_total)],
-            ['Back Partition:', str(back_total)],
-            ['Cage Total:', str(cage_total)]
-        ]
-
-        cage_summary_table = Table(cage_summary_data, colWidths=[120, 80])
-        cage_summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.green),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 14),  # Larger font size for better readability
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightgreen),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(cage_summary_table)
-        story.append(Spacer(1, 20))
-
-    # Shade Eggs Summary
-    shade_summary_data = [
-        ['Shade Eggs:', str(shade_eggs)]
-    ]
-
-    shade_summary_table = Table(shade_summary_data, colWidths=[120, 80])
-    shade_summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.blue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),  # Larger font size for better readability
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(Paragraph("Shade Eggs", styles['Heading2']))
-    story.append(shade_summary_table)
-    story.append(Spacer(1, 20))
-
-    # Overall Summary
-    overall_summary_data = [
-        ['Total Cage Eggs:', str(total_eggs_today - shade_eggs)],
-        ['Total Shade Eggs:', str(shade_eggs)],
-        ['Grand Total:', str(total_eggs_today)],
-        ['Laying Percentage:', f"{laying_percentage:.2f}%"],
-        ['Performance Comment:', performance_comment]
-    ]
-
-    overall_summary_table = Table(overall_summary_data, colWidths=[150, 250])
-    overall_summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),  # Larger font size for better readability
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightcyan),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    story.append(Paragraph("Overall Summary", styles['Heading2']))
-    story.append(overall_summary_table)
-
-    # Build PDF
-    doc.build(story)
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="egg_collection_table_{collection_date}.pdf"'
-    return response
-
 @api_view(['GET'])
+@authentication_classes(DOWNLOAD_AUTHENTICATION)
+@permission_classes([IsAuthenticated])
 def download_report(request, report_type):
-    """Download reports as PDF"""
-    # Check authentication - allow both token auth and query param token
-    user = None
-    if request.user.is_authenticated:
-        user = request.user
-    else:
-        # Check for token in Authorization header first
-        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-        if auth_header.startswith('Token '):
-            token = auth_header[6:]  # Remove 'Token ' prefix
-        else:
-            # Check for token in form data (when submitted via form)
-            token = request.POST.get('Authorization', '').replace('Token ', '') or request.GET.get('token')
-
-        if token:
-            from rest_framework.authtoken.models import Token
-            try:
-                token_obj = Token.objects.get(key=token)
-                user = token_obj.user
-            except Token.DoesNotExist:
-                return Response({'detail': 'Invalid token'}, status=status.HTTP_401_UNAUTHORIZED)
-        else:
-            return Response({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
-
+    """
+    Download reports as PDF, rendered now if the range's data changed
+    since it was stored. Clients sending "Prefer: respond-async" get 202
+    with the rendering job instead.
+    """
+    user = request.user
     if user.role != 'owner':
         return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
 
@@ -1750,298 +889,121 @@ def download_report(request, report_type):
     else:
         start_date = end_date - timedelta(days=30)
 
-    # Create PDF buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title with farm name
-    farm_name = "Joe Farm"
-    title_text = f"{farm_name} - {report_type.title()} Report ({start_date} to {end_date})"
-    story.append(Paragraph(title_text, styles['Title']))
-    story.append(Spacer(1, 12))
-
-    if report_type == 'sales':
-        sales = Sale.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
-
-        # Summary
-        summary_data = [
-            ['Total Sales:', str(sales.count())],
-            ['Total Trays Sold:', str(sales.aggregate(total=Sum('trays_sold'))['total'] or 0)],
-            ['Total Revenue:', f"Ksh {sales.aggregate(total=Sum('total_amount'))['total'] or 0}"],
-            ['Average Price per Tray:', f"Ksh {sales.aggregate(avg=Avg('price_per_tray'))['avg'] or 0:.2f}"]
-        ]
-
-        summary_table = Table(summary_data, colWidths=[200, 200])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
-
-        # Sales table
-        if sales.exists():
-            sales_data = [['Date', 'Trays Sold', 'Price per Tray', 'Total Amount']]
-            for sale in sales:
-                sales_data.append([
-                    str(sale.date),
-                    str(sale.trays_sold),
-                    f"Ksh {sale.price_per_tray}",
-                    f"Ksh {sale.total_amount}"
-                ])
-
-            sales_table = Table(sales_data, colWidths=[100, 80, 120, 120])
-            sales_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(sales_table)
-
-    elif report_type == 'expenses':
-        expenses = Expense.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
-        feed_consumption = FeedConsumption.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
-
-        # Calculate feed consumption costs
-        feed_cost_total = 0
-        if feed_consumption.exists():
-            # Get feed purchases for cost calculation
-            feed_purchases = FeedPurchase.objects.filter(date__gte=start_date - timedelta(days=90), date__lte=end_date)
-            if feed_purchases.exists():
-                total_cost = 0
-                total_qty = 0
-                for purchase in feed_purchases:
-                    if purchase.quantity_kg and purchase.total_cost:
-                        total_cost += purchase.total_cost
-                        total_qty += purchase.quantity_kg
-
-                if total_qty > 0:
-                    avg_cost_per_kg = total_cost / total_qty
-                    total_feed_used = feed_consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-                    feed_cost_total = total_feed_used * avg_cost_per_kg
-
-        # Summary with breakdown
-        total_expenses_amount = expenses.aggregate(total=Sum('amount'))['total'] or 0
-        summary_data = [
-            ['Report Period:', f"{start_date} to {end_date}"],
-            ['Total Expense Records:', str(expenses.count())],
-            ['Operating Expenses (Medicine, Labor, etc.):', f"Ksh {total_expenses_amount:.2f}"],
-            ['Feed Consumption Cost:', f"Ksh {feed_cost_total:.2f}"],
-            ['Total Operating Costs:', f"Ksh {(total_expenses_amount + feed_cost_total):.2f}"],
-            ['Average Daily Operating Cost:', f"Ksh {((total_expenses_amount + feed_cost_total) / ((end_date - start_date).days + 1)):.2f}"]
-        ]
-
-        summary_table = Table(summary_data, colWidths=[250, 150])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
-
-        # Operating Expenses table
-        if expenses.exists():
-            story.append(Paragraph("Operating Expenses (Medicine, Labor, Utilities, etc.)", styles['Heading2']))
-            expense_data = [['Date', 'Type', 'Amount', 'Description']]
-            for expense in expenses:
-                expense_data.append([
-                    str(expense.date),
-                    expense.expense_type.title(),
-                    f"Ksh {expense.amount}",
-                    expense.description or ''
-                ])
-
-            expense_table = Table(expense_data, colWidths=[80, 80, 100, 200])
-            expense_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(expense_table)
-            story.append(Spacer(1, 20))
-
-        # Feed Consumption table
-        if feed_consumption.exists():
-            story.append(Paragraph("Feed Consumption (Daily Operating Costs)", styles['Heading2']))
-            feed_data = [['Date', 'Feed Used (kg)', 'Estimated Cost']]
-            for cons in feed_consumption:
-                # Calculate cost for this specific consumption
-                daily_cost = 0
-                if feed_purchases.exists() and total_qty > 0:
-                    daily_cost = cons.quantity_used_kg * avg_cost_per_kg
-
-                feed_data.append([
-                    str(cons.date),
-                    f"{cons.quantity_used_kg} kg",
-                    f"Ksh {daily_cost:.2f}"
-                ])
-
-            feed_table = Table(feed_data, colWidths=[80, 100, 100])
-            feed_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(feed_table)
-
-    elif report_type == 'feed':
-        purchases = FeedPurchase.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
-        consumption = FeedConsumption.objects.filter(date__gte=start_date, date__lte=end_date).order_by('-date')
-
-        # Calculate feed consumption costs for the period
-        feed_cost_total = 0
-        avg_cost_per_kg = 0
-        if consumption.exists() and purchases.exists():
-            # Calculate weighted average cost per kg for the period
-            total_cost = 0
-            total_qty = 0
-            for purchase in purchases:
-                if purchase.quantity_kg and purchase.total_cost:
-                    total_cost += purchase.total_cost
-                    total_qty += purchase.quantity_kg
-
-            if total_qty > 0:
-                avg_cost_per_kg = total_cost / total_qty
-                total_feed_used = consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-                feed_cost_total = total_feed_used * avg_cost_per_kg
-
-        # Summary with clear accounting breakdown
-        total_bought = purchases.aggregate(total=Sum('quantity_kg'))['total'] or 0
-        total_cost = purchases.aggregate(total=Sum('total_cost'))['total'] or 0
-        total_used = consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-        feed_remaining = total_bought - total_used
-
-        # Farm name header
-        farm_name = "Joe Farm"
-        story.append(Paragraph(f"{farm_name} - Feed Report", styles['Title']))
-        story.append(Spacer(1, 12))
-
-        summary_data = [
-            ['Report Period:', f"{start_date} to {end_date}"],
-            ['CAPITAL EXPENSES (Investments):', ''],
-            ['• Feed Purchases (Inventory):', f"{total_bought} kg @ Ksh {total_cost} total"],
-            ['• Average Cost per kg:', f"Ksh {avg_cost_per_kg:.2f}"],
-            ['OPERATING EXPENSES (Daily Costs):', ''],
-            ['• Feed Consumption:', f"{total_used} kg @ Ksh {feed_cost_total:.2f} total"],
-            ['• Feed Remaining in Inventory:', f"{feed_remaining} kg"],
-            ['Feed Efficiency:', f"{(total_used / total_bought * 100):.1f}%" if total_bought > 0 else 'N/A']
-        ]
-
-        summary_table = Table(summary_data, colWidths=[200, 200])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('SPAN', (0, 1), (1, 1)),  # Merge cells for "CAPITAL EXPENSES"
-            ('SPAN', (0, 4), (1, 4)),  # Merge cells for "OPERATING EXPENSES"
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
-
-        # Feed purchases table (Capital Expenses)
-        if purchases.exists():
-            story.append(Paragraph("Feed Purchases (Capital Investment - Not Operating Expenses)", styles['Heading2']))
-            purchases_data = [['Date', 'Feed Type', 'Quantity (kg)', 'Total Cost', 'Cost per kg']]
-            for purchase in purchases:
-                purchases_data.append([
-                    str(purchase.date),
-                    purchase.feed_type or 'General',
-                    str(purchase.quantity_kg),
-                    f"Ksh {purchase.total_cost}",
-                    f"Ksh {purchase.cost_per_kg:.2f}" if purchase.cost_per_kg else 'N/A'
-                ])
-
-            purchases_table = Table(purchases_data, colWidths=[80, 80, 80, 100, 100])
-            purchases_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(purchases_table)
-            story.append(Spacer(1, 20))
-
-        # Feed consumption table (Operating Expenses)
-        if consumption.exists():
-            story.append(Paragraph("Feed Consumption (Operating Expenses - Daily Farm Costs)", styles['Heading2']))
-            consumption_data = [['Date', 'Feed Used (kg)', 'Cost (Operating Expense)']]
-            for cons in consumption:
-                daily_cost = cons.quantity_used_kg * avg_cost_per_kg if avg_cost_per_kg > 0 else 0
-                consumption_data.append([
-                    str(cons.date),
-                    str(cons.quantity_used_kg),
-                    f"Ksh {daily_cost:.2f}"
-                ])
-
-            consumption_table = Table(consumption_data, colWidths=[100, 100, 150])
-            consumption_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            story.append(consumption_table)
-            story.append(Spacer(1, 20))
-
-            # Accounting explanation
-            explanation = """
-            IMPORTANT ACCOUNTING NOTE:
-            • Feed Purchases = CAPITAL EXPENSES (inventory investment, not counted in profit/loss)
-            • Feed Consumption = OPERATING EXPENSES (daily costs that affect profit/loss)
-            • Profit/Loss = Revenue - Operating Expenses (feed consumption + other daily costs)
-            """
-            story.append(Paragraph(explanation, styles['Normal']))
-
-    # Build PDF
-    doc.build(story)
-    buffer.seek(0)
-    response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="{report_type}_report_{start_date}_to_{end_date}.pdf"'
+    # Served from the stored artifact while the range's data is unchanged
+    if report_type in PERIOD_REPORT_TYPES:
+        content, job = open_or_request(report_type, start_date, end_date, user, render=not prefers_async(request))
+        if content is None:
+            return report_job_accepted(job)
+    else:
+        content = render_period_report(report_type, start_date, end_date)
+    # Streamed from the rendered file rather than copied into the response
+    return StreamingFileResponse(
+        content, as_attachment=True, filename=period_report_filename(report_type, start_date, end_date),
+        content_type='application/pdf'
+    )
+
+
+def report_job_data(job):
+    """API representation of a ReportJob"""
+    return {
+        'id': job.id,
+        'report_type': job.report_type,
+        'start_date': job.start_date,
+        'end_date': job.end_date,
+        'status': job.status,
+        'error': job.error or None,
+        'filename': job.filename,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+        'download_url': reverse('report-job-download', args=[job.id]) if job.status == 'done' else None
+    }
+
+
+def prefers_async(request):
+    # RFC 7240: the client would rather poll than wait for the render
+    return 'respond-async' in request.headers.get('Prefer', '').lower()
+
+
+def report_job_accepted(job):
+    """
+    202 for a download whose PDF is still being rendered: the job to poll,
+    with its status URL in Location
+    """
+    response = Response(report_job_data(job), status=status.HTTP_202_ACCEPTED)
+    response['Location'] = reverse('report-job-status', args=[job.id])
     return response
 
 
+def visible_report_jobs(user):
+    # Owner-scoped reports (the egg collection table) are only visible to their owner
+    return ReportJob.objects.filter(Q(owner__isnull=True) | Q(owner=user))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_report_job(request):
+    """
+    Queue a PDF report to be rendered in the background.
+
+    Body: report_type plus start_date/end_date (YYYY-MM-DD), or date for
+    the egg collection table. An identical report that is already queued
+    or finished for unchanged data is returned instead of a new job.
+    """
+    if request.user.role != 'owner':
+        return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
+
+    data = request.data
+    report_type = data.get('report_type')
+    if report_type not in REPORT_TYPES:
+        return Response({'detail': f"report_type must be one of: {', '.join(REPORT_TYPES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        if report_type == 'egg-collection-table':
+            start_date = end_date = datetime.strptime(data.get('date', str(datetime.now().date())), '%Y-%m-%d').date()
+        else:
+            end_date = datetime.strptime(data.get('end_date', str(datetime.now().date())), '%Y-%m-%d').date()
+            start_date = data.get('start_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end_date - timedelta(days=30)
+    except (ValueError, TypeError):
+        return Response({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if start_date > end_date:
+        return Response({'detail': 'start_date must be on or before end_date'}, status=status.HTTP_400_BAD_REQUEST)
+
+    job, created = request_report(report_type, start_date, end_date, request.user)
+    return Response(report_job_data(job), status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def report_job_status(request, job_id):
+    """Poll a queued report"""
+    if request.user.role != 'owner':
+        return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
+
+    job = get_object_or_404(visible_report_jobs(request.user), id=job_id)
+    return Response(report_job_data(job))
+
+
+@api_view(['GET'])
+@authentication_classes(DOWNLOAD_AUTHENTICATION)
+@permission_classes([IsAuthenticated])
+def download_report_job(request, job_id):
+    """Download the PDF of a finished report job"""
+    user = request.user
+    if user.role != 'owner':
+        return Response({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
+
+    job = get_object_or_404(visible_report_jobs(user), id=job_id)
+    if job.status != 'done':
+        return Response({'detail': f'Report is not ready (status: {job.status})'}, status=status.HTTP_409_CONFLICT)
+
+    artifact = open_artifact(job)
+    if artifact is None:
+        return Response({'detail': 'The report file is no longer stored. Request the report again.'}, status=status.HTTP_410_GONE)
+    return StreamingFileResponse(artifact, as_attachment=True, filename=job.filename, content_type='application/pdf')
+
+
 # ============ NOTIFICATION ENDPOINTS ============
 
 @api_view(['GET'])
@@ -2094,53 +1056,24 @@ def weekly_profit_loss_report(request):
     week_end = today - timedelta(days=1)  # Yesterday
     week_start = week_end - timedelta(days=6)  # 7 days ago
     
-    # Calculate revenue from sales
-    weekly_sales = Sale.objects.filter(date__gte=week_start, date__lte=week_end)
-    total_revenue = weekly_sales.aggregate(total=Sum('total_amount'))['total'] or 0
-    trays_sold = weekly_sales.aggregate(total=Sum('trays_sold'))['total'] or 0
-    
-    # Calculate operating expenses
-    # 1. Feed consumption costs
-    weekly_feed_consumption = FeedConsumption.objects.filter(date__gte=week_start, date__lte=week_end)
-    total_feed_used_kg = weekly_feed_consumption.aggregate(total=Sum('quantity_used_kg'))['total'] or 0
-    
-    feed_cost_this_week = 0
-    if total_feed_used_kg > 0:
-        feed_purchases = FeedPurchase.objects.filter(date__gte=week_start - timedelta(days=90), date__lte=week_end)
-        if feed_purchases.exists():
-            total_cost = 0
-            total_qty = 0
-            for purchase in feed_purchases:
-                if purchase.quantity_kg and purchase.total_cost:
-                    total_cost += purchase.total_cost
-                    total_qty += purchase.quantity_kg
-            if total_qty > 0:
-                avg_cost_per_kg = total_cost / total_qty
-                feed_cost_this_week = total_feed_used_kg * avg_cost_per_kg
-    
-    # 2. Other operating expenses
-    weekly_expenses = Expense.objects.filter(
-        date__gte=week_start,
-        date__lte=week_end
-    ).exclude(expense_type='feed')
-    other_expenses = weekly_expenses.aggregate(total=Sum('amount'))['total'] or 0
-    
-    # Total operating costs
-    total_operating_costs = feed_cost_this_week + other_expenses
-    
-    # Capital expenses (feed purchases)
-    weekly_feed_purchases = FeedPurchase.objects.filter(date__gte=week_start, date__lte=week_end)
-    capital_expenses = weekly_feed_purchases.aggregate(total=Sum('total_cost'))['total'] or 0
-    
+    # Revenue, operating expenses (feed consumption + other) and
+    # capital expenses (feed purchases) for the week
+    finance = period_financials(week_start, week_end)
+    total_revenue = finance['revenue']
+    trays_sold = finance['trays_sold']
+    feed_cost_this_week = finance['feed_cost']
+    other_expenses = finance['other_operating_expenses']
+    total_operating_costs = finance['operating_costs']
+    capital_expenses = finance['capital_expenses']
+
     # Profit/Loss (revenue - operating costs)
-    profit_loss = total_revenue - total_operating_costs
-    profit_margin = (profit_loss / total_revenue * 100) if total_revenue > 0 else 0
+    profit_loss = finance['profit_loss']
+    profit_margin = finance['profit_margin']
     
     # Egg collection for the week
-    weekly_eggs = Egg.objects.filter(
-        laid_date__gte=week_start,
-        laid_date__lte=week_end
-    ).count()
+    weekly_eggs = egg_count_totals(
+        week=Q(date__gte=week_start, date__lte=week_end)
+    )['week']
     
     # Determine status
     if profit_loss > 0:
@@ -2197,6 +1130,7 @@ def weekly_profit_loss_report(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('notifications')
 def notifications_list(request):
     """
     Get list of notifications for the current user.
@@ -2263,16 +1197,18 @@ def delete_data_by_date(request):
         from datetime import datetime
         delete_date = datetime.strptime(target_date, '%Y-%m-%d').date()
         
-        # Delete eggs for this date
-        deleted_eggs = Egg.objects.filter(laid_date=delete_date).delete()
-        
-        # Reset store trays to 0
-        Store.objects.all().delete()
-        Store.objects.create(id=1, trays_in_stock=0)
+        with transaction.atomic():
+            # Every deleted egg's post_delete bump is folded into one
+            with batched():
+                deleted_eggs, _ = Egg.objects.filter(laid_date=delete_date).delete()
+            rebuild_egg_rollups([delete_date])
+
+            # Reset store trays to 0
+            reset_stock(date=delete_date, recorded_by=request.user)
         
         return Response({
             'message': f'Deleted all data for {target_date}',
-            'eggs_deleted': deleted_eggs[0]
+            'eggs_deleted': deleted_eggs
         })
     except ValueError:
         return Response({'detail': 'Invalid date format. Use YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
@@ -2316,7 +1252,9 @@ def mark_all_notifications_read(request):
             user=request.user, 
             is_read=False
         ).update(is_read=True)
-        
+        if updated_count:
+            bump('notifications')
+
         return Response({
             'message': f'{updated_count} notifications marked as read',
             'updated_count': updated_count
@@ -2331,6 +1269,7 @@ def mark_all_notifications_read(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional('notifications')
 def unread_notification_count(request):
     """
     Get the count of unread notifications for the current user.
@@ -2347,6 +1286,30 @@ def unread_notification_count(request):
         return Response({'unread_count': 0})
 
 
+async def notification_events(request):
+    """
+    Server-sent event stream for owners: new notifications, store changes
+    and submitted collections, replacing polling of unread-count.
+    """
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI Django would buffer the endless stream in memory
+        return JsonResponse({'detail': 'The event stream is only served by the ASGI application.'}, status=status.HTTP_501_NOT_IMPLEMENTED)
+
+    user = await token_user(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication required'}, status=status.HTTP_401_UNAUTHORIZED)
+    if user.role != 'owner':
+        return JsonResponse({'detail': 'Access denied. Owner role required.'}, status=status.HTTP_403_FORBIDDEN)
+
+    response = StreamingHttpResponse(
+        event_stream(user, request.headers.get('Last-Event-ID')),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx-style proxies from buffering events
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 def send_notification_to_owner(owner, notification_type, title, message, metadata=None):
     """
     Helper function to send a notification to a farm owner.
@@ -2375,52 +1338,14 @@ def send_notification_to_owner(owner, notification_type, title, message, metadat
 
 
 def send_egg_collection_notification(owner, collection_date, recorder_name, total_eggs, cage_eggs, shade_eggs):
-    """
-    Send notification to owner when egg collection is recorded.
-    
-    Args:
-        owner: The User model instance (owner)
-        collection_date: Date of collection
-        recorder_name: Name of person who recorded the data
-        total_eggs: Total eggs collected
-        cage_eggs: Eggs from cages
-        shade_eggs: Eggs from shade
-    """
-    from django.utils import timezone
-    now = timezone.now()
-    collection_time = now.strftime('%I:%M %p')  # Format: 02:30 PM
-    
-    title = f"🥚 Egg Collection Recorded - {collection_date}"
-    message = f"""
-{recorder_name} has recorded today's egg collection.
-
-⏰ Time Recorded: {collection_time}
-📅 Date: {collection_date}
-
-📊 Summary:
-• Total Eggs: {total_eggs}
-• Cage Eggs: {cage_eggs}
-• Shade Eggs: {shade_eggs}
-• Trays: {total_eggs // 30} full + {total_eggs % 30} remaining
-
-View details in the Recorded Data section.
-"""
-    
-    metadata = {
-        'collection_date': str(collection_date),
-        'collection_time': collection_time,
-        'recorded_at': now.isoformat(),
-        'recorder_name': recorder_name,
-        'total_eggs': total_eggs,
-        'cage_eggs': cage_eggs,
-        'shade_eggs': shade_eggs,
-        'trays': total_eggs // 30
-    }
-    
+    """Send notification to owner when egg collection is recorded."""
+    notification = build_egg_collection_notification(
+        owner, collection_date, recorder_name, total_eggs, cage_eggs, shade_eggs
+    )
     return send_notification_to_owner(
         owner=owner,
-        notification_type='egg_collection',
-        title=title,
-        message=message,
-        metadata=metadata
+        notification_type=notification.notification_type,
+        title=notification.title,
+        message=notification.message,
+        metadata=notification.metadata
     )
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'chicken_backend.settings')
 
 application = get_asgi_application()
+
+# Apply migrations and collect static files on startup (for Render free
+# tier), once across workers; see chicken_backend.startup
+if os.environ.get('RUN_MIGRATIONS', 'True').lower() in ('true', '1', 'yes'):
+    from .startup import prepare
+    prepare()
@@ -0,0 +1,16 @@
+from django.http import JsonResponse
+from . import startup
+
+
+def healthz(request):
+    """Liveness: the process is up and answering requests"""
+    return JsonResponse({'status': 'ok'})
+
+
+def readyz(request):
+    """Readiness: the database is reachable and fully migrated"""
+    ready, detail = startup.readiness()
+    return JsonResponse(
+        {'status': 'ready' if ready else 'not ready', 'detail': detail},
+        status=200 if ready else 503
+    )
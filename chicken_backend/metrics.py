@@ -0,0 +1,231 @@
+"""
+Per-view request metrics, exposed in Prometheus text format at /api/metrics/.
+
+MetricsMiddleware times every request and counts the SQL it runs,
+including queries made on other threads for the request (sync_to_async,
+the async views' fan-out pool), by following a context variable into a
+wrapper installed on every database connection. The histograms live in
+each worker process; samples carry a worker label so scrapes that land on
+different workers stay separate series.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# (name, help, buckets) of each per-view histogram
+HISTOGRAMS = (
+    ('http_request_duration_seconds', 'Wall time of the request', DURATION_BUCKETS),
+    ('http_request_db_queries', 'SQL queries run by the request', QUERY_BUCKETS),
+    ('http_request_db_seconds', 'Time spent in SQL by the request', DURATION_BUCKETS),
+    ('http_response_size_bytes', 'Size of non-streaming responses', SIZE_BUCKETS),
+)
+
+# Slowest queries kept per request for the slow-request log
+SLOW_QUERIES_KEPT = 5
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """Histograms and status counters keyed by (view, method)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.responses = {}
+
+    def record(self, view, method, status, duration, queries, sql_seconds, size):
+        labels = (view, method)
+        observed = (duration, queries, sql_seconds, size)
+        with self._lock:
+            for (name, _, buckets), value in zip(HISTOGRAMS, observed):
+                if value is None:
+                    continue
+                histogram = self.histograms.get((name, labels))
+                if histogram is None:
+                    histogram = self.histograms[(name, labels)] = Histogram(buckets)
+                histogram.observe(value)
+            key = labels + (str(status),)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.responses.clear()
+
+    def render(self):
+        """The metrics in Prometheus text exposition format"""
+        worker = os.getpid()
+        lines = []
+        with self._lock:
+            for name, help_text, _ in HISTOGRAMS:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (metric, (view, method)), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    labels = f'view="{_escape(view)}",method="{method}",worker="{worker}"'
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.total}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            lines.append('# HELP http_responses_total Responses by view and status')
+            lines.append('# TYPE http_responses_total counter')
+            for (view, method, status), count in sorted(self.responses.items()):
+                lines.append(
+                    f'http_responses_total{{view="{_escape(view)}",method="{method}",'
+                    f'status="{status}",worker="{worker}"}} {count}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = Registry()
+
+
+class RequestStats:
+    """SQL run for one request, possibly from several threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.slowest = []
+
+    def add_query(self, sql, seconds):
+        with self._lock:
+            self.queries += 1
+            self.sql_seconds += seconds
+            if len(self.slowest) < SLOW_QUERIES_KEPT or seconds > self.slowest[-1][0]:
+                self.slowest.append((seconds, sql))
+                self.slowest.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest[SLOW_QUERIES_KEPT:]
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add_query(sql, time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install, dispatch_uid='metrics_record_query')
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """Records each request's wall time, SQL and response size by view"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened before this module was loaded
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, started)
+        return response
+
+    def start(self):
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        # Streaming responses are timed to their first byte
+        duration = time.perf_counter() - started
+        view = view_name(request)
+        size = None if response.streaming else len(response.content)
+        registry.record(view, request.method, response.status_code, duration, stats.queries, stats.sql_seconds, size)
+
+        if duration * 1000 >= getattr(settings, 'METRICS_SLOW_REQUEST_MS', 1000):
+            logger.warning(
+                'Slow request: %s %s (%s) took %.0fms with %d queries in %.0fms; slowest SQL:\n%s',
+                request.method, request.path, view, duration * 1000, stats.queries, stats.sql_seconds * 1000,
+                '\n'.join(f'  {seconds * 1000:.1f}ms {sql}' for seconds, sql in stats.slowest) or '  (none)'
+            )
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. With METRICS_TOKEN set it needs
+    "Authorization: Bearer <token>"; without one it is only served in DEBUG.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if request.META.get('HTTP_AUTHORIZATION', '') != f'Bearer {token}':
+            return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    elif not settings.DEBUG:
+        return HttpResponse('Set METRICS_TOKEN to enable metrics\n', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
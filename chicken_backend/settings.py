@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -61,6 +62,7 @@ AUTH_USER_MODEL = 'authentication.User'
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'chicken_backend.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -112,6 +114,34 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Use Redis when REDIS_URL is set so every gunicorn worker shares one cache;
+# otherwise each worker keeps its own in-memory cache
+redis_url = os.environ.get('REDIS_URL', '')
+
+if redis_url:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': redis_url,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'chicken-backend',
+        }
+    }
+
+# Seconds farm settings stay cached. Saves clear the cache straight away in
+# the worker that made them; other workers without a shared cache pick the
+# change up within this window
+FARM_SETTINGS_CACHE_SECONDS = int(os.environ.get('FARM_SETTINGS_CACHE_SECONDS', '60'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -182,7 +212,7 @@ CORS_ALLOW_CREDENTIALS = True
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'authentication.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -195,6 +225,71 @@ REST_FRAMEWORK = {
     ],
 }
 
+# History endpoints (sales, feed, expenses, medical) return pages of this
+# many rows; clients can ask for up to HISTORY_MAX_PAGE_SIZE with ?page_size=
+HISTORY_PAGE_SIZE = int(os.environ.get('HISTORY_PAGE_SIZE', '200'))
+HISTORY_MAX_PAGE_SIZE = int(os.environ.get('HISTORY_MAX_PAGE_SIZE', '1000'))
+# Rows fetched per database round trip when streaming with ?stream=ndjson
+HISTORY_STREAM_CHUNK_SIZE = int(os.environ.get('HISTORY_STREAM_CHUNK_SIZE', '500'))
+
+# PDF report jobs. In 'thread' mode each web process renders queued reports
+# in a small thread pool. The Procfile sets REPORT_WORKER_MODE=external for
+# its web processes, since its `manage.py run_report_worker` process
+# handles the queue there
+REPORT_WORKER_MODE = os.environ.get('REPORT_WORKER_MODE', 'thread')
+REPORT_WORKER_THREADS = int(os.environ.get('REPORT_WORKER_THREADS', '2'))
+# Running jobs not finished after this many seconds are retried
+REPORT_JOB_STALE_SECONDS = int(os.environ.get('REPORT_JOB_STALE_SECONDS', '600'))
+REPORT_ARTIFACT_MAX_AGE_DAYS = int(os.environ.get('REPORT_ARTIFACT_MAX_AGE_DAYS', '7'))
+# Long report tables are laid out in pieces of this many rows, each
+# repeating the header
+REPORT_TABLE_CHUNK_ROWS = int(os.environ.get('REPORT_TABLE_CHUNK_ROWS', '200'))
+# Rendered PDFs larger than this spill from memory to a temporary file
+REPORT_SPOOL_MAX_BYTES = int(os.environ.get('REPORT_SPOOL_MAX_BYTES', str(1024 * 1024)))
+
+# Largest batch accepted by the offline sync endpoint
+SYNC_MAX_OPERATIONS = int(os.environ.get('SYNC_MAX_OPERATIONS', '200'))
+
+# Concurrent identical requests to the dashboard, financial summary and
+# detailed reports share one computation. Other workers wait on a cache
+# lock for up to COALESCE_WAIT_SECONDS before computing on their own
+COALESCE_WAIT_SECONDS = float(os.environ.get('COALESCE_WAIT_SECONDS', '30'))
+COALESCE_LOCK_SECONDS = int(os.environ.get('COALESCE_LOCK_SECONDS', '60'))
+COALESCE_RESULT_SECONDS = int(os.environ.get('COALESCE_RESULT_SECONDS', '10'))
+
+# Dashboard and financial summary payloads are cached until the data they
+# use changes; a hit older than the soft TTL is refreshed in the background
+SUMMARY_CACHE_SOFT_SECONDS = int(os.environ.get('SUMMARY_CACHE_SOFT_SECONDS', '30'))
+SUMMARY_CACHE_SECONDS = int(os.environ.get('SUMMARY_CACHE_SECONDS', '600'))
+
+# Server-sent event stream (ASGI only). Streams re-check the database every
+# EVENT_STREAM_POLL_SECONDS for writes made by other workers and close after
+# EVENT_STREAM_MAX_SECONDS, when the browser reconnects
+EVENT_STREAM_POLL_SECONDS = float(os.environ.get('EVENT_STREAM_POLL_SECONDS', '5'))
+EVENT_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_STREAM_HEARTBEAT_SECONDS', '15'))
+EVENT_STREAM_MAX_SECONDS = float(os.environ.get('EVENT_STREAM_MAX_SECONDS', '600'))
+
+# Threads the async dashboard and detailed report views run their
+# independent queries on; each thread holds one database connection
+FANOUT_QUERY_THREADS = int(os.environ.get('FANOUT_QUERY_THREADS', '8'))
+
+# Authenticated users are cached by token: in each worker's LRU of
+# TOKEN_CACHE_SIZE entries for TOKEN_CACHE_LOCAL_SECONDS, and in the shared
+# cache for TOKEN_CACHE_SECONDS. Logout and user changes clear both here;
+# other workers' LRUs can lag by up to TOKEN_CACHE_LOCAL_SECONDS
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '1024'))
+TOKEN_CACHE_LOCAL_SECONDS = int(os.environ.get('TOKEN_CACHE_LOCAL_SECONDS', '5'))
+TOKEN_CACHE_SECONDS = int(os.environ.get('TOKEN_CACHE_SECONDS', '300'))
+
+# Lock file web workers on one machine queue on to migrate a SQLite
+# database at startup (Postgres uses an advisory lock instead)
+STARTUP_LOCK_FILE = os.environ.get('STARTUP_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'chicken-backend-startup.lock'))
+
+# Requests slower than this are logged with their slowest SQL. /api/metrics/
+# needs "Authorization: Bearer <METRICS_TOKEN>"; unset, it is DEBUG only
+METRICS_SLOW_REQUEST_MS = int(os.environ.get('METRICS_SLOW_REQUEST_MS', '1000'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Email settings for password reset
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -208,6 +303,11 @@ DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'your-email@gmail.com'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
+# Rendered report PDFs are stored here. Web and worker processes must see
+# the same files; on separate machines, point DEFAULT_FILE_STORAGE at
+# shared storage (e.g. S3 through django-storages)
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', str(BASE_DIR / 'media'))
+
 # Logging configuration
 LOGGING = {
     'version': 1,
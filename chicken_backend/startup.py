@@ -0,0 +1,108 @@
+"""
+Worker startup: apply migrations and collect static files once per deploy.
+
+Every web worker calls prepare() after loading Django. When nothing is
+pending it returns after one cheap check. Otherwise workers queue on a
+lock (a Postgres advisory lock, or a file lock for SQLite); the first in
+does the work and the rest find nothing left to do when their turn comes.
+"""
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.migrations.executor import MigrationExecutor
+
+try:
+    import fcntl
+except ImportError:  # Windows; development runs a single process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Identifies the startup lock among Postgres advisory locks
+ADVISORY_LOCK_ID = 0x6a6f6501
+
+_state = {'ready': False, 'error': None}
+
+
+def pending_migrations():
+    """Unapplied migrations, from the migration files and one query"""
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def static_missing():
+    return not os.path.isdir(settings.STATIC_ROOT) or not os.listdir(settings.STATIC_ROOT)
+
+
+def lock_file():
+    return getattr(settings, 'STARTUP_LOCK_FILE', os.path.join(tempfile.gettempdir(), 'chicken-backend-startup.lock'))
+
+
+@contextmanager
+def startup_lock():
+    """Held by one process at a time, across every worker using this database"""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock(%s)', [ADVISORY_LOCK_ID])
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [ADVISORY_LOCK_ID])
+        return
+
+    with open(lock_file(), 'a') as handle:
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def prepare():
+    """Bring the database and static files up to date, once across workers"""
+    started = time.monotonic()
+    try:
+        if pending_migrations() or static_missing():
+            with startup_lock():
+                # Another worker may have finished while this one waited
+                if pending_migrations():
+                    logger.info('Applying database migrations')
+                    call_command('migrate', interactive=False)
+                if static_missing():
+                    logger.info('Collecting static files')
+                    call_command('collectstatic', interactive=False, verbosity=0)
+    except Exception as e:
+        # Keep serving; /readyz/ reports the failure
+        logger.exception('Startup failed')
+        _state['error'] = f'Startup failed: {e}'
+        return
+
+    _state['ready'] = True
+    _state['error'] = None
+    logger.info('Worker ready in %.2fs', time.monotonic() - started)
+
+
+def readiness():
+    """(ready, detail) for the readiness probe"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except DatabaseError as e:
+        return False, f'Database unavailable: {e}'
+
+    if not _state['ready']:
+        # prepare() failed or didn't run here (RUN_MIGRATIONS off); the
+        # schema may have been migrated since by a release command
+        if pending_migrations():
+            return False, _state['error'] or 'Migrations pending'
+        _state['ready'] = True
+        _state['error'] = None
+    return True, 'ok'
@@ -16,9 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from . import health, metrics
 
 urlpatterns = [
+    path('healthz/', health.healthz, name='healthz'),
+    path('readyz/', health.readyz, name='readyz'),
     path('admin/', admin.site.urls),
+    path('api/metrics/', metrics.metrics_view, name='metrics'),
     path('api/auth/', include('authentication.urls')),
     path('api/cages/', include('cages.urls')),
     path('api/partitions/', include('partitions.urls')),
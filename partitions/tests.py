@@ -1,3 +1,37 @@
-from django.test import TestCase
+from rest_framework.test import APIClient
+from authentication.models import User
+from cages.tests import QueryBudgetTestCase
+from .models import Partition
 
-# Create your tests here.
+
+class PartitionsQueryBudgetTests(QueryBudgetTestCase):
+    """Query budgets for the partition endpoints"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(
+            username='owner', email='owner@example.com', password='password123', role='owner', farm_name='Hill Farm'
+        )
+        cls.partition = Partition.objects.create(user=cls.owner, name='Front', total_capacity=100, current_occupancy=40)
+
+    def seed(self, scale):
+        Partition.objects.bulk_create([
+            Partition(user=self.owner, name=f'Partition {n}', total_capacity=50, current_occupancy=n)
+            for n in range(scale)
+        ])
+
+    def endpoints(self):
+        return [
+            ('partition-list', 'get', '/api/partitions/partitions/', None, 1),
+            ('partition-detail', 'get', f'/api/partitions/partitions/{self.partition.id}/', None, 1),
+            ('partition-list:post', 'post', '/api/partitions/partitions/', {'name': 'Back', 'total_capacity': 80}, 1),
+            ('partition-detail:patch', 'patch', f'/api/partitions/partitions/{self.partition.id}/', {'current_occupancy': 45}, 2),
+            ('partition-detail:delete', 'delete', f'/api/partitions/partitions/{self.partition.id}/', None, 2),
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_query_budgets(self):
+        self.check_budgets(self.client)